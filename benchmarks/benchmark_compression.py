@@ -0,0 +1,102 @@
+"""
+Bytes on the wire and time for one page of documents with vectors: a
+`get_where` of the page and a `bulk_update` of new vectors for it, with
+`API(compression=None | "gzip" | "zstd")`.
+
+Loopback has no bandwidth limit, so the time is also given with the bytes on
+the wire sent over a link of `--bandwidth` MB/s.
+
+.. code-block::
+
+    python -m benchmarks.benchmark_compression --documents 1000 --dimensions 768
+
+"""
+import argparse
+import multiprocessing
+import random
+import time
+
+from benchmarks.stub_server import STUB_CREDENTIALS, StubServer
+from workflows_core.api.api import API
+from workflows_core.dataset.dataset import Dataset
+
+
+def make_documents(num_documents: int, dimensions: int):
+    return [
+        {
+            "_id": str(i),
+            "text": f"document {i}",
+            "text_vector_": [random.random() for _ in range(dimensions)],
+        }
+        for i in range(num_documents)
+    ]
+
+
+def serve(connection, documents, compress_responses: bool):
+    # The server runs in its own process so that its JSON and compression
+    # work isn't counted in the client's time
+    with StubServer(compress_responses=compress_responses) as server:
+        server.insert("benchmark", documents)
+        connection.send(server.url)
+        connection.recv()
+        connection.send((server.state.bytes_received, server.state.bytes_sent))
+
+
+def run(compression, documents, dimensions: int):
+    connection, child_connection = multiprocessing.Pipe()
+    # The baseline server doesn't compress responses either
+    server = multiprocessing.Process(
+        target=serve,
+        args=(child_connection, documents, compression is not None),
+        daemon=True,
+    )
+    server.start()
+    try:
+        api = API(credentials=STUB_CREDENTIALS, compression=compression)
+        api._base_url = connection.recv()
+        dataset = Dataset(api, "benchmark")
+
+        start = time.perf_counter()
+        page = dataset.get_documents(len(documents))["documents"]
+        for document in page:
+            document["text_vector_"] = [random.random() for _ in range(dimensions)]
+        dataset.update_documents(page)
+        elapsed = time.perf_counter() - start
+
+        connection.send("stats")
+        received, sent = connection.recv()
+        return elapsed, received, sent
+    finally:
+        server.join(timeout=5)
+        server.terminate()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--documents", type=int, default=1000)
+    parser.add_argument("--dimensions", type=int, default=768)
+    parser.add_argument("--bandwidth", type=float, default=12.5)
+    args = parser.parse_args()
+
+    documents = make_documents(args.documents, args.dimensions)
+    codecs = [None, "gzip"]
+    try:
+        import zstandard
+
+        codecs.append("zstd")
+    except ImportError:
+        pass
+
+    for compression in codecs:
+        elapsed, sent, received = run(compression, documents, args.dimensions)
+        wire = sent + received
+        print(
+            f"{str(compression):>5}: "
+            f"upload {sent / 2 ** 20:.1f} MB, download {received / 2 ** 20:.1f} MB, "
+            f"{elapsed:.2f}s on loopback, "
+            f"{elapsed + wire / (args.bandwidth * 2 ** 20):.2f}s at {args.bandwidth} MB/s"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Time of `Document.keys` and `in` on nested documents: flattening every
+document with `pd.json_normalize` (the previous implementation) against the
+incrementally maintained key index.
+
+.. code-block::
+
+    python -m benchmarks.benchmark_document_keys --documents 10000
+
+"""
+import argparse
+import time
+
+import pandas as pd
+
+from workflows_core.utils.document import Document
+
+
+def make_documents(num_documents: int):
+    return [
+        Document(
+            {
+                "_id": str(i),
+                "text": f"document {i}",
+                "metadata": {
+                    "source": "benchmark",
+                    "scores": {"relevance": i / num_documents, "rank": i},
+                },
+                "_cluster_": {"text_vector_": {"kmeans-10": f"cluster-{i % 10}"}},
+            }
+        )
+        for i in range(num_documents)
+    ]
+
+
+def json_normalize_keys(document: Document):
+    return list(pd.json_normalize(document.data, sep=".").columns)
+
+
+def run(documents, keys, contains) -> float:
+    start = time.perf_counter()
+    for document in documents:
+        keys(document)
+        contains(document, "metadata.scores.rank")
+        document["_cluster_.text_vector_.kmeans-10"] = "updated"
+        contains(document, "_cluster_.text_vector_.kmeans-10")
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--documents", type=int, default=10000)
+    args = parser.parse_args()
+
+    elapsed = run(
+        make_documents(args.documents),
+        json_normalize_keys,
+        lambda document, key: key in json_normalize_keys(document),
+    )
+    print(f"json_normalize: {elapsed:.3f}s")
+
+    elapsed = run(
+        make_documents(args.documents),
+        Document.keys,
+        lambda document, key: key in document,
+    )
+    print(f"     key index: {elapsed:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
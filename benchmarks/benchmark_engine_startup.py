@@ -0,0 +1,137 @@
+"""
+Time from creating an engine to its first page, with and without
+`lazy=True`, the time to create a `RayEngine` with and without `lazy=True`
+(when ray is installed), and the time of the `_id` scan `RayEngine` used to
+do before its first read task (its `matchModulo` read tasks now start
+without one), measured against the local stub server.
+
+.. code-block::
+
+    python -m benchmarks.benchmark_engine_startup --documents 100000 --latency 0.05
+
+"""
+import argparse
+import time
+
+from benchmarks.stub_server import STUB_CREDENTIALS, StubServer
+from workflows_core.api.api import API
+from workflows_core.dataset.dataset import Dataset
+from workflows_core.engine.stable_engine import StableEngine
+from workflows_core.operator.abstract_operator import AbstractOperator
+
+
+class NoOperator(AbstractOperator):
+    def transform(self, documents):
+        return documents
+
+
+def time_to_first_page(dataset: Dataset, pull_chunksize: int, lazy: bool) -> float:
+    start = time.perf_counter()
+    engine = StableEngine(
+        dataset,
+        NoOperator(),
+        select_fields=["value", "text"],
+        filters=dataset["value"] >= 0,
+        pull_chunksize=pull_chunksize,
+        show_progress_bar=False,
+        lazy=lazy,
+    )
+    next(iter(engine.iterate()))
+    return time.perf_counter() - start
+
+
+def time_ray_engine(dataset: Dataset, pull_chunksize: int, lazy: bool) -> float:
+    from workflows_core.engine.ray_engine import RayEngine
+    from workflows_core.operator.ray_operator import AbstractRayOperator
+
+    class NoRayOperator(AbstractRayOperator):
+        def transform(self, table):
+            return table
+
+    start = time.perf_counter()
+    RayEngine(
+        dataset=dataset,
+        operator=NoRayOperator(),
+        pull_chunksize=pull_chunksize,
+        lazy=lazy,
+    )
+    return time.perf_counter() - start
+
+
+def time_scan(dataset: Dataset, pull_chunksize: int) -> float:
+    # What RayEngine did before: page through every _id
+    start = time.perf_counter()
+    after_ids = [None]
+    after_id = None
+    while True:
+        page = dataset.get_documents(
+            pull_chunksize, select_fields=["_id"], after_id=after_id
+        )
+        if not page["documents"]:
+            break
+        after_id = page["after_id"]
+        after_ids.append(after_id)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--documents", type=int, default=20000)
+    parser.add_argument("--pull-chunksize", type=int, default=1000)
+    parser.add_argument(
+        "--latency",
+        type=float,
+        default=0.02,
+        help="seconds added to every request to model a remote server",
+    )
+    args = parser.parse_args()
+
+    with StubServer(latency=args.latency) as server:
+        server.insert(
+            "benchmark",
+            [
+                {"_id": f"{i:08d}", "value": i, "text": f"document {i}"}
+                for i in range(args.documents)
+            ],
+        )
+        api = API(credentials=STUB_CREDENTIALS)
+        api._base_url = server.url
+        dataset = Dataset(api, "benchmark")
+
+        for lazy in [False, True]:
+            # a new Dataset, so that the schema cache starts empty
+            dataset = Dataset(api, "benchmark")
+            requests = dict(server.state.requests)
+            seconds = time_to_first_page(dataset, args.pull_chunksize, lazy)
+            sent = sum(server.state.requests.values()) - sum(requests.values())
+            print(
+                f"{'lazy' if lazy else 'eager':>10}: {1000 * seconds:.1f} ms to the "
+                f"first page, {sent} requests"
+            )
+
+        try:
+            import ray
+        except ImportError:
+            print(f"{'ray':>10}: not installed, RayEngine skipped")
+        else:
+            ray.init(num_cpus=1)
+            # a first engine, so that the Ray workers are already started
+            time_ray_engine(Dataset(api, "benchmark"), args.pull_chunksize, True)
+            for lazy in [False, True]:
+                requests = dict(server.state.requests)
+                seconds = time_ray_engine(
+                    Dataset(api, "benchmark"), args.pull_chunksize, lazy
+                )
+                sent = sum(server.state.requests.values()) - sum(requests.values())
+                print(
+                    f"{'ray lazy' if lazy else 'ray eager':>10}: {1000 * seconds:.1f} "
+                    f"ms to create the engine, {sent} requests"
+                )
+            ray.shutdown()
+
+        scan = time_scan(dataset, args.pull_chunksize)
+        print(f"{'scan':>10}: {1000 * scan:.1f} ms before the first Ray read task")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Time to serialize a `bulk_update` body of documents with vector fields: the
+previous path (`Document.to_json` deepcopying and walking each document with
+`json_encoder`, then `json.dumps`) against `json_dumps`.
+
+.. code-block::
+
+    python -m benchmarks.benchmark_json_dumps --documents 1000 --dimensions 768
+
+"""
+import argparse
+import json
+import random
+import sys
+import time
+
+from copy import deepcopy
+
+from workflows_core.utils.document_list import DocumentList
+from workflows_core.utils.json_encoder import json_dumps, json_encoder
+
+# `workflows_core.utils` re-exports the `json_encoder` function over the module
+json_encoder_module = sys.modules["workflows_core.utils.json_encoder"]
+
+
+def make_documents(num_documents: int, dimensions: int) -> DocumentList:
+    return DocumentList(
+        [
+            {
+                "_id": str(i),
+                "text": f"document {i}",
+                "text_vector_": [random.random() for _ in range(dimensions)],
+                "_cluster_": {"text_vector_": {"kmeans-10": f"cluster-{i % 10}"}},
+            }
+            for i in range(num_documents)
+        ]
+    )
+
+
+def previous(documents: DocumentList) -> bytes:
+    updates = [json_encoder(deepcopy(document.data)) for document in documents]
+    return json.dumps(dict(updates=updates)).encode()
+
+
+def timed(function, documents: DocumentList, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function(documents)
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--documents", type=int, default=1000)
+    parser.add_argument("--dimensions", type=int, default=768)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    documents = make_documents(args.documents, args.dimensions)
+    body = lambda documents: json_dumps(dict(updates=documents))
+
+    print(f"  to_json + json.dumps: {timed(previous, documents, args.repeat):.3f}s")
+    if json_encoder_module.orjson is not None:
+        print(f"   json_dumps (orjson): {timed(body, documents, args.repeat):.3f}s")
+        json_encoder_module.orjson = None
+    print(f"   json_dumps (stdlib): {timed(body, documents, args.repeat):.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Time and peak memory of `AbstractOperator.__call__` on documents with a
+768-dim vector field: the default path (deepcopy + `get_document_diff`)
+against `inplace=True` (no copy, only `output_fields` are extracted).
+
+.. code-block::
+
+    python -m benchmarks.benchmark_operator_call --documents 3000
+
+"""
+import argparse
+import random
+import time
+import tracemalloc
+
+from workflows_core.operator.abstract_operator import AbstractOperator
+from workflows_core.utils.document_list import DocumentList
+
+
+class LabelOperator(AbstractOperator):
+    def __init__(self, inplace: bool):
+        super().__init__(
+            input_fields=["text_vector_"],
+            output_fields=["_label_.text_vector_"],
+            inplace=inplace,
+        )
+
+    def transform(self, documents: DocumentList) -> DocumentList:
+        for document in documents:
+            document["_label_.text_vector_"] = (
+                "positive" if document["text_vector_"][0] > 0.5 else "negative"
+            )
+        return documents
+
+
+def make_documents(num_documents: int, dimensions: int) -> DocumentList:
+    return DocumentList(
+        [
+            {
+                "_id": str(i),
+                "text": f"document {i}",
+                "text_vector_": [random.random() for _ in range(dimensions)],
+            }
+            for i in range(num_documents)
+        ]
+    )
+
+
+def run(operator: AbstractOperator, documents: DocumentList, chunksize: int):
+    tracemalloc.start()
+    start = time.perf_counter()
+    updates = 0
+    for i in range(0, len(documents), chunksize):
+        updates += len(operator(documents[i : i + chunksize]))
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak, updates
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--documents", type=int, default=3000)
+    parser.add_argument("--dimensions", type=int, default=768)
+    parser.add_argument("--chunksize", type=int, default=1000)
+    args = parser.parse_args()
+
+    for inplace in [False, True]:
+        documents = make_documents(args.documents, args.dimensions)
+        elapsed, peak, updates = run(
+            LabelOperator(inplace=inplace), documents, args.chunksize
+        )
+        name = "inplace" if inplace else "deepcopy"
+        print(
+            f"{name:>8}: {elapsed:.3f}s, "
+            f"peak {peak / 2 ** 20:.1f} MB above the documents, "
+            f"{updates} updates"
+        )
+
+
+if __name__ == "__main__":
+    main()
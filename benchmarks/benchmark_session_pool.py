@@ -0,0 +1,68 @@
+"""
+Per-request latency of the pooled keep-alive sessions in `API` against
+opening a new connection for every request (the previous `requests.post`
+behaviour), measured against the local stub server.
+
+.. code-block::
+
+    python -m benchmarks.benchmark_session_pool --requests 500 --connect-latency 0.01
+
+"""
+import argparse
+import time
+
+import requests
+
+from benchmarks.stub_server import STUB_CREDENTIALS, StubServer
+from workflows_core.api.api import API
+
+
+class UnpooledAPI(API):
+    """
+    Opens a new connection per request like bare `requests.post` does
+    """
+
+    @property
+    def _session(self) -> requests.Session:
+        return requests.Session()
+
+
+def run(api: API, num_requests: int) -> float:
+    start = time.perf_counter()
+    for _ in range(num_requests):
+        api._get_where(dataset_id="benchmark", page_size=10)
+    return (time.perf_counter() - start) / num_requests
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument(
+        "--connect-latency",
+        type=float,
+        default=0.0,
+        help="seconds added to every new connection to model TCP+TLS handshakes",
+    )
+    args = parser.parse_args()
+
+    with StubServer(connect_latency=args.connect_latency) as server:
+        server.insert("benchmark", [{"_id": str(i), "value": i} for i in range(10)])
+
+        results = {}
+        for name, api_class in [("unpooled", UnpooledAPI), ("pooled", API)]:
+            api = api_class(credentials=STUB_CREDENTIALS)
+            api._base_url = server.url
+            connections = server.state.connections
+            latency = run(api, args.requests)
+            results[name] = latency
+            print(
+                f"{name:>10}: {1000 * latency:.3f} ms/request, "
+                f"{server.state.connections - connections} connections opened"
+            )
+
+    saved = results["unpooled"] - results["pooled"]
+    print(f"{'saved':>10}: {1000 * saved:.3f} ms/request")
+
+
+if __name__ == "__main__":
+    main()
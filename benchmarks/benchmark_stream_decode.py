@@ -0,0 +1,92 @@
+"""
+Time and peak memory of downloading one page of documents with large
+vectors: `Dataset.get_documents` (whole body decoded with `response.json()`)
+against `Dataset.get_documents(stream=True)` (body decoded as it arrives,
+vectors stored as float32 rows).
+
+.. code-block::
+
+    python -m benchmarks.benchmark_stream_decode --documents 3000 --dimensions 1536
+
+"""
+import argparse
+import multiprocessing
+import random
+import socket
+import time
+import tracemalloc
+
+from benchmarks.stub_server import STUB_CREDENTIALS, StubServer
+from workflows_core.api.api import API
+from workflows_core.dataset.dataset import Dataset
+
+
+def run(dataset: Dataset, page_size: int, stream: bool):
+    tracemalloc.start()
+    start = time.perf_counter()
+    page = dataset.get_documents(page_size, stream=stream)
+    if stream:
+        page = page.read()
+    elapsed = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak, current, len(page["documents"])
+
+
+def serve(port: int, num_documents: int, dimensions: int, ready):
+    # The server runs in its own process so that its allocations (e.g.
+    # encoding the response) are not counted
+    with StubServer(port=port) as server:
+        server.insert(
+            "benchmark",
+            [
+                {
+                    "_id": str(i),
+                    "text": f"document {i}",
+                    "text_vector_": [random.random() for _ in range(dimensions)],
+                }
+                for i in range(num_documents)
+            ],
+        )
+        ready.set()
+        while True:
+            time.sleep(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--documents", type=int, default=1000)
+    parser.add_argument("--dimensions", type=int, default=1536)
+    args = parser.parse_args()
+
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    ready = multiprocessing.Event()
+    server = multiprocessing.Process(
+        target=serve,
+        args=(port, args.documents, args.dimensions, ready),
+        daemon=True,
+    )
+    server.start()
+    ready.wait()
+
+    api = API(credentials=STUB_CREDENTIALS)
+    api._base_url = f"http://127.0.0.1:{port}/latest"
+    dataset = Dataset(api, "benchmark")
+    try:
+        for stream in [False, True]:
+            elapsed, peak, current, documents = run(dataset, args.documents, stream)
+            name = "stream" if stream else "json"
+            print(
+                f"{name:>6}: {elapsed:.3f}s, "
+                f"peak {peak / 2 ** 20:.1f} MB, "
+                f"page {current / 2 ** 20:.1f} MB, "
+                f"{documents} documents"
+            )
+    finally:
+        server.terminate()
+
+
+if __name__ == "__main__":
+    main()
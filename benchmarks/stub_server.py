@@ -0,0 +1,395 @@
+"""
+A small in-memory stand-in for the Relevance AI API that the benchmarks run
+against. It implements just enough of the dataset and workflow endpoints for
+the engines to run end to end on localhost.
+
+.. code-block::
+
+    from benchmarks.stub_server import StubServer
+
+    with StubServer(latency=0.01) as server:
+        api = API(credentials=STUB_CREDENTIALS)
+        api._base_url = server.url
+
+"""
+import gzip
+import json
+import random
+import re
+import threading
+import time
+import zlib
+
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+from workflows_core.types import Credentials
+
+STUB_CREDENTIALS = Credentials("project", "api_key", "region", "firebase_uid")
+
+
+def _decompress(body: bytes, encoding: Optional[str]) -> bytes:
+    if encoding == "gzip":
+        return gzip.decompress(body)
+    if encoding == "zstd":
+        import zstandard
+
+        return zstandard.ZstdDecompressor().decompressobj().decompress(body)
+    return body
+
+
+def _compress(body: bytes, accept_encoding: str) -> Tuple[bytes, Optional[str]]:
+    # The first of the client's encodings that the stub can produce
+    for encoding in accept_encoding.split(","):
+        encoding = encoding.split(";")[0].strip()
+        if encoding == "gzip":
+            return gzip.compress(body, compresslevel=1), encoding
+        if encoding == "zstd":
+            try:
+                import zstandard
+            except ImportError:
+                continue
+            return zstandard.ZstdCompressor(level=1).compress(body), encoding
+    return body, None
+
+
+def _flatten(document: Dict[str, Any], prefix: str = "") -> Dict[str, Any]:
+    flat = {}
+    for key, value in document.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict) and value:
+            flat.update(_flatten(value, prefix=f"{name}."))
+        else:
+            flat[name] = value
+    return flat
+
+
+def _get(document: Dict[str, Any], field: str) -> Any:
+    pointer = document
+    for key in field.split("."):
+        if not isinstance(pointer, dict) or key not in pointer:
+            return None
+        pointer = pointer[key]
+    return pointer
+
+
+def _set(document: Dict[str, Any], field: str, value: Any):
+    *parents, last = field.split(".")
+    pointer = document
+    for key in parents:
+        pointer = pointer.setdefault(key, {})
+    pointer[last] = value
+
+
+def _merge(old: Dict[str, Any], new: Dict[str, Any]):
+    for key, value in new.items():
+        if isinstance(value, dict) and isinstance(old.get(key), dict):
+            _merge(old[key], value)
+        else:
+            old[key] = value
+
+
+def _modulo_value(_id: str) -> int:
+    return zlib.crc32(str(_id).encode())
+
+
+def _dtype(field: str, value: Any):
+    if "_vector_" in field and isinstance(value, list):
+        return {"vector": len(value)}
+    if isinstance(value, bool):
+        return "bool"
+    if isinstance(value, (int, float)):
+        return "numeric"
+    if isinstance(value, list):
+        if value and isinstance(value[0], dict):
+            return "chunks"
+        return "text"
+    return "text"
+
+
+class _State:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.datasets: Dict[str, "OrderedDict[str, dict]"] = {}
+        self.requests: Dict[str, int] = {}
+        self.bytes_received = 0
+        self.bytes_sent = 0
+        self.connections = 0
+
+    def dataset(self, dataset_id: str) -> "OrderedDict[str, dict]":
+        return self.datasets.setdefault(dataset_id, OrderedDict())
+
+
+def _matches(document: Dict[str, Any], filters: List[Dict[str, Any]]) -> bool:
+    for condition in filters:
+        if "matchModulo" in condition:
+            modulo = condition["matchModulo"]
+            value = _get(document, modulo["field"])
+            if _modulo_value(value) % modulo["modulo"] != modulo["value"]:
+                return False
+        elif condition.get("filter_type") == "exists":
+            exists = _get(document, condition["field"]) is not None
+            if exists != (condition.get("condition", "==") == "=="):
+                return False
+    return True
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Keep-alive responses are written in two parts (headers, body), which
+    # otherwise stalls on delayed ACKs
+    disable_nagle_algorithm = True
+    server: "_Server"
+
+    def log_message(self, *args, **kwargs):
+        pass
+
+    def setup(self):
+        super().setup()
+        with self.server.state.lock:
+            self.server.state.connections += 1
+        if self.server.connect_latency:
+            time.sleep(self.server.connect_latency)
+
+    def _read_body(self) -> Any:
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length) if length else b""
+        with self.server.state.lock:
+            self.server.state.bytes_received += len(body)
+        if not body:
+            return {}
+        return json.loads(_decompress(body, self.headers.get("Content-Encoding")))
+
+    def _respond(self, payload: Any, status: int = 200):
+        body = json.dumps(payload).encode()
+        encoding = None
+        if self.server.compress_responses and len(body) >= 1024:
+            body, encoding = _compress(body, self.headers.get("Accept-Encoding", ""))
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        if encoding is not None:
+            self.send_header("Content-Encoding", encoding)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        with self.server.state.lock:
+            self.server.state.bytes_sent += len(body)
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def do_PUT(self):
+        self._read_body()
+        self._respond({})
+
+    def _dispatch(self, method: str):
+        body = self._read_body()
+        path = self.path.split("?")[0]
+        if path.startswith("/latest"):
+            path = path[len("/latest") :]
+        if self.server.latency:
+            time.sleep(self.server.latency)
+
+        for pattern, handler in ROUTES:
+            match = re.fullmatch(pattern, path)
+            if match is not None:
+                with self.server.state.lock:
+                    name = handler.__name__
+                    self.server.state.requests[name] = (
+                        self.server.state.requests.get(name, 0) + 1
+                    )
+                self._respond(handler(self.server.state, body, *match.groups()))
+                return
+        self._respond({"message": f"{method} {path} not found"}, status=404)
+
+
+def _list_datasets(state: _State, body: dict):
+    return {"datasets": list(state.datasets)}
+
+
+def _create_dataset(state: _State, body: dict):
+    with state.lock:
+        state.dataset(body["id"])
+    return {"message": "created"}
+
+
+def _delete_dataset(state: _State, body: dict, dataset_id: str):
+    with state.lock:
+        state.datasets.pop(dataset_id, None)
+    return {"message": "deleted"}
+
+
+def _schema(state: _State, body: dict, dataset_id: str):
+    schema = {}
+    with state.lock:
+        for document in state.dataset(dataset_id).values():
+            for field, value in _flatten(document).items():
+                if field != "_id":
+                    schema.setdefault(field, _dtype(field, value))
+    return schema
+
+
+def _bulk_insert(state: _State, body: dict, dataset_id: str):
+    with state.lock:
+        dataset = state.dataset(dataset_id)
+        for document in body["documents"]:
+            document = dict(document)
+            dataset[str(document.setdefault("_id", str(len(dataset))))] = document
+    return {"inserted": len(body["documents"]), "failed_documents": []}
+
+
+def _bulk_update(state: _State, body: dict, dataset_id: str):
+    failed = []
+    with state.lock:
+        dataset = state.dataset(dataset_id)
+        for update in body["updates"]:
+            document = dataset.get(str(update.get("_id")))
+            if document is None:
+                failed.append(update.get("_id"))
+            else:
+                _merge(document, update)
+    return {
+        "inserted": len(body["updates"]) - len(failed),
+        "failed_documents": failed,
+    }
+
+
+def _get_where(state: _State, body: dict, dataset_id: str):
+    filters = body.get("filters") or []
+    select_fields = body.get("select_fields") or []
+    after_id = body.get("after_id") or []
+    page_size = body.get("page_size", 20)
+
+    with state.lock:
+        documents = [
+            document
+            for _id, document in sorted(state.dataset(dataset_id).items())
+            if _matches(document, filters)
+        ]
+
+    count = len(documents)
+    if body.get("is_random"):
+        documents = random.Random(body.get("random_state", 0)).sample(
+            documents, len(documents)
+        )
+    elif after_id:
+        documents = [d for d in documents if str(d["_id"]) > str(after_id[0])]
+    documents = documents[:page_size]
+
+    page = []
+    for document in documents:
+        if select_fields:
+            selected = {"_id": document["_id"]}
+            for field in select_fields:
+                value = _get(document, field)
+                if value is not None:
+                    _set(selected, field, value)
+            page.append(selected)
+        else:
+            page.append(document)
+
+    next_after_id = [page[-1]["_id"]] if page else after_id
+    return {"documents": page, "after_id": next_after_id, "count": count}
+
+
+def _ok(state: _State, body: dict, *args):
+    return {}
+
+
+ROUTES = [
+    (r"/datasets/list", _list_datasets),
+    (r"/datasets/create", _create_dataset),
+    (r"/datasets/([^/]+)/delete", _delete_dataset),
+    (r"/datasets/([^/]+)/schema", _schema),
+    (r"/datasets/([^/]+)/documents/bulk_insert", _bulk_insert),
+    (r"/datasets/([^/]+)/documents/bulk_update", _bulk_update),
+    (r"/datasets/([^/]+)/documents/get_where", _get_where),
+    (r"/workflows/.*", _ok),
+    (r"/datasets/([^/]+)/.*", _ok),
+]
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(
+        self,
+        *args,
+        latency: float = 0.0,
+        connect_latency: float = 0.0,
+        compress_responses: bool = False,
+        **kwargs,
+    ):
+        super().__init__(*args, **kwargs)
+        self.state = _State()
+        self.latency = latency
+        self.connect_latency = connect_latency
+        self.compress_responses = compress_responses
+
+
+class StubServer:
+    """
+    Runs the stub API on a background thread.
+
+    Parameters
+    -----------
+
+    latency
+        seconds of artificial latency added to every request
+    connect_latency
+        seconds of artificial latency added to every new connection, to
+        model the TCP and TLS handshakes of a remote server
+    compress_responses
+        if True, responses of at least 1 KB are compressed with the first
+        encoding of the request's `Accept-Encoding` that the stub supports.
+        Compressed request bodies (`Content-Encoding`) are always accepted.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        connect_latency: float = 0.0,
+        port: int = 0,
+        compress_responses: bool = False,
+    ):
+        self._server = _Server(
+            ("127.0.0.1", port),
+            _Handler,
+            latency=latency,
+            connect_latency=connect_latency,
+            compress_responses=compress_responses,
+        )
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/latest"
+
+    @property
+    def state(self) -> _State:
+        return self._server.state
+
+    def insert(self, dataset_id: str, documents: List[Dict[str, Any]]):
+        _bulk_insert(self.state, {"documents": documents}, dataset_id)
+
+    def start(self) -> "StubServer":
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="stub-server", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "StubServer":
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
@@ -1,7 +1,8 @@
 from typing import Callable
 import uuid
 
-import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
 
 from workflows_core.api.client import Client
 from workflows_core.engine.ray_engine import RayEngine
@@ -14,17 +15,18 @@ class RayOperator(AbstractRayOperator):
     def __init__(self, field: str):
         self._field = field
 
-    def transform(self, df: pd.DataFrame) -> pd.DataFrame:
+    def transform(self, table: pa.Table) -> pa.Table:
         """
         Main transform function
         """
-        df[self._field] += 1
-
-        return df
+        index = table.schema.get_field_index(self._field)
+        return table.set_column(
+            index, self._field, pc.add(table.column(self._field), 1)
+        )
 
 
 def execute(token: str, logger: Callable, worker_number: int = 0, *args, **kwargs):
-    config = decode_workflow_token(args.workflow_token)
+    config = decode_workflow_token(token)
 
     job_id = config.get("job_id", str(uuid.uuid4()))
     token = config["authorizationToken"]
@@ -5,6 +5,7 @@ from typing import Callable, List, Optional
 
 from workflows_core.api.client import Client
 from workflows_core.dataset.dataset import Dataset
+from workflows_core.engine.multi_pass_engine import MultiPassEngine
 from workflows_core.engine.stable_engine import StableEngine
 from workflows_core.workflow.helpers import decode_workflow_token
 from workflows_core.workflow.abstract_workflow import AbstractWorkflow
@@ -22,7 +23,8 @@ class BatchClusterFitOperator(AbstractOperator):
         vector_field: str,
     ):
 
-        self._model = MiniBatchKMeans(n_clusters=n_clusters)
+        # Seeded so that workers fitting on the same pages get the same model
+        self._model = MiniBatchKMeans(n_clusters=n_clusters, random_state=0)
         self._vector_field = vector_field
 
         super().__init__(input_fields=[self._vector_field])
@@ -44,8 +46,10 @@ class BatchClusterPredictOperator(AbstractOperator):
         model: MiniBatchKMeans,
         vector_field: str,
         alias: Optional[str] = None,
+        insert_centroids: bool = True,
     ):
         self._model = model
+        self._insert_centroids = insert_centroids
         self._vector_field = vector_field
         self._alias = f"minibatchkmeans-{model.n_clusters}" if alias is None else alias
         self._output_field = f"_cluster_.{vector_field}.{self._alias}"
@@ -71,6 +75,9 @@ class BatchClusterPredictOperator(AbstractOperator):
         """
         Insert the centroids after clustering
         """
+        if not self._insert_centroids:
+            return
+
         centroid_documents = [
             dict(_id=f"cluster_{_id}", centroid_vector=centroid_vector)
             for _id, centroid_vector in enumerate(self._model.cluster_centers_.tolist())
@@ -85,7 +92,7 @@ class BatchClusterPredictOperator(AbstractOperator):
 
 
 def execute(token: str, logger: Callable, worker_number: int = 0, *args, **kwargs):
-    config = decode_workflow_token(args.workflow_token)
+    config = decode_workflow_token(token)
 
     job_id = config.get("job_id", str(uuid.uuid4()))
     token = config["authorizationToken"]
@@ -107,40 +114,52 @@ def execute(token: str, logger: Callable, worker_number: int = 0, *args, **kwarg
         model=fit_operator._model,
         vector_field=vector_field,
         alias=alias,
+        insert_centroids=not worker_number,
     )
 
     filters = dataset[vector_field].exists()
     chunksize = 8
 
-    fit_engine = StableEngine(
-        dataset=dataset,
-        operator=fit_operator,
-        chunksize=chunksize,
-        select_fields=[vector_field],
-        filters=filters,
-    )
-
-    predict_engine = StableEngine(
-        dataset=dataset,
-        operator=predict_operator,
-        chunksize=chunksize,
-        select_fields=[vector_field],
-        filters=filters,
-        worker_number=worker_number,
-        total_workers=total_workers,
-    )
-
-    fit_workflow = AbstractWorkflow(
-        engine=fit_engine,
-        job_id=f"{job_id}_fit",
-    )
-    fit_workflow.run()
+    if total_workers is None or total_workers <= 1:
+        # Downloads the vectors once for both passes, only the predictions
+        # are uploaded
+        engines = [
+            MultiPassEngine(
+                dataset=dataset,
+                operators=[fit_operator, predict_operator],
+                pull_chunksize=chunksize,
+                select_fields=[vector_field],
+                filters=filters,
+            )
+        ]
+    else:
+        # Every worker fits on the whole dataset so that the cluster labels
+        # mean the same thing on all workers, only the predictions are sharded
+        engines = [
+            StableEngine(
+                dataset=dataset,
+                operator=fit_operator,
+                pull_chunksize=chunksize,
+                select_fields=[vector_field],
+                filters=filters,
+            ),
+            StableEngine(
+                dataset=dataset,
+                operator=predict_operator,
+                pull_chunksize=chunksize,
+                select_fields=[vector_field],
+                filters=filters,
+                worker_number=worker_number,
+                total_workers=total_workers,
+            ),
+        ]
 
-    predict_workflow = AbstractWorkflow(
-        engine=predict_engine,
-        job_id=f"{job_id}_predict",
-    )
-    predict_workflow.run()
+    for step, engine in zip(["fit", "predict"], engines):
+        workflow = AbstractWorkflow(
+            engine=engine,
+            job_id=job_id if len(engines) == 1 else f"{job_id}_{step}",
+        )
+        workflow.run()
 
 
 if __name__ == "__main__":
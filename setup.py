@@ -15,11 +15,28 @@ ray_requirements = [
     "ray==2.0.0",
 ]
 
+async_requirements = [
+    "aiohttp>=3.8.0",
+]
+
+json_requirements = [
+    "orjson>=3.6.0",
+]
+
+compression_requirements = [
+    "zstandard>=0.18.0",
+]
+
+columnar_requirements = [
+    "numpy>=1.19.0",
+    "pyarrow>=9.0.0",
+]
+
 core_test_requirements = [
     "pytest",
     "pytest-xdist",
     "pytest-cov",
-]
+] + async_requirements + columnar_requirements
 
 example_test_requirements = core_test_requirements + [
     "torch",
@@ -45,5 +62,9 @@ setup(
         core_tests=core_test_requirements,
         example_tests=example_test_requirements,
         ray=ray_requirements,
+        asyncio=async_requirements,
+        columnar=columnar_requirements,
+        orjson=json_requirements,
+        compression=compression_requirements,
     ),
 )
@@ -0,0 +1,32 @@
+import gzip
+
+import pytest
+
+from workflows_core.api.api import API
+from workflows_core.api.compression import compress_body, get_accept_encoding
+from workflows_core.api.helpers import process_token
+
+
+class TestCompression:
+    def test_compress_body(self):
+        body = b'{"documents": []}' * 100
+        compressed, headers = compress_body(body, compression="gzip", threshold=10)
+        assert headers["Content-Encoding"] == "gzip"
+        assert gzip.decompress(compressed) == body
+
+    def test_threshold(self):
+        body = b'{"documents": []}'
+        compressed, headers = compress_body(body, compression="gzip", threshold=1024)
+        assert compressed == body
+        assert "Content-Encoding" not in headers
+
+    def test_accept_encoding(self):
+        assert get_accept_encoding("gzip", ["gzip", "deflate"]) == "gzip, deflate"
+        assert get_accept_encoding("zstd", ["gzip", "zstd"]) == "zstd, gzip"
+        assert get_accept_encoding("zstd", ["gzip", "deflate"]) is None
+        assert get_accept_encoding(None, ["gzip", "deflate"]) is None
+
+    def test_unknown_codec(self):
+        credentials = process_token("project:api_key:region:firebase_uid")
+        with pytest.raises(AssertionError):
+            API(credentials=credentials, compression="lz4")
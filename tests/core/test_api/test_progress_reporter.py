@@ -0,0 +1,73 @@
+import threading
+import time
+
+from workflows_core.api.progress_reporter import ProgressReporter
+
+
+class RecordingAPI:
+    def __init__(self, fail: bool = False):
+        self.calls = []
+        self.threads = set()
+        self._fail = fail
+
+    def _update_workflow_progress(self, **kwargs):
+        self.threads.add(threading.current_thread().name)
+        self.calls.append((kwargs["n_processed"], kwargs["n_total"]))
+        if self._fail:
+            raise ConnectionError("progress endpoint is down")
+
+
+class TestProgressReporter:
+    def test_coalesces_updates(self):
+        api = RecordingAPI()
+        reporter = ProgressReporter(api, "job", min_interval=60, min_fraction=0.5)
+        for n_processed in range(0, 1000, 10):
+            reporter.update(n_processed, 1000)
+        reporter.flush()
+
+        # the updates in between are skipped, the last one is sent
+        assert len(api.calls) < 10
+        assert api.calls[-1] == (990, 1000)
+        assert reporter.requests == len(api.calls)
+        assert api.threads == {"ProgressReporter"}
+
+    def test_sends_after_interval(self):
+        api = RecordingAPI()
+        reporter = ProgressReporter(api, "job", min_interval=0.2, min_fraction=1)
+        reporter.update(1, 100)
+        reporter.flush()
+        reporter.update(2, 100)
+        time.sleep(0.05)
+        assert api.calls == [(1, 100)]
+        time.sleep(0.5)
+        assert api.calls == [(1, 100), (2, 100)]
+
+    def test_flush_without_updates(self):
+        api = RecordingAPI()
+        reporter = ProgressReporter(api, "job")
+        reporter.flush()
+        reporter.update(5, 10)
+        reporter.flush()
+        reporter.update(5, 10)
+        reporter.flush()
+        assert api.calls == [(5, 10)]
+
+    def test_failed_requests_are_dropped(self):
+        api = RecordingAPI(fail=True)
+        reporter = ProgressReporter(api, "job", min_interval=0)
+        reporter.update(1, 10)
+        reporter.update(10, 10)
+        reporter.flush()
+        assert api.calls[-1] == (10, 10)
+
+    def test_sends_large_changes_early(self):
+        api = RecordingAPI()
+        reporter = ProgressReporter(api, "job", min_interval=60, min_fraction=0.1)
+        reporter.update(0, 100)
+        reporter.flush()
+        reporter.update(5, 100)
+        time.sleep(0.05)
+        assert api.calls == [(0, 100)]
+        reporter.update(20, 100)
+        time.sleep(0.05)
+        assert api.calls == [(0, 100), (20, 100)]
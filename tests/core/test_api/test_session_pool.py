@@ -0,0 +1,32 @@
+import pickle
+import threading
+
+from workflows_core.api.api import API, SessionPool
+from workflows_core.api.helpers import process_token
+
+
+class TestSessionPool:
+    def test_session_per_thread(self):
+        pool = SessionPool(pool_maxsize=4)
+        assert pool.session is pool.session
+
+        sessions = []
+        thread = threading.Thread(target=lambda: sessions.append(pool.session))
+        thread.start()
+        thread.join()
+        assert sessions[0] is not pool.session
+        assert sessions[0].get_adapter("https://") is pool.session.get_adapter(
+            "https://"
+        )
+
+    def test_shared_between_apis(self):
+        credentials = process_token("project:api_key:region:firebase_uid")
+        api = API(credentials=credentials)
+        other = API(credentials=credentials, session_pool=api.session_pool)
+        assert api._session is other._session
+
+    def test_pickle(self):
+        pool = SessionPool(pool_connections=2, pool_maxsize=3)
+        copy = pickle.loads(pickle.dumps(pool))
+        assert copy._pool_maxsize == 3
+        assert copy.session is not pool.session
@@ -1,3 +1,4 @@
+import pickle
 import pytest
 import random
 
@@ -30,6 +31,21 @@ class TestDataset2:
         schema = full_dataset.schema
         assert all([key in schema for key in keys if key not in ["_id"]])
 
+    def test_schema_cache(self, full_dataset: Dataset):
+        schema = full_dataset.schema
+        assert full_dataset.schema == schema
+
+        documents = full_dataset.get_documents(1)["documents"]
+        documents[0]["new_cached_schema_field"] = "value"
+        full_dataset.update_documents(documents, ingest_in_background=False)
+        # updating the schema invalidates the cache
+        assert "new_cached_schema_field" in full_dataset.schema
+
+    def test_pickle(self, full_dataset: Dataset):
+        # e.g. sent to Ray read tasks
+        dataset = pickle.loads(pickle.dumps(full_dataset))
+        assert dataset.schema == full_dataset.schema
+
     def test_series(self, full_dataset: Dataset):
         schema = full_dataset.schema
         series = full_dataset[random.choice(list(schema.keys()))]
@@ -0,0 +1,103 @@
+import itertools
+import os
+
+import numpy as np
+
+from workflows_core.dataset.dataset import Dataset
+from workflows_core.dataset.page_cache import PageCache, get_cache_key
+from workflows_core.types import Credentials
+
+
+def _response(index: int):
+    return {
+        "documents": [{"_id": str(index), "value_vector_": [0.1 * index] * 8}],
+        "after_id": [str(index)],
+        "count": 100,
+    }
+
+
+class TestPageCache:
+    def test_put_get(self, tmp_path):
+        cache = PageCache(str(tmp_path))
+        key = get_cache_key(dataset_id="dataset", page_size=10, after_id=None)
+        assert cache.get(key) is None
+        cache.put(key, _response(1))
+        assert cache.get(key) == _response(1)
+        # a new cache on the same directory sees the previous pages
+        assert PageCache(str(tmp_path)).get(key) == _response(1)
+
+    def test_mixed_documents(self, tmp_path):
+        cache = PageCache(str(tmp_path))
+        response = {
+            "documents": [
+                {"_id": "1", "a_vector_": [0.5, 1.5], "b_vector_": [1, 2]},
+                {"_id": "2", "b_vector_": [0.5, None], "nested": {"c_vector_": []}},
+                {"_id": "3", "a_vector_": [2.5, -1.0], "b_vector_": "text"},
+            ],
+            "after_id": ["3"],
+        }
+        cache.put("key", response)
+        assert cache.get("key") == response
+        # only the vectors that are all floats are stored as a matrix, the
+        # others stay JSON so that their values keep their types
+        with np.load(os.path.join(str(tmp_path), "key.page")) as arrays:
+            assert arrays["vectors_0"].tolist() == [[0.5, 1.5], [2.5, -1.0]]
+            assert "vectors_1" not in arrays
+        assert type(cache.get("key")["documents"][0]["b_vector_"][0]) is int
+
+    def test_keys_depend_on_project(self, tmp_path):
+        class RecordingAPI:
+            def __init__(self, project: str):
+                self._credentials = Credentials(project, "key", "region", "uid")
+                self.calls = 0
+
+            def _get_where(self, **parameters):
+                self.calls += 1
+                return _response(self.calls)
+
+        cache = PageCache(str(tmp_path))
+        first, second = RecordingAPI("first"), RecordingAPI("second")
+        Dataset(first, "dataset").get_documents(10, page_cache=cache)
+        Dataset(first, "dataset").get_documents(10, page_cache=cache)
+        Dataset(second, "dataset").get_documents(10, page_cache=cache)
+        assert (first.calls, second.calls) == (1, 1)
+
+    def test_keys_depend_on_parameters(self):
+        assert get_cache_key(after_id=None, page_size=10) == get_cache_key(
+            page_size=10, after_id=None
+        )
+        assert get_cache_key(after_id=None) != get_cache_key(after_id=["1"])
+
+    def test_evicts_least_recently_used(self, tmp_path):
+        cache = PageCache(str(tmp_path))
+        cache.put("a", _response(1))
+        page_bytes = cache.size
+        # a clock that ticks on every use
+        clock = itertools.count(start=1e9).__next__
+        cache = PageCache(str(tmp_path), max_bytes=int(page_bytes * 2.5), clock=clock)
+        cache.put("a", _response(1))
+        cache.put("b", _response(2))
+        # make "a" the most recently used page
+        assert cache.get("a") is not None
+        cache.put("c", _response(3))
+
+        assert cache.get("a") is not None
+        assert cache.get("b") is None
+        assert cache.get("c") is not None
+        assert cache.size <= page_bytes * 2.5
+
+    def test_corrupt_page(self, tmp_path):
+        cache = PageCache(str(tmp_path))
+        with open(os.path.join(str(tmp_path), "key.page"), "wb") as file:
+            file.write(b"not gzip")
+        assert cache.get("key") is None
+
+    def test_cursor(self, tmp_path):
+        cache = PageCache(str(tmp_path))
+        assert cache.get_cursor("engine") is None
+        cache.set_cursor("engine", ["abc", 1])
+        assert cache.get_cursor("engine") == ["abc", 1]
+        cache.clear()
+        assert cache.get_cursor("engine") == ["abc", 1]
+        cache.set_cursor("engine", None)
+        assert cache.get_cursor("engine") is None
@@ -0,0 +1,54 @@
+from workflows_core.dataset.dataset import Dataset
+from workflows_core.engine.async_stable_engine import AsyncStableEngine
+from workflows_core.engine.helpers import run_coroutine
+from workflows_core.operator.abstract_operator import AbstractOperator
+from workflows_core.utils.example_documents import mock_documents
+from workflows_core.workflow.abstract_workflow import AbstractWorkflow
+
+
+class TestAsyncStableEngine:
+    def test_async_stable_engine(
+        self, full_dataset: Dataset, test_operator: AbstractOperator
+    ):
+        engine = AsyncStableEngine(
+            full_dataset, test_operator, pull_chunksize=5, pages_in_flight=2
+        )
+        workflow = AbstractWorkflow(
+            name="workflow_test123",
+            engine=engine,
+            job_id="test_job123",
+        )
+        workflow.run()
+        assert engine._success_ratio == 1.0
+        assert not engine._error_logs
+
+
+class OfflineDataset:
+    dataset_id = "offline"
+
+
+class RecordingEngine(AsyncStableEngine):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.update_schema_calls = []
+
+    async def _update_batch(self, api, batch, update_schema, *args):
+        self.update_schema_calls.append(update_schema)
+        return {"inserted": len(batch), "failed_documents": []}
+
+
+class TestUpdateChunk:
+    def test_schema_updates_once_per_page(self, test_operator: AbstractOperator):
+        engine = RecordingEngine(
+            OfflineDataset(),
+            test_operator,
+            pull_chunksize=5,
+            lazy=True,
+            max_upload_documents=2,
+            upload_workers=3,
+        )
+        chunk = mock_documents(7)
+        run_coroutine(engine._update_chunk(None, chunk, len(chunk), True, True))
+
+        # the batches after the first one are uploaded concurrently
+        assert engine.update_schema_calls == [True, False, False, False]
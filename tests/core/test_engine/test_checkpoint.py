@@ -0,0 +1,91 @@
+import os
+
+from workflows_core.engine.async_stable_engine import AsyncStableEngine
+from workflows_core.engine.checkpoint import (
+    LocalFileCheckpointStore,
+    default_checkpoint_directory,
+)
+from workflows_core.engine.stable_engine import StableEngine
+from workflows_core.operator.abstract_operator import AbstractOperator
+
+
+class OfflineDataset:
+    dataset_id = "offline"
+
+
+class TestLocalFileCheckpointStore:
+    def test_save_load_delete(self, tmp_path):
+        store = LocalFileCheckpointStore(str(tmp_path))
+        assert store.load("job_0") is None
+
+        checkpoint = dict(
+            after_id=["abc"],
+            chunks=3,
+            documents=60,
+            successful_documents=50,
+            error_count=1,
+            operator_state={"total": 1.5},
+        )
+        store.save("job_0", checkpoint)
+        assert store.load("job_0") == checkpoint
+
+        checkpoint["chunks"] = 4
+        store.save("job_0", checkpoint)
+        assert LocalFileCheckpointStore(str(tmp_path)).load("job_0") == checkpoint
+
+        store.delete("job_0")
+        assert store.load("job_0") is None
+        store.delete("job_0")
+
+    def test_names_are_file_names(self, tmp_path):
+        store = LocalFileCheckpointStore(str(tmp_path))
+        store.save("../job/1_0", {"chunks": 1})
+        assert store.load("../job/1_0") == {"chunks": 1}
+        assert len(list(tmp_path.iterdir())) == 1
+
+    def test_error_logs(self, tmp_path):
+        store = LocalFileCheckpointStore(str(tmp_path))
+        assert store.load_error_logs("job_0", 0) == []
+
+        error_logs = [
+            {"exception": "ValueError", "chunk_ids": [str(i)]} for i in range(3)
+        ]
+        store.append_error_logs("job_0", error_logs[:2])
+        store.append_error_logs("job_0", error_logs[2:])
+        assert store.load_error_logs("job_0", 3) == error_logs
+
+        # the error logs a checkpoint doesn't count are dropped
+        assert store.load_error_logs("job_0", 2) == error_logs[:2]
+        store.append_error_logs("job_0", error_logs[2:])
+        assert store.load_error_logs("job_0", 3) == error_logs
+
+        store.delete("job_0")
+        assert store.load_error_logs("job_0", 3) == []
+
+
+class TestDefaultCheckpointStore:
+    def test_default_directory(self, tmp_path, monkeypatch):
+        monkeypatch.delenv("WORKFLOWS_CHECKPOINT_DIRECTORY", raising=False)
+        monkeypatch.setenv("EFS_MOUNT_PATH", str(tmp_path))
+        assert default_checkpoint_directory() == os.path.join(
+            str(tmp_path), "workflows_checkpoints"
+        )
+        monkeypatch.setenv("WORKFLOWS_CHECKPOINT_DIRECTORY", str(tmp_path / "jobs"))
+        assert default_checkpoint_directory() == str(tmp_path / "jobs")
+
+    def test_engine_default(
+        self, test_operator: AbstractOperator, tmp_path, monkeypatch
+    ):
+        monkeypatch.setenv("WORKFLOWS_CHECKPOINT_DIRECTORY", str(tmp_path))
+        engine = StableEngine(OfflineDataset(), test_operator, lazy=True)
+        assert isinstance(engine._checkpoint_store, LocalFileCheckpointStore)
+        assert engine._checkpoint_store.directory == str(tmp_path)
+
+        engine = StableEngine(
+            OfflineDataset(), test_operator, lazy=True, checkpoint_store=False
+        )
+        assert engine._checkpoint_store is None
+
+        # engines without checkpoints don't get a store
+        engine = AsyncStableEngine(OfflineDataset(), test_operator, lazy=True)
+        assert engine._checkpoint_store is None
@@ -0,0 +1,56 @@
+import pytest
+
+from workflows_core.engine.chunk_controller import (
+    AdaptiveChunkController,
+    estimate_size,
+)
+from workflows_core.utils.document_list import DocumentList
+from workflows_core.utils.json_encoder import json_dumps
+
+
+class TestAdaptiveChunkController:
+    def test_grows_while_fast(self):
+        controller = AdaptiveChunkController(
+            min_chunksize=10, max_chunksize=1000, target_latency=1
+        )
+        for _ in range(10):
+            controller.record_read(controller.chunksize, 0.01, 100)
+        assert controller.chunksize == 1000
+        # at most doubles from one page to the next
+        sizes = [decision["chunksize"] for decision in controller.stats["decisions"]]
+        assert sizes[:3] == [20, 40, 80]
+
+    def test_shrinks_to_target_latency(self):
+        controller = AdaptiveChunkController(
+            min_chunksize=10, initial_chunksize=1000, target_latency=1
+        )
+        # 10ms per document on bulk_update
+        controller.record_write(1000, 10, 100)
+        assert controller.chunksize == 100
+        assert controller.stats["decisions"][-1]["limited_by"] == "write_latency"
+
+    def test_byte_budget(self):
+        controller = AdaptiveChunkController(
+            min_chunksize=10, initial_chunksize=1000, max_page_bytes=2**20
+        )
+        # 8KB per document
+        controller.record_read(1000, 0.1, 1000 * 2**13)
+        assert controller.chunksize == 128
+        assert controller.stats["decisions"][-1]["limited_by"] == "read_bytes"
+
+    def test_bounds(self):
+        controller = AdaptiveChunkController(
+            min_chunksize=50, initial_chunksize=100, target_latency=1
+        )
+        controller.record_read(100, 100, 100)
+        assert controller.chunksize == 50
+
+    def test_invalid_bounds(self):
+        with pytest.raises(AssertionError):
+            AdaptiveChunkController(min_chunksize=100, max_chunksize=10)
+
+
+def test_estimate_size():
+    documents = DocumentList([{"_id": str(i), "value": i} for i in range(10)])
+    assert estimate_size(documents) == len(json_dumps(documents.to_json()))
+    assert estimate_size(DocumentList([])) == 0
@@ -3,6 +3,7 @@ from typing import Any
 from workflows_core.dataset.dataset import Dataset
 from workflows_core.operator.abstract_operator import AbstractOperator
 from workflows_core.engine.abstract_engine import AbstractEngine
+from workflows_core.utils.example_documents import mock_documents
 
 
 class TestAbstractEngine:
@@ -43,3 +44,41 @@ class TestAbstractEngine:
 
         engine = ExampleEngine(full_dataset, test_operator, select_fields=["_id"])
         assert True
+
+    def test_lazy_engine(self, full_dataset: Dataset, test_operator: AbstractOperator):
+        class ExampleEngine(AbstractEngine):
+            def apply(self) -> Any:
+                return
+
+        engine = ExampleEngine(full_dataset, test_operator, pull_chunksize=5, lazy=True)
+        assert engine._size is None
+        next(iter(engine.iterate()))
+        # the number of documents comes with the first page
+        assert engine._size == len(full_dataset)
+        assert engine.num_chunks > 0
+
+    def test_update_chunk_schema(self, test_operator: AbstractOperator):
+        class OfflineDataset:
+            dataset_id = "offline"
+
+        class ExampleEngine(AbstractEngine):
+            def apply(self) -> Any:
+                return
+
+            def _update_batch(self, batch, max_retries, ingest, update_schema):
+                update_schema_calls.append(update_schema)
+                return {"inserted": len(batch), "failed_documents": []}
+
+        update_schema_calls = []
+        engine = ExampleEngine(
+            OfflineDataset(),
+            test_operator,
+            pull_chunksize=5,
+            lazy=True,
+            max_upload_documents=2,
+            upload_workers=3,
+        )
+        engine.update_chunk(mock_documents(7), update_schema=True)
+
+        # only the first batch, uploaded before the others, updates the schema
+        assert update_schema_calls == [True, False, False, False]
@@ -0,0 +1,177 @@
+import time
+import pytest
+
+from workflows_core.engine.helpers import (
+    get_shard_filter,
+    map_operator,
+    merge,
+    merge_results,
+    prefetch,
+    split_documents,
+    update_rows,
+)
+from workflows_core.operator.abstract_operator import AbstractOperator
+from workflows_core.utils.document_list import DocumentList
+from workflows_core.utils.json_encoder import json_dumps
+
+
+class TestPrefetch:
+    def test_prefetch_order(self):
+        assert list(prefetch(range(10), max_prefetch=2)) == list(range(10))
+
+    def test_prefetch_error(self):
+        def iterable():
+            yield 1
+            raise ValueError("broken page")
+
+        iterator = prefetch(iterable())
+        assert next(iterator) == 1
+        with pytest.raises(ValueError):
+            next(iterator)
+
+    def test_prefetch_backpressure(self):
+        produced = []
+
+        def iterable():
+            for i in range(10):
+                produced.append(i)
+                yield i
+
+        iterator = prefetch(iterable(), max_prefetch=2)
+        assert next(iterator) == 0
+        time.sleep(0.2)
+        # 1 consumed + 2 buffered + 1 waiting to be buffered
+        assert len(produced) <= 4
+        iterator.close()
+
+
+class TestMerge:
+    def test_merge_all_items(self):
+        merged = list(merge([range(0, 10), range(10, 15), range(15, 30)]))
+        assert sorted(merged) == list(range(30))
+
+    def test_merge_keeps_order_per_iterable(self):
+        merged = list(merge([range(0, 10), range(10, 20)], max_prefetch=2))
+        assert [i for i in merged if i < 10] == list(range(10))
+        assert [i for i in merged if i >= 10] == list(range(10, 20))
+
+    def test_merge_error(self):
+        def iterable():
+            yield 1
+            raise ValueError("broken page")
+
+        with pytest.raises(ValueError):
+            list(merge([range(5), iterable()]))
+
+
+class TestSplitDocuments:
+    def test_split_by_count(self):
+        batches = list(split_documents(range(10), max_documents=4))
+        assert batches == [[0, 1, 2, 3], [4, 5, 6, 7], [8, 9]]
+
+    def test_split_by_bytes(self):
+        documents = [{"_id": str(i), "text": "a" * 100} for i in range(10)]
+        size = len(json_dumps(documents[0]))
+        batches = list(split_documents(documents, max_bytes=3 * (size + 1) + 1))
+        assert [len(batch) for batch in batches] == [3, 3, 3, 1]
+        assert all(len(json_dumps(batch)) <= 3 * (size + 1) + 1 for batch in batches)
+        assert sum(batches, []) == documents
+        # the documents were serialized once, the batches keep their JSON
+        assert all(batch.json == json_dumps(list(batch)) for batch in batches)
+
+    def test_large_document(self):
+        documents = [{"text": "a" * 1000}, {"text": "a"}]
+        assert len(list(split_documents(documents, max_bytes=100))) == 2
+
+    def test_no_limits(self):
+        assert list(split_documents(range(10))) == [list(range(10))]
+
+
+def test_merge_results():
+    results = [
+        {"inserted": 2, "failed_documents": []},
+        {"inserted": 1, "failed_documents": ["3"]},
+    ]
+    assert merge_results(results) == {"inserted": 3, "failed_documents": ["3"]}
+    assert merge_results(results[:1]) is results[0]
+
+
+class TestMapOperator:
+    class SleepOperator(AbstractOperator):
+        def transform(self, documents):
+            # later chunks finish first
+            time.sleep(0.05 / (1 + documents[0]["x"]))
+            if documents[0]["x"] == 2:
+                raise ValueError("broken chunk")
+            for document in documents:
+                document["y"] = document["x"]
+            return documents
+
+    def test_map_operator_order(self):
+        chunks = [DocumentList([{"_id": str(i), "x": i}]) for i in range(5)]
+        results = list(map_operator(self.SleepOperator(), chunks, max_workers=5))
+        assert [r[0][0]["y"] for r in results if r[1] is None] == [0, 1, 3, 4]
+        assert results[2][0] is None
+        assert results[2][1]["exception"] == "broken chunk"
+
+
+class TestGetShardFilter:
+    def test_shards_of_a_worker(self):
+        # worker 1 of 3, 2 shards: hash % 6 in (1, 4) is hash % 3 == 1
+        values = [
+            get_shard_filter(shard, 2, worker_number=1, total_workers=3)[0][
+                "matchModulo"
+            ]
+            for shard in range(2)
+        ]
+        assert [value["modulo"] for value in values] == [6, 6]
+        assert [value["value"] for value in values] == [1, 4]
+
+    def test_single_worker(self):
+        assert get_shard_filter(2, 4) == [
+            {"matchModulo": {"field": "_id", "modulo": 4, "value": 2}}
+        ]
+
+
+class RecordingDataset:
+    def __init__(self):
+        self.calls = []
+
+    def update_documents(self, documents, **kwargs):
+        self.calls.append(([document.to_json() for document in documents], kwargs))
+        return {"inserted": len(documents), "failed_documents": []}
+
+
+class TestUpdateRows:
+    def test_update_rows(self):
+        dataset = RecordingDataset()
+        rows = [
+            {"_id": "1", "_cluster_.text_vector_.kmeans": "c1", "label": None},
+            {"_id": "2", "_cluster_.text_vector_.kmeans": None, "label": "yes"},
+            {"_id": "3", "_cluster_.text_vector_.kmeans": None, "label": None},
+            {"_id": "4", "_cluster_.text_vector_.kmeans": "c2", "label": "no"},
+        ]
+        result = update_rows(dataset, rows, update_schema=True, max_documents=2)
+
+        # null values and rows with only an _id are not sent
+        assert [documents for documents, _ in dataset.calls] == [
+            [
+                {"_id": "1", "_cluster_": {"text_vector_": {"kmeans": "c1"}}},
+                {"_id": "2", "label": "yes"},
+            ],
+            [
+                {
+                    "_id": "4",
+                    "_cluster_": {"text_vector_": {"kmeans": "c2"}},
+                    "label": "no",
+                }
+            ],
+        ]
+        assert all(kwargs["update_schema"] for _, kwargs in dataset.calls)
+        assert result == {"inserted": 3, "failed_documents": []}
+
+    def test_nothing_to_update(self):
+        dataset = RecordingDataset()
+
+        assert update_rows(dataset, [{"_id": "1", "label": None}]) is None
+        assert not dataset.calls
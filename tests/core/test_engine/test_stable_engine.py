@@ -1,6 +1,9 @@
 from workflows_core.dataset.dataset import Dataset
 from workflows_core.engine.stable_engine import StableEngine
 from workflows_core.engine.small_batch_stable_engine import SmallBatchStableEngine
+from workflows_core.engine.process_pool_stable_engine import ProcessPoolStableEngine
+from workflows_core.engine.multi_pass_engine import MultiPassEngine
+from workflows_core.engine.checkpoint import LocalFileCheckpointStore
 
 from workflows_core.operator.abstract_operator import AbstractOperator
 from workflows_core.workflow.abstract_workflow import AbstractWorkflow
@@ -19,6 +22,77 @@ class TestStableEngine:
         workflow.run()
         assert True
 
+    def test_pipelined_stable_engine(
+        self, full_dataset: Dataset, test_operator: AbstractOperator
+    ):
+        engine = StableEngine(
+            full_dataset, test_operator, pull_chunksize=5, pipeline=True
+        )
+        workflow = AbstractWorkflow(
+            name="workflow_test123",
+            engine=engine,
+            job_id="test_job123",
+        )
+        workflow.run()
+        assert engine._success_ratio == 1.0
+        assert not engine._error_logs
+
+    def test_process_pool_stable_engine(
+        self, full_dataset: Dataset, test_operator: AbstractOperator
+    ):
+        # fork, as the test operator's class can't be imported by the workers
+        engine = ProcessPoolStableEngine(
+            full_dataset, test_operator, max_workers=2, mp_context="fork"
+        )
+        workflow = AbstractWorkflow(
+            name="workflow_test123",
+            engine=engine,
+            job_id="test_job123",
+        )
+        workflow.run()
+        assert engine._success_ratio == 1.0
+        assert not engine._error_logs
+
+    def test_multi_pass_engine(
+        self, full_dataset: Dataset, test_operator: AbstractOperator
+    ):
+        engine = MultiPassEngine(
+            full_dataset, [test_operator, test_operator], pull_chunksize=5
+        )
+        workflow = AbstractWorkflow(
+            name="workflow_test123",
+            engine=engine,
+            job_id="test_job123",
+        )
+        workflow.run()
+        assert engine._success_ratio == 1.0
+        assert not engine._error_logs
+
+    def test_process_pool_start_method(self, test_operator: AbstractOperator):
+        class OfflineDataset:
+            dataset_id = "offline"
+
+        engine = ProcessPoolStableEngine(OfflineDataset(), test_operator, lazy=True)
+        # never forked while the engine's threads run
+        assert engine._mp_context in {"forkserver", "spawn"}
+
+    def test_checkpointed_stable_engine(
+        self, full_dataset: Dataset, test_operator: AbstractOperator, tmp_path
+    ):
+        store = LocalFileCheckpointStore(str(tmp_path))
+        engine = StableEngine(
+            full_dataset, test_operator, pull_chunksize=5, checkpoint_store=store
+        )
+        workflow = AbstractWorkflow(
+            name="workflow_test123",
+            engine=engine,
+            job_id="test_job123",
+        )
+        workflow.run()
+        assert engine._success_ratio == 1.0
+        # A finished run doesn't leave a checkpoint to resume from
+        assert store.load(engine.checkpoint_name) is None
+
     def test_small_batch_stable_engine_abstract(
         self, full_dataset: Dataset, test_operator: AbstractOperator
     ):
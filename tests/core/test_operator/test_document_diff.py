@@ -1,8 +1,14 @@
 import json
 import random
 
+import numpy as np
+
 from copy import deepcopy
-from workflows_core.operator.abstract_operator import AbstractOperator
+from workflows_core.operator.abstract_operator import (
+    AbstractOperator,
+    get_vector_diff_mask,
+    is_different,
+)
 from workflows_core.utils.example_documents import mock_documents
 
 
@@ -24,3 +30,46 @@ class TestDocumentDiff:
         documents = mock_documents()
         diff = AbstractOperator._postprocess(documents, documents)
         assert not diff
+
+
+class TestVectorDiff:
+    def test_permuted_and_negated_vectors(self):
+        old_documents = [
+            {"_id": str(i), "example_vector_": [1.0, 2.0, 3.0]} for i in range(3)
+        ]
+        new_documents = [
+            {"_id": "0", "example_vector_": [1.0, 2.0, 3.0]},
+            {"_id": "1", "example_vector_": [3.0, 2.0, 1.0]},
+            {"_id": "2", "example_vector_": [-1.0, -2.0, -3.0]},
+        ]
+        diff = AbstractOperator._postprocess(new_documents, old_documents)
+        assert [document["_id"] for document in diff] == ["1", "2"]
+
+    def test_vector_diff_mask(self):
+        old_vectors = [[0.0, 0.0], [0.0, 0.0], None, [0.0], [0.0, 0.0]]
+        new_vectors = [[0.0, 0.0], [0.0, 0.1], [0.0], [0.0, 0.0], None]
+        mask = get_vector_diff_mask(old_vectors, new_vectors)
+        assert mask.tolist() == [False, True, True, True, True]
+
+    def test_tolerance(self):
+        old_vectors = [[0.0, 0.0], [0.0, 0.0]]
+        new_vectors = [[0.0, 1e-9], [0.0, 0.1]]
+        mask = get_vector_diff_mask(old_vectors, new_vectors, tolerance=1e-6)
+        assert mask.tolist() == [False, True]
+
+    def test_array_vector_added(self):
+        old_documents = mock_documents(2)
+        new_documents = deepcopy(old_documents)
+        for document in new_documents:
+            document["new_vector_"] = np.ones(4)
+        new_documents[0]["example_vector_"] = np.ones(4)
+        old_documents[1]["example_vector_"] = None
+
+        diff = AbstractOperator._postprocess(new_documents, old_documents)
+
+        assert len(diff) == 2
+        assert "new_vector_" in diff[0].keys()
+        assert is_different("example_vector_", None, np.ones(4))
+        assert is_different("example_vector_", np.ones(4), 1.0)
+        assert is_different("example_vector_", np.ones(4), np.ones(3))
+        assert not is_different("example_vector_", np.ones(4), [1.0] * 4)
@@ -0,0 +1,41 @@
+import pytest
+
+from workflows_core.operator.abstract_operator import AbstractOperator
+from workflows_core.utils.document_list import DocumentList
+from workflows_core.utils.example_documents import mock_documents
+
+
+class ExampleInplaceOperator(AbstractOperator):
+    def __init__(self):
+        super().__init__(output_fields=["_label_.value"], inplace=True)
+
+    def transform(self, documents: DocumentList) -> DocumentList:
+        for document in documents:
+            document["_label_.value"] = "yes"
+        return documents
+
+
+class TestInplaceOperator:
+    def test_inplace(self):
+        documents = mock_documents(5)
+        updates = ExampleInplaceOperator()(documents)
+
+        assert len(updates) == 5
+        for document, update in zip(documents, updates):
+            assert update.to_json() == {
+                "_id": document["_id"],
+                "_label_": {"value": "yes"},
+            }
+            # no copy was made
+            assert document["_label_.value"] == "yes"
+
+    def test_inplace_requires_output_fields(self):
+        class NoOutputOperator(AbstractOperator):
+            def __init__(self):
+                super().__init__(inplace=True)
+
+            def transform(self, documents: DocumentList) -> DocumentList:
+                return documents
+
+        with pytest.raises(AssertionError):
+            NoOutputOperator()
@@ -0,0 +1,82 @@
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+pc = pytest.importorskip("pyarrow.compute")
+
+from workflows_core.operator.ray_operator import (
+    AbstractRayOperator,
+    get_table_diff,
+)
+
+
+class AddOneOperator(AbstractRayOperator):
+    def transform(self, table: pa.Table) -> pa.Table:
+        index = table.schema.get_field_index("value")
+        return table.set_column(index, "value", pc.add(table.column("value"), 1))
+
+
+class LabelOperator(AbstractRayOperator):
+    def __init__(self):
+        super().__init__(output_fields=["_label_"], inplace=True)
+
+    def transform(self, table: pa.Table) -> pa.Table:
+        return table.append_column("_label_", pa.array(["yes"] * table.num_rows))
+
+
+def make_table():
+    return pa.Table.from_pylist(
+        [
+            {
+                "_id": str(i),
+                "value": i,
+                "text": f"text {i}",
+                "text_vector_": [float(i), 1.0, 2.0],
+                "_cluster_": {"text_vector_": {"kmeans": f"cluster-{i % 2}"}},
+            }
+            for i in range(4)
+        ]
+    )
+
+
+class TestRayOperator:
+    def test_only_changed_columns(self):
+        updates = AddOneOperator()(make_table())
+
+        assert updates.column_names == ["_id", "value"]
+        assert updates.to_pylist() == [
+            {"_id": str(i), "value": i + 1} for i in range(4)
+        ]
+
+    def test_unchanged_values_are_null(self):
+        old = make_table()
+        labels = pa.array(["cluster-0", "cluster-1", "cluster-1", "cluster-1"])
+        new = pa.table(
+            {"_id": old.column("_id"), "_cluster_.text_vector_.kmeans": labels}
+        )
+        updates = get_table_diff(new, old)
+
+        # the nested columns are compared on their leaves, unchanged rows dropped
+        assert updates.to_pylist() == [
+            {"_id": "2", "_cluster_.text_vector_.kmeans": "cluster-1"}
+        ]
+
+    def test_vector_tolerance(self):
+        old = make_table()
+        vectors = pa.array([[i + 1e-4, 1.0, 2.0] for i in range(3)] + [[9.0, 1.0, 2.0]])
+        new = old.set_column(3, "text_vector_", vectors)
+
+        assert get_table_diff(new, old).num_rows == 4
+        updates = get_table_diff(new, old, tolerance=1e-3)
+        assert updates.to_pylist() == [{"_id": "3", "text_vector_": [9.0, 1.0, 2.0]}]
+
+    def test_no_changes(self):
+        table = make_table()
+        updates = get_table_diff(table, table)
+
+        assert updates.num_rows == 0
+
+    def test_inplace(self):
+        updates = LabelOperator()(make_table())
+
+        assert updates.column_names == ["_id", "_label_"]
+        assert updates.num_rows == 4
@@ -0,0 +1,91 @@
+import pytest
+
+pytest.importorskip("pyarrow")
+
+import numpy as np
+
+from workflows_core.utils.columnar_document_list import ColumnarDocumentList
+from workflows_core.utils.document_list import DocumentList
+from workflows_core.utils.example_documents import mock_documents
+
+
+class TestColumnarDocumentList:
+    def test_round_trip(self, test_documents: DocumentList):
+        columnar = ColumnarDocumentList.from_documents(test_documents)
+        assert len(columnar) == len(test_documents)
+        for document, row in zip(test_documents, columnar):
+            assert row["_id"] == document["_id"]
+            assert row["_chunk_"] == document["_chunk_"]
+            assert np.allclose(row["sample_1_vector_"], document["sample_1_vector_"])
+            assert sorted(row.keys()) == sorted(document.keys())
+
+    def test_vector_view(self, test_documents: DocumentList):
+        columnar = ColumnarDocumentList.from_documents(test_documents)
+        vectors = columnar.get_vector("sample_1_vector_")
+        assert vectors.shape == (len(test_documents), 5)
+        assert vectors.dtype == np.float32
+        assert not vectors.flags.owndata
+        assert np.allclose(
+            columnar[10:20].get_vector("sample_1_vector_"), vectors[10:20]
+        )
+
+    def test_missing_values(self):
+        columnar = ColumnarDocumentList.from_documents(
+            [{"_id": "1", "value_vector_": [1, 2]}, {"_id": "2"}]
+        )
+        assert columnar.to_json() == [
+            {"_id": "1", "value_vector_": [1.0, 2.0]},
+            {"_id": "2"},
+        ]
+        assert np.isnan(columnar.get_vector("value_vector_")[1]).all()
+        assert columnar.num_fields().tolist() == [2, 1]
+        assert columnar.filter(columnar.num_fields() > 1)["_id"] == ["1"]
+
+    def test_from_iterator(self):
+        documents = ({"_id": str(i), f"field_{i % 2}": i} for i in range(3))
+        columnar = ColumnarDocumentList.from_documents(documents)
+        assert columnar.to_json() == [
+            {"_id": "0", "field_0": 0},
+            {"_id": "1", "field_1": 1},
+            {"_id": "2", "field_0": 2},
+        ]
+
+    def test_set_column(self, test_documents: DocumentList):
+        columnar = ColumnarDocumentList.from_documents(test_documents)
+        labels = [str(i) for i in range(len(columnar))]
+        columnar.set_column("_cluster_.sample_1_vector_.kmeans", labels)
+        columnar.set_column("reduced_vector_", np.zeros((len(columnar), 2)))
+
+        assert columnar.get_column("_cluster_.sample_1_vector_.kmeans") == labels
+        assert columnar.get_column("_cluster_")[0] == {
+            "sample_1_vector_": {"kmeans": "0"}
+        }
+        assert columnar[0]["reduced_vector_"] == [0.0, 0.0]
+
+    def test_legacy_operator(self):
+        from workflows_core.operator.abstract_operator import AbstractOperator
+
+        class ColumnarOperator(AbstractOperator):
+            def __init__(self):
+                super().__init__(output_fields=["norm"], columnar=True)
+
+            def transform(self, documents):
+                vectors = documents.get_vector("sample_1_vector_")
+                documents.set_column("norm", np.linalg.norm(vectors, axis=1).tolist())
+                return documents
+
+        class RowOperator(AbstractOperator):
+            def transform(self, documents):
+                for document in documents:
+                    document["norm"] = float(
+                        np.linalg.norm(document["sample_1_vector_"])
+                    )
+                return documents
+
+        columnar = ColumnarDocumentList.from_documents(mock_documents(5))
+        column_updates = ColumnarOperator()(columnar)
+        row_updates = RowOperator()(columnar)
+        assert [d["_id"] for d in column_updates] == [d["_id"] for d in row_updates]
+        assert np.allclose(
+            [d["norm"] for d in column_updates], [d["norm"] for d in row_updates]
+        )
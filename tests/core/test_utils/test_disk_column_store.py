@@ -0,0 +1,52 @@
+import os
+import pytest
+
+pytest.importorskip("pyarrow")
+
+import numpy as np
+
+from workflows_core.utils.disk_column_store import DiskColumnStore
+from workflows_core.utils.document_list import DocumentList
+
+
+class TestDiskColumnStore:
+    def test_round_trip(self, test_documents: DocumentList):
+        with DiskColumnStore() as store:
+            store.append(test_documents[:10])
+            store.append(test_documents[10:])
+            documents = store.read()
+
+        assert len(documents) == len(test_documents)
+        for document, row in zip(test_documents, documents):
+            assert row["_id"] == document["_id"]
+            assert row["_chunk_"] == document["_chunk_"]
+            assert np.allclose(row["sample_1_vector_"], document["sample_1_vector_"])
+            assert sorted(row.keys()) == sorted(document.keys())
+
+    def test_memory_mapped_vectors(self, test_documents: DocumentList):
+        with DiskColumnStore() as store:
+            store.append(test_documents)
+            vectors = store.read().get_vector("sample_1_vector_")
+            assert not vectors.flags.owndata
+            assert vectors.shape == (len(test_documents), 5)
+        assert not os.path.exists(store.directory)
+
+    def test_fields_missing_in_some_pages(self):
+        with DiskColumnStore() as store:
+            store.append([{"_id": "1", "a": 1, "v_vector_": [1.0, 2.0]}])
+            store.append([{"_id": "2", "b": "x"}])
+            store.append([{"_id": "3", "a": "mixed", "v_vector_": [3.0, 4.0]}])
+            documents = store.read()
+
+        assert [document.data for document in documents] == [
+            {"_id": "1", "a": 1, "v_vector_": [1.0, 2.0]},
+            {"_id": "2", "b": "x"},
+            {"_id": "3", "a": "mixed", "v_vector_": [3.0, 4.0]},
+        ]
+        assert documents.is_valid("v_vector_").tolist() == [True, False, True]
+
+    def test_vector_length_mismatch(self):
+        with DiskColumnStore() as store:
+            store.append([{"_id": "1", "v_vector_": [1.0, 2.0]}])
+            with pytest.raises(ValueError):
+                store.append([{"_id": "2", "v_vector_": [1.0, 2.0, 3.0]}])
@@ -39,3 +39,49 @@ class TestDocument:
     def test_inplace(self, test_document: Document):
         test_document["field1.field2"] += 4
         assert test_document["field1.field2"] == 5
+
+    def test_keys(self):
+        document = Document({"a": {"b": 1, "c": {}}, "d": [{"e": 1}], "f": None})
+        assert sorted(document.keys()) == ["a.b", "d", "f"]
+        assert "a.b" in document
+        assert "a" not in document
+        assert "a.c" not in document
+
+    def test_keys_after_update(self, test_document: Document):
+        assert "field4.field5" not in test_document
+        test_document["field4.field5"] = 1
+        assert "field4.field5" in test_document
+
+        test_document["field4"] = 2
+        assert "field4" in test_document
+        assert "field4.field5" not in test_document
+
+        del test_document["field4"]
+        assert "field4" not in test_document
+
+        test_document.pop("field3")
+        assert "field3" not in test_document
+
+    def test_keys_after_nested_update(self, test_document: Document):
+        test_document.keys()
+        test_document["field1"]["field6"] = 6
+        assert "field1.field6" in test_document
+
+    def test_keys_after_held_dict_update(self):
+        nested = {"b": 1}
+        document = Document({"a": nested, "c": 2})
+        inner = document["a"]
+        assert sorted(document.keys()) == ["a.b", "c"]
+        # the dicts are modified after the keys were listed
+        inner["d"] = 3
+        assert sorted(document.keys()) == ["a.b", "a.d", "c"]
+        nested.pop("b")
+        assert "a.b" not in document
+        assert sorted(document.keys()) == ["a.d", "c"]
+
+    def test_keys_of_copy(self, test_document: Document):
+        test_document.keys()
+        copy = test_document.copy()
+        copy["field7"] = 7
+        assert "field7" in copy
+        assert "field7" not in test_document
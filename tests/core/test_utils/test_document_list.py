@@ -27,6 +27,17 @@ class TestDocumentList:
         serialized = test_documents.to_json()
         assert json.dumps(serialized)
 
+    def test_get_column(self, test_documents: DocumentList):
+        column = test_documents.get_column("sample_1_value")
+        assert column == [document["sample_1_value"] for document in test_documents]
+        assert test_documents.get_column("not.a.field", 0) == [0] * len(test_documents)
+
+    def test_set_column(self, test_documents: DocumentList):
+        values = list(range(len(test_documents)))
+        test_documents.set_column("field4.field5", values)
+        assert test_documents.get_column("field4.field5") == values
+        assert all("field4.field5" in document for document in test_documents)
+
 
 class TestDocumentListTagOperations:
     label_field = "label"
@@ -0,0 +1,59 @@
+import json
+
+import numpy as np
+import pytest
+
+from workflows_core.utils.document_stream import DocumentStream
+from workflows_core.utils.example_documents import mock_documents
+
+
+def split(body: bytes, size: int):
+    return [body[i : i + size] for i in range(0, len(body), size)]
+
+
+class TestDocumentStream:
+    @pytest.mark.parametrize("chunk_size", [1, 7, 2**16])
+    def test_stream(self, chunk_size: int):
+        documents = mock_documents(10).to_json()
+        body = json.dumps(
+            {"count": 123456, "documents": documents, "after_id": ["abc"]}
+        ).encode()
+
+        stream = DocumentStream(split(body, chunk_size), page_size=10)
+        assert stream["count"] == 123456
+        with pytest.raises(KeyError):
+            stream["after_id"]
+
+        decoded = list(stream)
+        assert stream["after_id"] == ["abc"]
+        assert len(decoded) == len(documents)
+        for document, expected in zip(decoded, documents):
+            vector = document["sample_1_vector_"]
+            assert isinstance(vector, np.ndarray) and vector.dtype == np.float32
+            assert np.allclose(vector, expected["sample_1_vector_"])
+            assert document["_chunk_"] == expected["_chunk_"]
+            assert document["sample_1_value"] == expected["sample_1_value"]
+
+    def test_read(self):
+        body = json.dumps({"documents": [], "after_id": [], "count": 0}).encode()
+        page = DocumentStream([body]).read()
+        assert len(page["documents"]) == 0
+        assert page["count"] == 0
+
+    def test_read_columnar(self):
+        pytest.importorskip("pyarrow")
+        documents = mock_documents(5).to_json()
+        body = json.dumps({"documents": documents, "count": 5}).encode()
+        page = DocumentStream(split(body, 64)).read(columnar=True)
+
+        columns = page["documents"]
+        assert len(columns) == 5 and page["count"] == 5
+        vectors = columns.get_vector("sample_1_vector_")
+        assert vectors.dtype == np.float32
+        assert np.allclose(vectors, [d["sample_1_vector_"] for d in documents])
+        assert columns.to_document_list()[0]["_id"] == documents[0]["_id"]
+
+    def test_invalid_body(self):
+        stream = DocumentStream([b'{"documents": [{"_id": 1}'])
+        with pytest.raises(json.JSONDecodeError):
+            list(stream)
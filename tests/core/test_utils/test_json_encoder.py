@@ -0,0 +1,47 @@
+import json
+import uuid
+import datetime
+
+import numpy as np
+
+from workflows_core.utils.document_list import DocumentList
+from workflows_core.utils.example_documents import mock_documents
+from workflows_core.utils.json_encoder import (
+    SerializedList,
+    json_dumps,
+    json_encoder,
+)
+
+
+class TestJsonDumps:
+    def test_same_as_json_encoder(self):
+        payload = {
+            "documents": mock_documents(5),
+            "nan": float("nan"),
+            "date": datetime.datetime(2022, 1, 2, 3, 4, 5, 6),
+            "id": uuid.uuid4(),
+            "tags": {"a"},
+            1: "non string key",
+        }
+        assert json.loads(json_dumps(payload)) == json.loads(
+            json.dumps(json_encoder(payload))
+        )
+
+    def test_numpy(self):
+        documents = DocumentList(
+            [{"_id": "1", "value_vector_": np.array([0.5, np.nan], dtype=np.float32)}]
+        )
+        assert json.loads(json_dumps(documents)) == [
+            {"_id": "1", "value_vector_": [0.5, None]}
+        ]
+        assert json.loads(json_dumps({"value": np.int64(3)})) == {"value": 3}
+
+    def test_serialized_list(self):
+        documents = mock_documents(3)
+        serialized = SerializedList(documents, json_dumps(documents))
+        payload = {"updates": serialized, "update_schema": True}
+        assert json_dumps(payload) == json_dumps({**payload, "updates": documents})
+
+        # the JSON is embedded as it is, the items aren't serialized again
+        payload = {"updates": SerializedList([1], b"[2]"), "text": "[1]"}
+        assert json.loads(json_dumps(payload)) == {"updates": [2], "text": "[1]"}
@@ -1,4 +1,5 @@
 import requests
+import threading
 import time
 import uuid
 import logging
@@ -6,12 +7,24 @@ import traceback
 from json import JSONDecodeError
 from functools import wraps
 from typing import Any, Dict, List, Optional
+from requests.adapters import HTTPAdapter
+from urllib3.util.request import ACCEPT_ENCODING
 from workflows_core.utils import document
+from workflows_core.utils.document_stream import DocumentStream
+from workflows_core.utils.json_encoder import json_dumps
+from workflows_core.api.compression import (
+    check_compression,
+    compress_body,
+    get_accept_encoding,
+)
 from workflows_core.types import Credentials, FieldTransformer, Filter, Schema
 from workflows_core import __version__
 
 logger = logging.getLogger(__name__)
 
+# Bytes read at a time from streamed responses
+STREAM_CHUNK_SIZE = 2**16
+
 
 def get_response(response: requests.Response) -> Dict[str, Any]:
     # get a json response
@@ -67,26 +80,158 @@ def retry(num_of_retries: int = 3, timeout: int = 30):
     return _retry
 
 
+def get_base_url(credentials: Credentials) -> str:
+    return f"https://api-{credentials.region}.stack.tryrelevance.com/latest"
+
+
+def get_headers(
+    credentials: Credentials, job_id: str = None, name: str = None
+) -> Dict[str, str]:
+    headers = dict(
+        Authorization=f"{credentials.project}:{credentials.api_key}",
+        workflows_core_version=__version__,
+    )
+    if job_id is not None:
+        headers.update(workflows_core_job_id=job_id)
+    if name is not None:
+        headers.update(workflows_core_name=name)
+    return headers
+
+
+class SessionPool:
+    """
+    A thread-safe pool of keep-alive connections.
+
+    Every thread gets its own `requests.Session` (sessions are not safe to
+    share between threads) but all of them are mounted on the same
+    `HTTPAdapter`, so the underlying connections are reused across threads
+    and across every `API` that shares the pool.
+
+    Parameters
+    -----------
+
+    pool_connections
+        the number of hosts to keep a connection pool for
+    pool_maxsize
+        the maximum number of connections kept alive per host
+    pool_block
+        if True, requests wait for a free connection once `pool_maxsize`
+        connections to a host are in use instead of opening a new one
+    """
+
+    def __init__(
+        self,
+        pool_connections: int = 10,
+        pool_maxsize: int = 10,
+        pool_block: bool = False,
+    ) -> None:
+        self._pool_connections = pool_connections
+        self._pool_maxsize = pool_maxsize
+        self._pool_block = pool_block
+        self._adapter = HTTPAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            pool_block=pool_block,
+        )
+        self._local = threading.local()
+
+    @property
+    def session(self) -> requests.Session:
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = requests.Session()
+            session.mount("https://", self._adapter)
+            session.mount("http://", self._adapter)
+            self._local.session = session
+        return session
+
+    def close(self) -> None:
+        self._adapter.close()
+
+    def __getstate__(self):
+        # Connections can't be sent to another process, only the settings
+        return dict(
+            pool_connections=self._pool_connections,
+            pool_maxsize=self._pool_maxsize,
+            pool_block=self._pool_block,
+        )
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+
 class API:
     def __init__(
-        self, credentials: Credentials, job_id: str = None, name: str = None
+        self,
+        credentials: Credentials,
+        job_id: str = None,
+        name: str = None,
+        session_pool: Optional[SessionPool] = None,
+        compression: Optional[str] = None,
+        compression_threshold: int = 2**14,
     ) -> None:
+        """
+        Parameters
+        -----------
+
+        compression
+            "gzip" or "zstd" to compress the bodies of `_bulk_insert` and
+            `_bulk_update` and to ask for compressed responses from the bulk
+            endpoints, None to send plain JSON. The bodies are compressed
+            on the thread that uploads them, e.g. the uploader thread of a
+            `StableEngine(pipeline=True)`. Uploads that block the engine's
+            main thread compress there, in series with the transform: every
+            page of a `StableEngine(pipeline=False)` (the default) and the
+            first `MAX_SCHEMA_UPDATE_LIMITER` pages in any mode, which
+            update the schema before any other page is uploaded.
+        compression_threshold
+            bodies smaller than this many bytes are sent uncompressed
+
+        """
+        check_compression(compression)
         self._credentials = credentials
-        self._base_url = (
-            f"https://api-{self._credentials.region}.stack.tryrelevance.com/latest"
+        self._session_pool = SessionPool() if session_pool is None else session_pool
+        self._base_url = get_base_url(credentials)
+        self._headers = get_headers(credentials, job_id=job_id, name=name)
+        self._compression = compression
+        self._compression_threshold = compression_threshold
+
+    @property
+    def session_pool(self) -> SessionPool:
+        return self._session_pool
+
+    @property
+    def _session(self) -> requests.Session:
+        return self._session_pool.session
+
+    @property
+    def _bulk_headers(self) -> Dict[str, str]:
+        # Headers of the bulk endpoints, which ask for compressed responses
+        accept_encoding = get_accept_encoding(
+            self._compression, ACCEPT_ENCODING.split(",")
+        )
+        if accept_encoding is None:
+            return self._headers
+        return {**self._headers, "Accept-Encoding": accept_encoding}
+
+    def _post_json(self, url: str, payload: Dict[str, Any]) -> requests.Response:
+        """
+        Posts `payload` serialized with `json_dumps`, which converts the
+        documents in it while encoding instead of in a separate pass, and
+        compressed according to `compression`.
+        """
+        body, headers = compress_body(
+            json_dumps(payload),
+            compression=self._compression,
+            threshold=self._compression_threshold,
         )
-        self._headers = dict(
-            Authorization=f"{self._credentials.project}:{self._credentials.api_key}",
-            workflows_core_version=__version__,
+        return self._session.post(
+            url=url, headers={**self._bulk_headers, **headers}, data=body
         )
-        if job_id is not None:
-            self._headers.update(workflows_core_job_id=job_id)
-        if name is not None:
-            self._headers.update(workflows_core_name=name)
 
     @retry()
     def _list_datasets(self):
-        response = requests.get(
+        response = self._session.get(
             url=self._base_url + "/datasets/list", headers=self._headers
         )
         return get_response(response)
@@ -95,7 +240,7 @@ class API:
     def _create_dataset(
         self, dataset_id: str, schema: Optional[Schema] = None, upsert: bool = True
     ) -> Any:
-        return requests.post(
+        return self._session.post(
             url=self._base_url + f"/datasets/create",
             headers=self._headers,
             json=dict(id=dataset_id, schema=schema, upsert=upsert),
@@ -103,14 +248,14 @@ class API:
 
     @retry()
     def _delete_dataset(self, dataset_id: str) -> Any:
-        response = requests.post(
+        response = self._session.post(
             url=self._base_url + f"/datasets/{dataset_id}/delete", headers=self._headers
         )
         return get_response(response)
 
     @retry()
     def _get_schema(self, dataset_id: str) -> Schema:
-        response = requests.get(
+        response = self._session.get(
             url=self._base_url + f"/datasets/{dataset_id}/schema", headers=self._headers
         )
         return get_response(response)
@@ -127,10 +272,9 @@ class API:
         field_transformers: List[FieldTransformer] = None,
         ingest_in_background: bool = False,
     ) -> Any:
-        response = requests.post(
+        response = self._post_json(
             url=self._base_url + f"/datasets/{dataset_id}/documents/bulk_insert",
-            headers=self._headers,
-            json=dict(
+            payload=dict(
                 documents=documents,
                 insert_date=insert_date,
                 overwrite=overwrite,
@@ -153,10 +297,9 @@ class API:
         ingest_in_background: bool = True,
         update_schema: bool = True,
     ) -> Any:
-        response = requests.post(
+        response = self._post_json(
             url=self._base_url + f"/datasets/{dataset_id}/documents/bulk_update",
-            headers=self._headers,
-            json=dict(
+            payload=dict(
                 updates=documents,
                 insert_date=insert_date,
                 ingest_in_background=ingest_in_background,
@@ -178,10 +321,16 @@ class API:
         is_random: bool = False,
         after_id: Optional[List] = None,
         worker_number: int = 0,
+        stream: bool = False,
     ):
-        response = requests.post(
+        """
+        With `stream=True`, returns a `DocumentStream` that decodes the
+        documents while the response is downloaded.
+        """
+        response = self._session.post(
             url=self._base_url + f"/datasets/{dataset_id}/documents/get_where",
-            headers=self._headers,
+            headers=self._bulk_headers,
+            stream=stream,
             json=dict(
                 select_fields=[] if select_fields is None else select_fields,
                 page_size=page_size,
@@ -194,6 +343,12 @@ class API:
                 worker_number=worker_number,
             ),
         )
+        if stream and response.ok:
+            return DocumentStream(
+                response.iter_content(chunk_size=STREAM_CHUNK_SIZE),
+                page_size=page_size,
+                close=response.close,
+            )
         return get_response(response)
 
     @retry()
@@ -201,7 +356,7 @@ class API:
         """
         Edit and add metadata about a dataset. Notably description, data source, etc
         """
-        response = requests.post(
+        response = self._session.post(
             url=self._base_url + f"/datasets/{dataset_id}/metadata",
             headers=self._headers,
             json=dict(dataset_id=dataset_id, metadata=metadata),
@@ -210,7 +365,7 @@ class API:
 
     @retry()
     def _get_metadata(self, dataset_id: str) -> Dict[str, Any]:
-        response = requests.get(
+        response = self._session.get(
             url=self._base_url + f"/datasets/{dataset_id}/metadata",
             headers=self._headers,
         )
@@ -224,7 +379,7 @@ class API:
         vector_fields: List[str],
         alias: str,
     ):
-        response = requests.post(
+        response = self._session.post(
             url=self._base_url + f"/datasets/{dataset_id}/cluster/centroids/insert",
             headers=self._headers,
             json=dict(
@@ -247,7 +402,7 @@ class API:
         cluster_ids: Optional[List] = None,
         include_vector: bool = False,
     ):
-        response = requests.post(
+        response = self._session.post(
             url=self._base_url + f"/datasets/{dataset_id}/cluster/centroids/documents",
             headers=self._headers,
             json=dict(
@@ -282,7 +437,7 @@ class API:
         if metadata is None:
             metadata = {}
         if worker_number is None:
-            return requests.post(
+            return self._session.post(
                 url=self._base_url + f"/workflows/{job_id}/status",
                 headers=self._headers,
                 json=dict(
@@ -294,7 +449,7 @@ class API:
                 ),
             ).json()
         else:
-            response = requests.post(
+            response = self._session.post(
                 url=self._base_url + f"/workflows/{job_id}/status",
                 headers=self._headers,
                 json=dict(
@@ -328,7 +483,7 @@ class API:
         metadata: extra parameters associated with operation
         i.e. n_clusters, n_init, softmax_temperature, etc...
         """
-        response = requests.post(
+        response = self._session.post(
             url=self._base_url
             + f"/datasets/{dataset_id}/field_children/{str(uuid.uuid4())}/update",
             headers=self._headers,
@@ -343,7 +498,7 @@ class API:
 
     @retry()
     def _get_health(self, dataset_id: str):
-        response = requests.get(
+        response = self._session.get(
             url=self._base_url + f"/datasets/{dataset_id}/monitor/health",
             headers=self._headers,
         )
@@ -351,14 +506,14 @@ class API:
 
     @retry()
     def _get_workflow_status(self, job_id: str):
-        response = requests.post(
+        response = self._session.post(
             url=self._base_url + f"/workflows/{job_id}/get", headers=self._headers
         )
         return get_response(response)
 
     @retry()
     def _update_workflow_metadata(self, job_id: str, metadata: Dict[str, Any]):
-        response = requests.post(
+        response = self._session.post(
             url=self._base_url + f"/workflows/{job_id}/metadata",
             headers=self._headers,
             json=dict(metadata=metadata),
@@ -367,7 +522,7 @@ class API:
 
     @retry()
     def _get_file_upload_urls(self, dataset_id: str, files: List[str]):
-        response = requests.post(
+        response = self._session.post(
             url=self._base_url + f"/datasets/{dataset_id}/get_file_upload_urls",
             headers=self._headers,
             json=dict(files=files),
@@ -377,7 +532,7 @@ class API:
     @retry()
     def _upload_media(self, presigned_url: str, media_content: bytes):
         # dont use get response since response cannot be json decoded
-        return requests.put(presigned_url, data=media_content)
+        return self._session.put(presigned_url, data=media_content)
 
     @retry()
     def _trigger(
@@ -405,7 +560,7 @@ class API:
             version=version,
         )
         data.update(kwargs)
-        return requests.post(
+        return self._session.post(
             url=self._base_url + f"/workflows/trigger", headers=self._headers, json=data
         ).json()
 
@@ -466,7 +621,7 @@ class API:
         )
         logger.debug("adding progress...")
         logger.debug(params)
-        response = requests.post(
+        response = self._session.post(
             url=self._base_url + f"/workflows/{workflow_id}/progress",
             headers=self._headers,
             json=params,
@@ -481,7 +636,7 @@ class API:
         tags_to_add: List[str],
         filters: List[Filter],
     ):
-        response = requests.post(
+        response = self._session.post(
             url=self._base_url + f"/datasets/{dataset_id}/tags/append",
             headers=self._headers,
             json=dict(
@@ -500,7 +655,7 @@ class API:
         tags_to_delete: List[str],
         filters: List[Filter],
     ):
-        response = requests.post(
+        response = self._session.post(
             url=self._base_url + f"/datasets/{dataset_id}/tags/delete",
             headers=self._headers,
             json=dict(
@@ -519,7 +674,7 @@ class API:
         tags_to_merge: Dict[str, str],
         filters: List[Filter],
     ):
-        response = requests.post(
+        response = self._session.post(
             url=self._base_url + f"/datasets/{dataset_id}/tags/merge",
             headers=self._headers,
             json=dict(
@@ -541,7 +696,7 @@ class API:
         """
         Update keyphrases
         """
-        response = requests.post(
+        response = self._session.post(
             url=self._base_url
             + f"/datasets/{dataset_id}/fields/{field}.{alias}/keyphrase/bulk_update",
             headers=self._headers,
@@ -556,7 +711,7 @@ class API:
         """
         Get keyphrase
         """
-        response = requests.get(
+        response = self._session.get(
             url=self._base_url
             + f"/datasets/{dataset_id}/fields/{field}.{alias}/keyphrase/{keyphrase_id}/get",
             headers=self._headers,
@@ -570,7 +725,7 @@ class API:
         """
         Deleting Keyphrases
         """
-        response = requests.post(
+        response = self._session.post(
             url=self._base_url
             + f"/datasets/{dataset_id}/fields/{field}.{alias}/keyphrase/{keyphrase_id}/delete",
             headers=self._headers,
@@ -585,7 +740,7 @@ class API:
         """
         Update keyphrases
         """
-        response = requests.post(
+        response = self._session.post(
             url=self._base_url
             + f"/datasets/{dataset_id}/fields/{field}.{alias}/keyphrase/{keyphrase_id}/update",
             headers=self._headers,
@@ -605,7 +760,7 @@ class API:
         """
         List keyphrases
         """
-        response = requests.post(
+        response = self._session.post(
             url=self._base_url
             + f"/datasets/{dataset_id}/fields/{field}.{alias}/keyphrase/list",
             headers=self._headers,
@@ -622,7 +777,7 @@ class API:
         page_size: int = 1000,
         asc: bool = False,
     ):
-        response = requests.post(
+        response = self._session.post(
             url=self._base_url + f"/datasets/{dataset_id}/facets",
             headers=self._headers,
             json=dict(
@@ -640,7 +795,7 @@ class API:
         dataset_id: str,
         settings: Optional[Dict[str, Any]] = None,
     ):
-        response = requests.post(
+        response = self._session.post(
             url=self._base_url + f"/datasets/{dataset_id}/settings",
             headers=self._headers,
             json=dict(settings={} if settings is None else settings),
@@ -652,7 +807,7 @@ class API:
         self,
         dataset_id: str,
     ):
-        response = requests.get(
+        response = self._session.get(
             url=self._base_url + f"/datasets/{dataset_id}/settings",
             headers=self._headers,
         )
@@ -662,7 +817,7 @@ class API:
     def _create_deployable(
         self, dataset_id: Optional[str] = None, config: Optional[Dict[str, Any]] = None
     ):
-        response = requests.post(
+        response = self._session.post(
             url=self._base_url + "/deployables/create",
             headers=self._headers,
             json=dict(
@@ -674,7 +829,7 @@ class API:
 
     @retry()
     def _share_dashboard(self, deployable_id: str):
-        response = requests.post(
+        response = self._session.post(
             url=self._base_url + f"/deployablegroups/{deployable_id}/share",
             headers=self._headers,
         )
@@ -682,7 +837,7 @@ class API:
 
     @retry()
     def _unshare_dashboard(self, deployable_id: str):
-        response = requests.post(
+        response = self._session.post(
             url=self._base_url + f"/deployablegroups/{deployable_id}/private",
             headers=self._headers,
         )
@@ -690,7 +845,7 @@ class API:
 
     @retry()
     def _get_deployable(self, deployable_id: str):
-        response = requests.get(
+        response = self._session.get(
             url=self._base_url + f"/deployables/{deployable_id}/get",
             headers=self._headers,
         )
@@ -698,7 +853,7 @@ class API:
 
     @retry()
     def _delete_deployable(self, deployable_id: str):
-        response = requests.post(
+        response = self._session.post(
             url=self._base_url + f"/deployables/delete",
             headers=self._headers,
             json=dict(
@@ -709,7 +864,7 @@ class API:
 
     @retry()
     def _list_deployables(self, page_size: int):
-        response = requests.get(
+        response = self._session.get(
             url=self._base_url + "/deployables/list",
             headers=self._headers,
             params=dict(
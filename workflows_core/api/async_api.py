@@ -0,0 +1,298 @@
+"""
+Asyncio counterpart of `API` for the calls that engines make in a loop.
+
+Requires `aiohttp` (`pip install RelevanceAI-Workflows-Core[asyncio]`).
+
+.. code-block::
+
+    async with AsyncAPI.from_api(dataset.api) as api:
+        page = await api._get_where(dataset_id, page_size=100)
+
+"""
+import asyncio
+import logging
+import traceback
+
+import aiohttp
+import aiohttp.compression_utils
+
+from json import JSONDecodeError
+from functools import wraps
+from typing import Any, Dict, List, Optional
+
+from workflows_core.api.api import API, get_base_url, get_headers
+from workflows_core.types import Credentials, FieldTransformer, Filter
+from workflows_core.utils import document
+from workflows_core.utils.json_encoder import json_dumps
+from workflows_core.api.compression import (
+    check_compression,
+    compress_body,
+    get_accept_encoding,
+)
+
+logger = logging.getLogger(__name__)
+
+# The response encodings that aiohttp decompresses
+DECODABLE_ENCODINGS = ["gzip", "deflate"]
+if getattr(aiohttp.compression_utils, "HAS_ZSTD", False):
+    DECODABLE_ENCODINGS.insert(0, "zstd")
+if getattr(aiohttp.compression_utils, "HAS_BROTLI", False):
+    DECODABLE_ENCODINGS.append("br")
+
+
+async def get_response(response: aiohttp.ClientResponse) -> Dict[str, Any]:
+    # get a json response
+    # if errors - print what the response contains
+    try:
+        return await response.json(content_type=None)
+    except Exception as e:
+        logger.error({"error": e})
+        try:
+            # Log this somewhere if it errors
+            logger.error(await response.read())
+        except Exception as no_content_e:
+            # in case there's no content
+            logger.error(no_content_e)
+        finally:
+            # we still want to raise the right error for retrying
+            # continue to raise exception so that any retry logic still holds
+            raise e
+
+
+def retry(num_of_retries: int = 3, timeout: int = 2):
+    """
+    Allows the coroutine to retry upon failure.
+    Args:
+        num_of_retries: The number of times the function should retry
+        timeout: The number of seconds to wait between each retry
+    """
+
+    def _retry(func):
+        @wraps(func)
+        async def function_wrapper(*args, **kwargs):
+            for i in range(num_of_retries):
+                try:
+                    return await func(*args, **kwargs)
+                # Using general error to avoid any possible error dependencies.
+                except (aiohttp.ClientConnectionError, JSONDecodeError) as error:
+                    logger.debug("Ran into connection or JSON DecodeError")
+                    logger.debug({"error": error, "traceback": traceback.format_exc()})
+                    if i == num_of_retries - 1:
+                        raise error
+                    await asyncio.sleep(timeout)
+                    logger.debug("Retrying...")
+
+        return function_wrapper
+
+    return _retry
+
+
+class AsyncAPI:
+    """
+    Awaitable versions of the `API` calls that engines make once per page.
+
+    The `aiohttp` session is created lazily on first use, so an `AsyncAPI`
+    must be used (and closed) inside a single event loop.
+
+    Parameters
+    -----------
+
+    limit
+        the maximum number of simultaneous connections
+    limit_per_host
+        the maximum number of simultaneous connections to the API host
+    compression
+        "gzip" or "zstd" to compress the bulk request bodies (in an
+        executor) and ask for compressed responses, see `API`
+    compression_threshold
+        bodies smaller than this many bytes are sent uncompressed
+    """
+
+    def __init__(
+        self,
+        credentials: Credentials,
+        job_id: str = None,
+        name: str = None,
+        limit: int = 10,
+        limit_per_host: int = 10,
+        compression: Optional[str] = None,
+        compression_threshold: int = 2**14,
+    ) -> None:
+        check_compression(compression)
+        self._credentials = credentials
+        self._base_url = get_base_url(credentials)
+        self._headers = get_headers(credentials, job_id=job_id, name=name)
+        self._limit = limit
+        self._limit_per_host = limit_per_host
+        self._compression = compression
+        self._compression_threshold = compression_threshold
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    @classmethod
+    def from_api(cls, api: API, **kwargs) -> "AsyncAPI":
+        """
+        Builds an `AsyncAPI` that talks to the same host with the same headers
+        (including the job ID and name set by the workflow) and compression
+        as `api`.
+        """
+        kwargs.setdefault("compression", api._compression)
+        kwargs.setdefault("compression_threshold", api._compression_threshold)
+        async_api = cls(api._credentials, **kwargs)
+        async_api._base_url = api._base_url
+        async_api._headers = dict(api._headers)
+        return async_api
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=self._limit, limit_per_host=self._limit_per_host
+                ),
+                headers=self._headers,
+            )
+        return self._session
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def __aenter__(self) -> "AsyncAPI":
+        return self
+
+    async def __aexit__(self, *args) -> None:
+        await self.close()
+
+    @property
+    def _bulk_headers(self) -> Dict[str, str]:
+        # Extra headers of the bulk endpoints, which ask for compressed responses
+        accept_encoding = get_accept_encoding(self._compression, DECODABLE_ENCODINGS)
+        if accept_encoding is None:
+            return {}
+        return {"Accept-Encoding": accept_encoding}
+
+    async def _post_json(self, url: str, payload: Dict[str, Any]):
+        """
+        Posts `payload` serialized with `json_dumps` and compressed in an
+        executor, so that encoding large pages doesn't block the event loop.
+        """
+        loop = asyncio.get_running_loop()
+        body, headers = await loop.run_in_executor(
+            None,
+            lambda: compress_body(
+                json_dumps(payload),
+                compression=self._compression,
+                threshold=self._compression_threshold,
+            ),
+        )
+        return self.session.post(
+            url=url, data=body, headers={**self._bulk_headers, **headers}
+        )
+
+    @retry()
+    async def _bulk_insert(
+        self,
+        dataset_id: str,
+        documents: List[document.Document],
+        insert_date: bool = True,
+        overwrite: bool = True,
+        update_schema: bool = True,
+        wait_for_update: bool = True,
+        field_transformers: List[FieldTransformer] = None,
+        ingest_in_background: bool = False,
+    ) -> Any:
+        async with await self._post_json(
+            url=self._base_url + f"/datasets/{dataset_id}/documents/bulk_insert",
+            payload=dict(
+                documents=documents,
+                insert_date=insert_date,
+                overwrite=overwrite,
+                update_schema=update_schema,
+                field_transformers=[]
+                if field_transformers is None
+                else field_transformers,
+                ingest_in_background=ingest_in_background,
+                wait_for_update=wait_for_update,
+            ),
+        ) as response:
+            return await get_response(response)
+
+    @retry()
+    async def _bulk_update(
+        self,
+        dataset_id: str,
+        documents: List[document.Document],
+        insert_date: bool = True,
+        ingest_in_background: bool = True,
+        update_schema: bool = True,
+    ) -> Any:
+        async with await self._post_json(
+            url=self._base_url + f"/datasets/{dataset_id}/documents/bulk_update",
+            payload=dict(
+                updates=documents,
+                insert_date=insert_date,
+                ingest_in_background=ingest_in_background,
+                update_schema=update_schema,
+            ),
+        ) as response:
+            return await get_response(response)
+
+    @retry()
+    async def _get_where(
+        self,
+        dataset_id: str,
+        page_size: int,
+        filters: Optional[List[Filter]] = None,
+        sort: Optional[list] = None,
+        select_fields: Optional[List[str]] = None,
+        include_vector: bool = True,
+        random_state: int = 0,
+        is_random: bool = False,
+        after_id: Optional[List] = None,
+        worker_number: int = 0,
+    ):
+        async with self.session.post(
+            url=self._base_url + f"/datasets/{dataset_id}/documents/get_where",
+            headers=self._bulk_headers,
+            json=dict(
+                select_fields=[] if select_fields is None else select_fields,
+                page_size=page_size,
+                sort=[] if sort is None else sort,
+                include_vector=include_vector,
+                filters=[] if filters is None else filters,
+                random_state=random_state,
+                is_random=is_random,
+                after_id=[] if after_id is None else after_id,
+                worker_number=worker_number,
+            ),
+        ) as response:
+            return await get_response(response)
+
+    @retry()
+    async def _update_workflow_progress(
+        self,
+        workflow_id: str,
+        worker_number: int = 0,
+        step: str = "Workflow",
+        n_processed: int = 0,
+        n_total: int = 0,
+    ):
+        """
+        Tracks Workflow Progress
+        """
+        if worker_number is None:
+            worker_number = 0
+        params = dict(
+            worker_number=worker_number,
+            step=step,
+            n_processed=n_processed,
+            n_total=n_total,
+        )
+        logger.debug("adding progress...")
+        logger.debug(params)
+        async with self.session.post(
+            url=self._base_url + f"/workflows/{workflow_id}/progress",
+            json=params,
+        ) as response:
+            return await get_response(response)
@@ -1,6 +1,6 @@
 from typing import Optional, Dict, Any
 
-from workflows_core.api.api import API
+from workflows_core.api.api import API, SessionPool
 from workflows_core.api.helpers import process_token
 from workflows_core.dataset.dataset import Dataset
 from workflows_core.types import Schema
@@ -10,11 +10,11 @@ from workflows_core.workflow.simple_workflow import SimpleWorkflow
 
 
 class Client:
-    def __init__(self, token: str) -> None:
+    def __init__(self, token: str, session_pool: Optional[SessionPool] = None) -> None:
 
         self._credentials = process_token(token)
         self._token = token
-        self._api = API(credentials=self._credentials)
+        self._api = API(credentials=self._credentials, session_pool=session_pool)
 
         try:
             self.list_datasets()["datasets"]
@@ -63,5 +63,6 @@ class Client:
             additional_information=additional_information,
             send_email=send_email,
             worker_number=worker_number,
+            session_pool=self._api.session_pool,
             **kwargs,
         )
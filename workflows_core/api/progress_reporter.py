@@ -0,0 +1,162 @@
+"""
+Throttled workflow progress updates.
+
+Engines report their progress after every page, which with small pages can
+mean as many `/workflows/{id}/progress` requests as data requests.
+`ProgressReporter.update` only records the latest progress and returns
+straight away. A background thread sends it at most every `min_interval`
+seconds, or sooner when it moved by `min_fraction` of the total, skipping
+the updates in between. `flush` waits until the latest progress is sent;
+engines and workflows flush when they finish or fail so that the final
+progress is never dropped.
+
+.. code-block::
+
+    reporter = ProgressReporter(api, job_id, step="Workflow")
+    for n_processed in range(0, 1000, 10):
+        reporter.update(n_processed, 1000)  # sends a few of these
+    reporter.flush()  # sends 990 / 1000
+
+"""
+import logging
+import threading
+import time
+
+from typing import Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class ProgressReporter:
+    """
+    Sends the latest progress of a workflow from a background thread.
+
+    Parameters
+    -----------
+
+    api
+        the `API` to send the progress with
+    workflow_id
+        the job id of the workflow
+    worker_number
+        the worker the progress is for
+    step
+        the name of the workflow step
+    min_interval
+        the minimum number of seconds between two progress requests
+    min_fraction
+        a progress update that moved by at least this fraction of the total
+        since the last one sent (0.01 is 1%) is sent without waiting for
+        `min_interval`
+    """
+
+    def __init__(
+        self,
+        api,
+        workflow_id: str,
+        worker_number: Optional[int] = None,
+        step: str = "Workflow",
+        min_interval: float = 5.0,
+        min_fraction: float = 0.01,
+    ):
+        assert min_interval >= 0, "min_interval can't be negative"
+        assert min_fraction >= 0, "min_fraction can't be negative"
+        self._api = api
+        self._workflow_id = workflow_id
+        self._worker_number = worker_number
+        self._step = step
+        self._min_interval = min_interval
+        self._min_fraction = min_fraction
+
+        self._condition = threading.Condition()
+        # (n_processed, n_total) of the latest update and of the last one sent
+        self._pending: Optional[Tuple[int, int]] = None
+        self._sent: Optional[Tuple[int, int]] = None
+        self._sent_time = -float("inf")
+        self._flushing = 0
+        self._requests = 0
+        # Only runs while there is progress to send
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def workflow_id(self) -> str:
+        return self._workflow_id
+
+    @property
+    def requests(self) -> int:
+        """
+        The number of progress requests sent so far.
+        """
+        return self._requests
+
+    def update(self, n_processed: int, n_total: int) -> None:
+        """
+        Records the progress, to be sent by the background thread.
+        """
+        with self._condition:
+            self._pending = (n_processed, n_total)
+            if self._pending == self._sent:
+                return
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="ProgressReporter", daemon=True
+                )
+                self._thread.start()
+            else:
+                self._condition.notify_all()
+
+    def flush(self) -> None:
+        """
+        Blocks until the latest progress is sent.
+        """
+        with self._condition:
+            self._flushing += 1
+            try:
+                self._condition.notify_all()
+                while self._thread is not None:
+                    self._condition.wait()
+            finally:
+                self._flushing -= 1
+
+    def _wait_time(self) -> Optional[float]:
+        # Seconds until the pending progress can be sent, called with the
+        # lock held and progress to send
+        if self._flushing or self._sent is None:
+            return 0.0
+        (n_processed, n_total), (n_sent, _) = self._pending, self._sent
+        if n_total and abs(n_processed - n_sent) >= self._min_fraction * n_total:
+            return 0.0
+        return self._sent_time + self._min_interval - time.monotonic()
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while True:
+                    if self._pending == self._sent:
+                        # Nothing left to send, a later update starts a new thread
+                        self._thread = None
+                        self._condition.notify_all()
+                        return
+                    wait_time = self._wait_time()
+                    if wait_time <= 0:
+                        break
+                    self._condition.wait(wait_time)
+                progress = self._pending
+
+            n_processed, n_total = progress
+            try:
+                self._api._update_workflow_progress(
+                    workflow_id=self._workflow_id,
+                    worker_number=self._worker_number,
+                    step=self._step,
+                    n_processed=n_processed,
+                    n_total=n_total,
+                )
+            except Exception as e:
+                # Progress is informative, a failed update doesn't fail the workflow
+                logger.warning(f"Failed to update the workflow progress: {e}")
+
+            with self._condition:
+                self._requests += 1
+                self._sent = progress
+                self._sent_time = time.monotonic()
@@ -96,6 +96,10 @@ class BaseTransformConfig(BaseConfig):
     transform_chunksize: Optional[int] = Field(
         default=20, description="How many do you want to transform each time?"
     )
+    transform_workers: Optional[int] = Field(
+        default=1,
+        description="How many transform chunks do you want to run at the same time on threads?",
+    )
     refresh: Optional[bool] = Field(
         default=False,
         description="If True, re-runs the workflow on the entire dataset.",
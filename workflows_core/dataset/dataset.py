@@ -1,6 +1,7 @@
 import time
 import logging
 import requests
+import threading
 
 from json import JSONDecodeError
 from typing import Any, Dict, List, Optional, Union
@@ -9,8 +10,11 @@ from workflows_core.api.api import API
 from workflows_core.types import Filter, Schema
 from workflows_core.errors import MaxRetriesError
 from workflows_core.dataset.field import Field, KeyphraseField, VectorField
+from workflows_core.dataset.page_cache import PageCache, get_cache_key
 from workflows_core.utils.document import Document
 from workflows_core.utils.document_list import DocumentList
+from workflows_core.utils.columnar_document_list import ColumnarDocumentList
+from workflows_core.utils.document_stream import DocumentStream
 
 
 logging.basicConfig(level=logging.DEBUG)
@@ -18,10 +22,35 @@ logger = logging.getLogger()
 
 
 class Dataset:
-    def __init__(self, api: API, dataset_id: str):
+    def __init__(self, api: API, dataset_id: str, schema_ttl: float = 60.0):
+        """
+        Parameters
+        -----------
+
+        schema_ttl
+            the number of seconds the schema is cached for. Inserting
+            documents or updating them with `update_schema=True` through
+            the dataset refreshes it, call `invalidate_schema` when the
+            schema changed elsewhere. 0 fetches it on every access.
+        """
         self._api = api
         self._dataset_id = dataset_id
 
+        self._schema_ttl = schema_ttl
+        self._schema: Optional[Schema] = None
+        self._schema_time = 0.0
+        self._schema_lock = threading.Lock()
+
+    def __getstate__(self):
+        # Locks can't be sent to another process (e.g. Ray tasks)
+        state = dict(self.__dict__)
+        del state["_schema_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._schema_lock = threading.Lock()
+
     def __getitem__(self, index: str) -> Field:
         if isinstance(index, str):
             if "_vector_" in index:
@@ -42,7 +71,22 @@ class Dataset:
 
     @property
     def schema(self) -> Schema:
-        return self._api._get_schema(self._dataset_id)
+        with self._schema_lock:
+            if (
+                self._schema is None
+                or time.monotonic() - self._schema_time >= self._schema_ttl
+            ):
+                self._schema = self._api._get_schema(self._dataset_id)
+                self._schema_time = time.monotonic()
+            # a copy, so that callers can't change the cached schema
+            return dict(self._schema)
+
+    def invalidate_schema(self) -> None:
+        """
+        Fetches the schema again on the next access.
+        """
+        with self._schema_lock:
+            self._schema = None
 
     @property
     def api(self) -> API:
@@ -52,23 +96,22 @@ class Dataset:
         return self._api._get_health(self._dataset_id)
 
     def create(self):
+        self.invalidate_schema()
         return self._api._create_dataset(self._dataset_id)
 
     def delete(self):
+        self.invalidate_schema()
         return self._api._delete_dataset(self._dataset_id)
 
     def insert_documents(
         self, documents: Union[List[Document], DocumentList], *args, **kwargs
     ) -> Dict[str, Any]:
-        if hasattr(documents, "to_json"):
-            documents = documents.to_json()
-        else:
-            for index in range(len(documents)):
-                if hasattr(documents[index], "to_json"):
-                    documents[index] = documents[index].to_json()
-        return self._api._bulk_insert(
+        # The documents are converted while the request body is serialized
+        result = self._api._bulk_insert(
             dataset_id=self._dataset_id, documents=documents, *args, **kwargs
         )
+        self.invalidate_schema()
+        return result
 
     def update_documents(
         self,
@@ -77,19 +120,17 @@ class Dataset:
         ingest_in_background: bool = True,
         update_schema: bool = True,
     ) -> Dict[str, Any]:
-        if hasattr(documents, "to_json"):
-            documents = documents.to_json()
-        else:
-            for index in range(len(documents)):
-                if hasattr(documents[index], "to_json"):
-                    documents[index] = documents[index].to_json()
-        return self._api._bulk_update(
+        # The documents are converted while the request body is serialized
+        result = self._api._bulk_update(
             dataset_id=self._dataset_id,
             documents=documents,
             insert_date=insert_date,
             ingest_in_background=ingest_in_background,
             update_schema=update_schema,
         )
+        if update_schema:
+            self.invalidate_schema()
+        return result
 
     def get_documents(
         self,
@@ -102,8 +143,31 @@ class Dataset:
         is_random: bool = False,
         after_id: Optional[List] = None,
         worker_number: int = 0,
-    ) -> Dict[str, Any]:
-        res = self._api._get_where(
+        columnar: bool = False,
+        stream: bool = False,
+        page_cache: Optional[PageCache] = None,
+    ) -> Union[Dict[str, Any], DocumentStream]:
+        """
+        Parameters
+        -----------
+
+        columnar
+            if True, the documents are returned as a `ColumnarDocumentList`
+            (requires pyarrow) instead of a `DocumentList`. The response is
+            streamed and decoded into the columns one document at a time,
+            without building the page of Python documents first.
+        stream
+            if True, returns a `DocumentStream` that yields the documents
+            while the response is downloaded, with the vectors stored as
+            float32 arrays. `stream["after_id"]` and `stream["count"]` are
+            available once the documents are consumed. With `columnar=True`
+            a `ColumnarDocumentList` is returned instead.
+        page_cache
+            if set, the page is read from this `PageCache` when it has been
+            downloaded before, and cached otherwise. Cached pages are not
+            streamed.
+        """
+        parameters = dict(
             dataset_id=self._dataset_id,
             page_size=page_size,
             filters=filters,
@@ -115,7 +179,29 @@ class Dataset:
             after_id=after_id,
             worker_number=worker_number,
         )
-        res["documents"] = DocumentList(res["documents"])
+        if page_cache is None:
+            res = self._api._get_where(**parameters, stream=stream or columnar)
+        else:
+            # Datasets of other projects can have the same id
+            credentials = self._api._credentials
+            key = get_cache_key(
+                project=credentials.project, region=credentials.region, **parameters
+            )
+            res = page_cache.get(key)
+            if res is None:
+                res = self._api._get_where(**parameters)
+                # The end of the dataset (and errors) may change between runs
+                if res.get("documents"):
+                    page_cache.put(key, res)
+
+        if isinstance(res, DocumentStream):
+            if not columnar:
+                return res
+            return res.read(columnar=True)
+        if columnar:
+            res["documents"] = ColumnarDocumentList.from_documents(res["documents"])
+        else:
+            res["documents"] = DocumentList(res["documents"])
         return res
 
     def get_all_documents(
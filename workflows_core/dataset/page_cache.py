@@ -0,0 +1,279 @@
+"""
+A local cache of `get_where` pages, and of the cursors of the engines that
+read them.
+
+Pages are stored one file per page, keyed by everything that determines
+the response (project, region, dataset, filters, select fields, page size,
+`after_id`...). Each file is a NumPy `.npz` archive: the top-level vector
+fields are float64 matrices, read back without parsing float text, and the
+rest of the response is gzipped JSON. The least recently used pages are
+removed once the cache is larger than `max_bytes`. Reruns and retries of a
+workflow then read the pages it already downloaded from disk.
+
+The cache also keeps the `after_id` of the last page an engine uploaded, so
+that an engine that crashed resumes from there instead of from the start.
+The cursor is removed when the engine reaches the end of the dataset.
+
+Only use the cache for fields that don't change between runs: a cached
+page is returned as it was downloaded.
+
+.. code-block::
+
+    cache = PageCache("/mnt/cache", max_bytes=2**32)
+    engine = StableEngine(dataset, operator, page_cache=cache)
+
+"""
+import gzip
+import hashlib
+import io
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+import zipfile
+
+import numpy as np
+
+from typing import Any, Callable, Dict, List, Optional
+
+from workflows_core.utils.json_encoder import json_dumps
+
+logger = logging.getLogger(__name__)
+
+_PAGE_SUFFIX = ".page"
+_CURSOR_SUFFIX = ".cursor"
+
+# Float text compresses about as well at the fastest level
+GZIP_LEVEL = 1
+
+
+def get_cache_key(**parameters: Any) -> str:
+    """
+    A file name safe key for the `get_where` parameters.
+    """
+    parameters = dict(sorted(parameters.items()))
+    return hashlib.sha256(json_dumps(parameters)).hexdigest()
+
+
+def _is_float_vector(value: Any) -> bool:
+    return (
+        isinstance(value, list)
+        and len(value) > 0
+        and all(type(number) is float for number in value)
+    )
+
+
+def _get_vector_fields(documents: List[Dict[str, Any]]) -> List[str]:
+    # The top-level vector fields whose values are all lists of floats of
+    # the same length, which are stored as matrices
+    fields = sorted({key for document in documents for key in document})
+    vector_fields = []
+    for field in fields:
+        if "_vector_" not in field:
+            continue
+        values = [document[field] for document in documents if field in document]
+        if all(_is_float_vector(value) for value in values) and (
+            len({len(value) for value in values}) == 1
+        ):
+            vector_fields.append(field)
+    return vector_fields
+
+
+def _pack(response: Dict[str, Any]) -> bytes:
+    documents = response.get("documents") or []
+    vector_fields = _get_vector_fields(documents)
+    arrays = {}
+    for index, field in enumerate(vector_fields):
+        arrays[f"present_{index}"] = np.array(
+            [field in document for document in documents], dtype=bool
+        )
+        arrays[f"vectors_{index}"] = np.array(
+            [document[field] for document in documents if field in document],
+            dtype=np.float64,
+        )
+    if vector_fields:
+        documents = [
+            {key: value for key, value in document.items() if key not in vector_fields}
+            for document in documents
+        ]
+        response = {**response, "documents": documents}
+
+    metadata = json_dumps(dict(response=response, vector_fields=vector_fields))
+    arrays["metadata"] = np.frombuffer(
+        gzip.compress(metadata, compresslevel=GZIP_LEVEL), dtype=np.uint8
+    )
+    buffer = io.BytesIO()
+    np.savez(buffer, **arrays)
+    return buffer.getvalue()
+
+
+def _unpack(data: bytes) -> Dict[str, Any]:
+    with np.load(io.BytesIO(data), allow_pickle=False) as arrays:
+        metadata = json.loads(gzip.decompress(arrays["metadata"].tobytes()))
+        response = metadata["response"]
+        documents = response.get("documents") or []
+        for index, field in enumerate(metadata["vector_fields"]):
+            rows = np.flatnonzero(arrays[f"present_{index}"]).tolist()
+            # tolist converts the whole matrix to Python floats in C
+            vectors = arrays[f"vectors_{index}"].tolist()
+            for row, vector in zip(rows, vectors):
+                documents[row][field] = vector
+    return response
+
+
+class PageCache:
+    """
+    Size bounded, least recently used cache of `get_where` responses.
+
+    Parameters
+    -----------
+
+    directory
+        where to store the pages, a `workflows_page_cache` directory in the
+        system's temporary directory by default
+    max_bytes
+        the maximum size of the cached pages on disk
+    clock
+        returns the time a page is used at, which decides the order pages
+        are evicted in. The modification time of the page files is set to it
+        so that the order carries over to the next runs.
+    """
+
+    def __init__(
+        self,
+        directory: Optional[str] = None,
+        max_bytes: int = 2**30,
+        clock: Callable[[], float] = time.time,
+    ):
+        assert max_bytes > 0, "max_bytes should be positive"
+        if directory is None:
+            directory = os.path.join(tempfile.gettempdir(), "workflows_page_cache")
+        os.makedirs(directory, exist_ok=True)
+        self._directory = directory
+        self._max_bytes = max_bytes
+        self._clock = clock
+        self._lock = threading.Lock()
+
+        # Pages from previous runs count towards the size too
+        self._size = sum(
+            os.path.getsize(path)
+            for path in self._paths(_PAGE_SUFFIX)
+            if os.path.exists(path)
+        )
+
+    @property
+    def directory(self) -> str:
+        return self._directory
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def _paths(self, suffix: str) -> List[str]:
+        return [
+            os.path.join(self._directory, name)
+            for name in os.listdir(self._directory)
+            if name.endswith(suffix)
+        ]
+
+    def _write(self, path: str, data: bytes) -> None:
+        # Write then rename so that a crash never leaves half a file
+        descriptor, temporary_path = tempfile.mkstemp(dir=self._directory)
+        with os.fdopen(descriptor, "wb") as file:
+            file.write(data)
+        os.replace(temporary_path, path)
+
+    def _touch(self, path: str) -> None:
+        now = self._clock()
+        os.utime(path, times=(now, now))
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        The cached response for `key`, or None.
+        """
+        path = os.path.join(self._directory, key + _PAGE_SUFFIX)
+        try:
+            with self._lock:
+                with open(path, "rb") as file:
+                    data = file.read()
+                # mark as recently used
+                self._touch(path)
+        except FileNotFoundError:
+            return None
+        try:
+            return _unpack(data)
+        except (OSError, EOFError, ValueError, KeyError, zipfile.BadZipFile) as e:
+            logger.warning(f"Ignoring corrupt cached page {path}: {e}")
+            return None
+
+    def put(self, key: str, response: Dict[str, Any]) -> None:
+        """
+        Caches `response`, then removes the least recently used pages until
+        the cache fits in `max_bytes`.
+        """
+        data = _pack(response)
+        if len(data) > self._max_bytes:
+            return
+        path = os.path.join(self._directory, key + _PAGE_SUFFIX)
+        with self._lock:
+            if os.path.exists(path):
+                self._size -= os.path.getsize(path)
+            self._write(path, data)
+            self._touch(path)
+            self._size += len(data)
+            if self._size > self._max_bytes:
+                self._evict()
+
+    def _evict(self) -> None:
+        pages = []
+        for path in self._paths(_PAGE_SUFFIX):
+            try:
+                pages.append((os.path.getmtime(path), os.path.getsize(path), path))
+            except FileNotFoundError:
+                continue
+        self._size = sum(size for _, size, _ in pages)
+        for _, size, path in sorted(pages):
+            if self._size <= self._max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            self._size -= size
+
+    def clear(self) -> None:
+        """
+        Removes every cached page, but not the cursors.
+        """
+        with self._lock:
+            for path in self._paths(_PAGE_SUFFIX):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            self._size = 0
+
+    def get_cursor(self, name: str) -> Optional[List]:
+        """
+        The `after_id` saved with `set_cursor`, or None.
+        """
+        try:
+            with open(os.path.join(self._directory, name + _CURSOR_SUFFIX)) as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return None
+
+    def set_cursor(self, name: str, after_id: Optional[List]) -> None:
+        """
+        Saves `after_id` as the cursor `name`, or removes it when None.
+        """
+        path = os.path.join(self._directory, name + _CURSOR_SUFFIX)
+        if after_id is None:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        else:
+            self._write(path, json_dumps(after_id))
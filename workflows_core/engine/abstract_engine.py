@@ -2,15 +2,32 @@ from json import JSONDecodeError
 import math
 import time
 import logging
+import threading
 import warnings
 
-from typing import Any, List, Optional
+from collections import deque
+from typing import Any, Dict, List, Optional, Union
 from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
 
 from workflows_core.types import Filter
+from workflows_core.api.progress_reporter import ProgressReporter
 from workflows_core.dataset.dataset import Dataset
+from workflows_core.dataset.page_cache import PageCache, get_cache_key
+from workflows_core.engine.checkpoint import CheckpointStore, LocalFileCheckpointStore
+from workflows_core.engine.chunk_controller import (
+    AdaptiveChunkController,
+    estimate_size,
+)
+from workflows_core.engine.helpers import (
+    get_shard_filter,
+    merge,
+    merge_results,
+    split_documents,
+)
 from workflows_core.operator.abstract_operator import AbstractOperator
 from workflows_core.utils.document_list import DocumentList
+from workflows_core.utils.document_stream import DocumentStream
 from workflows_core.errors import MaxRetriesError
 from workflows_core.utils import set_seed
 
@@ -22,6 +39,8 @@ logger = logging.getLogger(__name__)
 
 class AbstractEngine(ABC):
     MAX_SCHEMA_UPDATE_LIMITER: int = 1
+    # Whether the engine saves checkpoints and resumes from them
+    SUPPORTS_CHECKPOINTS: bool = False
 
     def __init__(
         self,
@@ -36,43 +55,122 @@ class AbstractEngine(ABC):
         total_workers: int = None,
         check_for_missing_fields: bool = True,
         seed: int = 42,
+        columnar: bool = False,
+        stream: bool = False,
+        chunk_controller: Optional[AdaptiveChunkController] = None,
+        max_upload_bytes: Optional[int] = None,
+        max_upload_documents: Optional[int] = None,
+        upload_workers: int = 1,
+        read_shards: int = 1,
+        page_cache: Optional[PageCache] = None,
+        checkpoint_store: Union[CheckpointStore, bool, None] = None,
+        progress_interval: float = 5.0,
+        progress_fraction: float = 0.01,
+        lazy: bool = False,
     ):
+        """
+        Parameters
+        -----------
+
+        columnar
+            if True, pages are downloaded as `ColumnarDocumentList`s, which
+            operators created with `columnar=True` transform column by
+            column. Other operators get them as a `DocumentList`.
+        stream
+            if True, pages are decoded while they are downloaded instead of
+            from the whole response body, and their vector fields are stored
+            as float32 arrays instead of lists of Python floats. Operators
+            transform whole pages, so each page is still read into memory
+            before it is transformed; with `columnar=True` it is decoded
+            straight into columns.
+        chunk_controller
+            an `AdaptiveChunkController` that picks the size of each page
+            from the measured `get_where` and `bulk_update` times and payload
+            sizes, starting from its `initial_chunksize` instead of
+            `pull_chunksize`. Its decisions are in `stats`.
+        max_upload_bytes
+            if set, the documents of a page are uploaded in batches whose
+            serialized size is at most this many bytes
+        max_upload_documents
+            if set, the documents of a page are uploaded in batches of at
+            most this many documents
+        upload_workers
+            the number of batches of a page that are uploaded at the same
+            time. Each batch is retried on its own.
+        read_shards
+            the number of cursors that read this worker's documents at the
+            same time, each over a `matchModulo` sub-shard of them. Their
+            pages are transformed in the order they arrive.
+        page_cache
+            a `PageCache` that pages are read from when they were downloaded
+            before. The StableEngine also saves the `after_id` of the last
+            page it uploaded in it, and `Workflow.run` resumes from it when
+            the same job is run again with the same operator, dataset,
+            filters and select fields after a run that didn't finish.
+        checkpoint_store
+            a `CheckpointStore` that a checkpoint is saved in after each
+            uploaded page. `Workflow.run` resumes from the checkpoint of its
+            `job_id` when there is one. By default, engines that support
+            checkpoints and read with one cursor use a
+            `LocalFileCheckpointStore` in `default_checkpoint_directory()`.
+            False runs without checkpoints. See
+            `workflows_core/engine/checkpoint.py`.
+        progress_interval
+            the minimum number of seconds between two workflow progress
+            requests, the progress in between is coalesced and sent from a
+            background thread
+        progress_fraction
+            progress that moved by this fraction of the documents since the
+            last request is sent without waiting for `progress_interval`
+        lazy
+            if True, creating the engine sends no request: the select fields
+            are checked against the schema when the engine starts iterating,
+            and the number of documents is taken from the `count` of the
+            first page, or fetched when `size` or `num_chunks` are needed
+            before that. Requires an integer `pull_chunksize` or a
+            `chunk_controller`.
+        """
         set_seed(seed)
-        if select_fields is not None:
-            # We set this to a warning so that workflows that are adding
-            # onto an existing field don't need this. For example - adding tags
-            # to existing tags. If existing tags don't exist - it shouldn't break
-            # the whole workflow. This allows for multiple workflows to be run in parallel
-            # without worrying about breaking things.
-            if check_for_missing_fields:
-                assert all(
-                    field in dataset.schema
-                    for field in select_fields
-                    if field not in {"_id", "insert_date_"}
-                ), f"Some fields not in dataset schema - namely {select_fields}. If this is not desired behavior, set check_for_missing_fields=False."
-            else:
-                for field in select_fields:
-                    if field not in ["_id", "insert_date_"]:
-                        if field not in dataset.schema:
-                            warnings.warn(f"Not all fields were found. Missing {field}")
-
         self._dataset = dataset
         self._select_fields = select_fields
+        self._check_for_missing_fields = check_for_missing_fields
+        self._select_fields_checked = False
+        if not lazy:
+            self._check_select_fields()
+
         self.worker_number = worker_number
         self.total_workers = total_workers
         if filters is None:
             filters = []
         filters += self._get_workflow_filter()
-        self._size = dataset.len(filters=filters)
 
+        assert upload_workers > 0, "upload_workers should be a Positive Integer"
+        assert read_shards > 0, "read_shards should be a Positive Integer"
+        assert (
+            after_id is None or read_shards == 1
+        ), "after_id can't be used to resume reading with read_shards > 1"
+        self._max_upload_bytes = max_upload_bytes
+        self._max_upload_documents = max_upload_documents
+        self._upload_workers = upload_workers
+
+        self._chunk_controller = chunk_controller
+        if chunk_controller is not None:
+            pull_chunksize = chunk_controller.chunksize
+
+        # Set from the first page when lazy
+        self._size: Optional[int] = None
+        self._num_chunks: Optional[int] = None
         if isinstance(pull_chunksize, int):
             assert pull_chunksize > 0, "Chunksize should be a Positive Integer"
             self._pull_chunksize = pull_chunksize
-            self._num_chunks = math.ceil(self._size / pull_chunksize)
+            if not lazy:
+                self._set_size(dataset.len(filters=filters))
         else:
+            assert not lazy, "lazy needs an integer pull_chunksize"
             warnings.warn(
                 f"`chunksize=None` assumes the operation transforms on the entire dataset at once"
             )
+            self._size = dataset.len(filters=filters)
             self._pull_chunksize = self._size
             self._num_chunks = 1
 
@@ -85,12 +183,69 @@ class AbstractEngine(ABC):
 
         self._refresh = refresh
         self._after_id = after_id
+        self._read_shards = read_shards
+
+        self._page_cache = page_cache
+        # The `after_id` of each page that was read, in order, until the page
+        # is uploaded
+        self._page_cursors: deque = deque()
+        # What the documents read depend on, the job and operator are added
+        # once the engine is given a `job_id`
+        self._cursor_parameters = dict(
+            dataset_id=dataset.dataset_id,
+            filters=list(self._filters),
+            select_fields=select_fields,
+            worker_number=worker_number,
+            total_workers=total_workers,
+        )
+
+        if checkpoint_store is None:
+            if self.SUPPORTS_CHECKPOINTS and read_shards == 1:
+                checkpoint_store = LocalFileCheckpointStore()
+        elif checkpoint_store is False:
+            checkpoint_store = None
+        else:
+            assert (
+                self.SUPPORTS_CHECKPOINTS
+            ), f"{type(self).__name__} does not support checkpoint_store"
+            assert (
+                read_shards == 1
+            ), "checkpoint_store can't be used with read_shards > 1"
+        self._checkpoint_store: Optional[CheckpointStore] = checkpoint_store
+        # The checkpoint the engine resumes from
+        self._checkpoint: Optional[Dict[str, Any]] = None
+        # The number of error logs already appended to the checkpoint store
+        self._saved_error_count = 0
+
+        self._columnar = columnar
+        self._stream = stream
 
         self._success_ratio = None
         self._error_logs = None
 
+        # Measured by iterate and update_chunk, possibly on other threads
+        self._stats: Dict[str, Any] = dict(
+            pages_read=0,
+            documents_read=0,
+            read_seconds=0.0,
+            pages_written=0,
+            documents_written=0,
+            write_seconds=0.0,
+        )
+        self._stats_lock = threading.Lock()
+
+        self._progress_interval = progress_interval
+        self._progress_fraction = progress_fraction
+        self._progress_reporter: Optional[ProgressReporter] = None
+        self._progress_lock = threading.Lock()
+        # The number of documents processed and uploaded so far. Counted
+        # instead of derived from the pages, whose size can change
+        self._n_processed = 0
+
     @property
     def num_chunks(self) -> int:
+        if self._num_chunks is None:
+            self._set_size(self._dataset.len(filters=self._filters))
         return self._num_chunks
 
     @property
@@ -107,15 +262,85 @@ class AbstractEngine(ABC):
 
     @property
     def size(self) -> int:
+        if self._size is None:
+            self._set_size(self._dataset.len(filters=self._filters))
         return self._size
 
+    def _set_size(self, size: int) -> None:
+        self._size = size
+        self._num_chunks = self._get_num_chunks(size)
+
+    def _get_num_chunks(self, size: int) -> int:
+        return math.ceil(size / self._pull_chunksize)
+
+    def _check_select_fields(self) -> None:
+        self._select_fields_checked = True
+        if self._select_fields is None:
+            return
+        # We set this to a warning so that workflows that are adding
+        # onto an existing field don't need this. For example - adding tags
+        # to existing tags. If existing tags don't exist - it shouldn't break
+        # the whole workflow. This allows for multiple workflows to be run in parallel
+        # without worrying about breaking things.
+        schema = self._dataset.schema
+        if self._check_for_missing_fields:
+            assert all(
+                field in schema
+                for field in self._select_fields
+                if field not in {"_id", "insert_date_"}
+            ), f"Some fields not in dataset schema - namely {self._select_fields}. If this is not desired behavior, set check_for_missing_fields=False."
+        else:
+            for field in self._select_fields:
+                if field not in ["_id", "insert_date_"]:
+                    if field not in schema:
+                        warnings.warn(f"Not all fields were found. Missing {field}")
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        """
+        The number of pages and documents read and written, the seconds spent
+        in `get_where` and `bulk_update`, the current `pull_chunksize` and, with
+        a `chunk_controller`, its page size decisions.
+        """
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["pull_chunksize"] = self._pull_chunksize
+        if self._chunk_controller is not None:
+            stats["chunk_controller"] = self._chunk_controller.stats
+        return stats
+
+    def _record_read(self, documents, seconds: float) -> None:
+        with self._stats_lock:
+            self._stats["pages_read"] += 1
+            self._stats["documents_read"] += len(documents)
+            self._stats["read_seconds"] += seconds
+        if self._chunk_controller is not None:
+            self._chunk_controller.record_read(
+                len(documents), seconds, estimate_size(documents)
+            )
+            self._pull_chunksize = self._chunk_controller.chunksize
+
+    def _record_write(self, documents, seconds: float) -> None:
+        with self._stats_lock:
+            self._stats["pages_written"] += 1
+            self._stats["documents_written"] += len(documents)
+            self._stats["write_seconds"] += seconds
+        if self._chunk_controller is not None:
+            self._chunk_controller.record_write(
+                len(documents), seconds, estimate_size(documents)
+            )
+            self._pull_chunksize = self._chunk_controller.chunksize
+
     @abstractmethod
     def apply(self) -> None:
         raise NotImplementedError
 
     def __call__(self) -> Any:
         self.operator.pre_hooks(self._dataset)
-        self.apply()
+        try:
+            self.apply()
+        finally:
+            self.flush_progress()
         self.operator.post_hooks(self._dataset)
 
     def _get_workflow_filter(self, field: str = "_id"):
@@ -135,12 +360,26 @@ class AbstractEngine(ABC):
                 ]
         return []
 
+    def _get_read_shard_filter(self, shard: int, field: str = "_id"):
+        # One of the `read_shards` sub-shards of this worker's documents
+        return get_shard_filter(
+            shard,
+            self._read_shards,
+            worker_number=self.worker_number,
+            total_workers=self.total_workers,
+            field=field,
+        )
+
     def iterate(
         self,
         filters: Optional[List[Filter]] = None,
         select_fields: Optional[List[str]] = None,
         max_retries: int = 5,
     ):
+        if not self._select_fields_checked:
+            # Lazy engines check them when the first page is needed
+            self._check_select_fields()
+
         if filters is None:
             filters = self._filters
 
@@ -149,16 +388,51 @@ class AbstractEngine(ABC):
         if select_fields is None:
             select_fields = self._select_fields
 
+        if self._read_shards == 1:
+            yield from self._iterate_shard(filters, select_fields, max_retries)
+            return
+
+        # One cursor per sub-shard, each on its own thread
+        yield from merge(
+            [
+                self._iterate_shard(
+                    filters + self._get_read_shard_filter(shard),
+                    select_fields,
+                    max_retries,
+                    shard=shard,
+                )
+                for shard in range(self._read_shards)
+            ],
+            max_prefetch=self._read_shards,
+        )
+
+    def _iterate_shard(
+        self,
+        filters: List[Filter],
+        select_fields: Optional[List[str]],
+        max_retries: int = 5,
+        shard: Optional[int] = None,
+    ):
+        # Follows the `after_id` cursor of one sub-shard, or of all the
+        # documents when `shard` is None
+        after_id = self._after_id if shard is None else None
         retry_count = 0
         while True:
             try:
+                start_time = time.perf_counter()
                 chunk = self._dataset.get_documents(
                     self._pull_chunksize,
                     filters=filters,
                     select_fields=select_fields,
-                    after_id=self._after_id,
+                    after_id=after_id,
                     worker_number=self.worker_number,
+                    columnar=self._columnar,
+                    stream=self._stream,
+                    page_cache=self._page_cache,
                 )
+                if isinstance(chunk, DocumentStream):
+                    # operators transform whole pages
+                    chunk = chunk.read()
             except (ConnectionError, JSONDecodeError) as e:
                 logger.error(e)
                 retry_count += 1
@@ -167,12 +441,113 @@ class AbstractEngine(ABC):
                 if retry_count >= max_retries:
                     raise MaxRetriesError("max number of retries exceeded")
             else:
-                self._after_id = chunk["after_id"]
+                after_id = chunk["after_id"]
+                if shard is None:
+                    self._after_id = after_id
+                if shard is None and self._size is None and "count" in chunk:
+                    # Lazy engines learn the number of documents from the first page
+                    self._set_size(chunk["count"])
                 if not chunk["documents"]:
                     break
+                if shard is None and (
+                    self._page_cache is not None or self._checkpoint_store is not None
+                ):
+                    self._page_cursors.append(after_id)
+                self._record_read(chunk["documents"], time.perf_counter() - start_time)
                 yield chunk["documents"]
                 retry_count = 0
 
+    @property
+    def cursor_name(self) -> str:
+        """
+        The name of the engine's cursor in the page cache. It depends on the
+        job and the operator as well as on the documents read, so that a run
+        never resumes from where a different workflow stopped.
+        """
+        operator = self.operator
+        return get_cache_key(
+            job_id=self.job_id,
+            operator=f"{type(operator).__module__}.{type(operator).__qualname__}",
+            input_fields=getattr(operator, "_input_fields", None),
+            output_fields=getattr(operator, "_output_fields", None),
+            **self._cursor_parameters,
+        )
+
+    def _load_cursor(self) -> None:
+        # Resumes from the cursor the same job left in the page cache
+        if (
+            self._page_cache is not None
+            and self._after_id is None
+            and self._read_shards == 1
+        ):
+            cursor = self._page_cache.get_cursor(self.cursor_name)
+            if cursor is not None:
+                logger.info(f"Resuming from after_id={cursor}")
+                self._after_id = cursor
+
+    def _save_cursor(self, after_id: Optional[List]) -> None:
+        # Saves where to resume from in the page cache, None once finished
+        if self._page_cache is not None and self._read_shards == 1:
+            self._page_cache.set_cursor(self.cursor_name, after_id)
+
+    @property
+    def checkpoint_name(self) -> str:
+        return f"{self.job_id}_{self.worker_number or 0}"
+
+    def load_checkpoint(self) -> Optional[Dict[str, Any]]:
+        """
+        Resumes from the checkpoint saved for the engine's `job_id` and
+        worker, if there is one, and returns it. Otherwise resumes from the
+        cursor the job left in the `page_cache`. Called by `Workflow.run`.
+        """
+        if self.job_id is None:
+            return None
+        checkpoint = None
+        if self._checkpoint_store is not None:
+            checkpoint = self._checkpoint_store.load(self.checkpoint_name)
+        if checkpoint is not None:
+            logger.info(
+                f"Resuming {self.checkpoint_name} after {checkpoint['documents']} documents"
+            )
+            self._after_id = checkpoint["after_id"]
+            if checkpoint.get("operator_state") is not None:
+                self.operator.set_state(checkpoint["operator_state"])
+            # The error logs are kept next to the checkpoint, not in it
+            checkpoint["error_logs"] = self._checkpoint_store.load_error_logs(
+                self.checkpoint_name, checkpoint["error_count"]
+            )
+            self._saved_error_count = checkpoint["error_count"]
+        else:
+            self._load_cursor()
+        self._checkpoint = checkpoint
+        return checkpoint
+
+    def _save_checkpoint(
+        self, checkpoint: Dict[str, Any], error_logs: List[Dict[str, Any]]
+    ) -> None:
+        # `error_logs` are all the error logs of the run, the checkpoint
+        # counts the first `error_count` of them
+        self._save_cursor(checkpoint["after_id"])
+        if self._checkpoint_store is not None and self.job_id is not None:
+            # Only the error logs since the last checkpoint are written, and
+            # before the checkpoint that counts them
+            error_count = checkpoint["error_count"]
+            if error_count > self._saved_error_count:
+                self._checkpoint_store.append_error_logs(
+                    self.checkpoint_name,
+                    error_logs[self._saved_error_count : error_count],
+                )
+                self._saved_error_count = error_count
+            self._checkpoint_store.save(self.checkpoint_name, checkpoint)
+
+    def _clear_checkpoint(self) -> None:
+        # Finished, the next run starts from the beginning
+        self._save_cursor(None)
+        if self._checkpoint_store is not None and self.job_id is not None:
+            self._checkpoint_store.delete(self.checkpoint_name)
+        self._checkpoint = None
+        self._saved_error_count = 0
+
     @staticmethod
     def chunk_documents(chunksize: int, documents: DocumentList):
         num_chunks = len(documents) // chunksize + 1
@@ -191,36 +566,122 @@ class AbstractEngine(ABC):
         update_schema: bool = False,
     ):
         if chunk:
-            for _ in range(max_retries):
-                try:
-                    update_json = self._dataset.update_documents(
-                        documents=chunk,
-                        ingest_in_background=ingest_in_background,
-                        update_schema=update_schema,
+            if self._max_upload_bytes is None and self._max_upload_documents is None:
+                return self._update_batch(
+                    chunk, max_retries, ingest_in_background, update_schema
+                )
+
+            batches = list(
+                split_documents(
+                    chunk,
+                    max_bytes=self._max_upload_bytes,
+                    max_documents=self._max_upload_documents,
+                )
+            )
+            results = []
+            if update_schema:
+                # The first batch updates the schema before any other lands,
+                # concurrent schema updates break the backend
+                results.append(
+                    self._update_batch(
+                        batches.pop(0), max_retries, ingest_in_background, True
+                    )
+                )
+            with ThreadPoolExecutor(max_workers=self._upload_workers) as executor:
+                futures = [
+                    executor.submit(
+                        self._update_batch,
+                        batch,
+                        max_retries,
+                        ingest_in_background,
+                        False,
                     )
-                except Exception as e:
-                    logger.error(e)
-                else:
-                    return update_json
+                    for batch in batches
+                ]
+                results.extend(future.result() for future in futures)
+            return merge_results(results)
 
-            raise MaxRetriesError("max number of retries exceeded")
+    def _update_batch(
+        self,
+        batch: DocumentList,
+        max_retries: int = 3,
+        ingest_in_background: bool = True,
+        update_schema: bool = False,
+    ):
+        for _ in range(max_retries):
+            try:
+                start_time = time.perf_counter()
+                update_json = self._dataset.update_documents(
+                    documents=batch,
+                    ingest_in_background=ingest_in_background,
+                    update_schema=update_schema,
+                )
+            except Exception as e:
+                logger.error(e)
+            else:
+                self._record_write(batch, time.perf_counter() - start_time)
+                return update_json
+
+        raise MaxRetriesError("max number of retries exceeded")
+
+    def _record_processed(self, n_documents: int) -> None:
+        # Counts the documents of a page once it is processed and uploaded,
+        # and reports the progress
+        with self._stats_lock:
+            self._n_processed += n_documents
+            n_processed = self._n_processed
+        if self.job_id:
+            self.update_progress(n_processed)
 
     def update_progress(self, n_processed: int):
         """
         Parameters:
         job_id - the job ID
         name - the name of the job
-        n_processed - the name of what is processed
+        n_processed - the number of documents processed
         """
-        # Update the progress of the workflow
-        return self.dataset.api._update_workflow_progress(
-            workflow_id=self.job_id,
-            worker_number=self.worker_number,
-            step=self.name,
-            n_processed=min(n_processed * self.pull_chunksize, self._size),
-            n_total=self._size,
+        # Update the progress of the workflow, sent in the background
+        progress_reporter = self.progress_reporter
+        if progress_reporter is None or (self._size is None and n_processed == 0):
+            # A lazy engine reports once it knows the number of documents
+            return
+        progress_reporter.update(
+            n_processed=min(n_processed, self.size),
+            n_total=self.size,
         )
 
+    @property
+    def progress_reporter(self) -> Optional[ProgressReporter]:
+        """
+        The `ProgressReporter` of the workflow's job, None until the engine
+        is given a `job_id`.
+        """
+        if self.job_id is None:
+            return None
+        with self._progress_lock:
+            if (
+                self._progress_reporter is None
+                or self._progress_reporter.workflow_id != self.job_id
+            ):
+                if self._progress_reporter is not None:
+                    self._progress_reporter.flush()
+                self._progress_reporter = ProgressReporter(
+                    self.dataset.api,
+                    self.job_id,
+                    worker_number=self.worker_number,
+                    step=self.name,
+                    min_interval=self._progress_interval,
+                    min_fraction=self._progress_fraction,
+                )
+            return self._progress_reporter
+
+    def flush_progress(self) -> None:
+        """
+        Waits until the latest progress is sent.
+        """
+        if self._progress_reporter is not None:
+            self._progress_reporter.flush()
+
     #####################################3
     # The following attributes are set by the workflow
     # and provides the update progress functionality
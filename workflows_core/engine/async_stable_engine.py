@@ -0,0 +1,309 @@
+"""
+    Async Stable Engine Pseudo-algorithm-
+        1. Downloads pages on a reader task, keeping `pages_in_flight` pages
+           queued ahead of the transform.
+        2. Transforms each page in smaller chunks in an executor so the
+           event loop keeps downloading and uploading meanwhile.
+        3. Upserts each page on its own task, with at most `pages_in_flight`
+           uploads running at once.
+        4. Repeat until dataset has finished looping
+
+    Same as the StableEngine, the first page is upserted before any other
+    page so that the schema updates on it.
+
+"""
+import asyncio
+import logging
+import time
+
+import aiohttp
+
+from json import JSONDecodeError
+from typing import Any, Dict, List, Optional, Set
+
+from workflows_core.api.async_api import AsyncAPI
+from workflows_core.engine.helpers import (
+    merge_results,
+    run_coroutine,
+    split_documents,
+)
+from workflows_core.engine.stable_engine import StableEngine
+from workflows_core.errors import MaxRetriesError
+from workflows_core.types import Filter
+from workflows_core.utils.document import Document
+from workflows_core.utils.document_list import DocumentList
+from workflows_core.utils.columnar_document_list import ColumnarDocumentList
+from tqdm.auto import tqdm
+
+logger = logging.getLogger(__file__)
+
+
+class AsyncStableEngine(StableEngine):
+    SUPPORTS_CHECKPOINTS = False
+
+    def __init__(self, *args, pages_in_flight: int = 2, **kwargs):
+        """
+        Parameters
+        -----------
+
+        pages_in_flight
+            the number of pages that can be queued for the transform and
+            the number of uploads that can run at the same time
+
+        """
+        super().__init__(*args, **kwargs)
+        assert not self._stream, "AsyncStableEngine does not support stream=True"
+        assert self._page_cache is None, "AsyncStableEngine does not support page_cache"
+        assert pages_in_flight > 0, "pages_in_flight should be a Positive Integer"
+        self._pages_in_flight = pages_in_flight
+
+    def apply(self) -> None:
+        """
+        Returns the ratio of successfully transformed documents / documents
+        processed
+        """
+        run_coroutine(self._apply_async())
+
+    async def _apply_async(self) -> None:
+        loop = asyncio.get_running_loop()
+        documents = 0
+        successful_documents = 0
+        self._n_processed = 0
+        error_logs: List[Dict[str, Any]] = []
+
+        pages: asyncio.Queue = asyncio.Queue(maxsize=self._pages_in_flight)
+        upload_slots = asyncio.Semaphore(self._pages_in_flight)
+        # Failed uploads stay in `uploads` until their exception is raised
+        uploads: Set[asyncio.Future] = set()
+
+        def on_upload_done(upload: asyncio.Future):
+            upload_slots.release()
+            if upload.cancelled() or upload.exception() is None:
+                uploads.discard(upload)
+
+        def raise_failed_uploads():
+            for upload in list(uploads):
+                if upload.done():
+                    upload.result()
+
+        async with AsyncAPI.from_api(self.dataset.api) as api:
+            reader = asyncio.ensure_future(self._read_pages(api, pages))
+            progress_bar = tqdm(
+                desc=repr(self.operator),
+                disable=(not self._show_progress_bar),
+                total=self._size,
+            )
+            try:
+                chunk_counter = 0
+                while True:
+                    large_chunk = await pages.get()
+                    raise_failed_uploads()
+                    if large_chunk is None:
+                        break
+
+                    if progress_bar.total is None and self._size is not None:
+                        # Lazy engines know the size from the first page
+                        progress_bar.total = self._size
+                    (
+                        chunk_to_update,
+                        page_successful_documents,
+                    ) = await loop.run_in_executor(
+                        None, self._transform_page, large_chunk, error_logs
+                    )
+                    documents += len(large_chunk)
+                    successful_documents += page_successful_documents
+
+                    if chunk_counter < self.MAX_SCHEMA_UPDATE_LIMITER:
+                        # The schema updating chunks are uploaded before any
+                        # other chunk can reach the backend
+                        if uploads:
+                            await asyncio.gather(*uploads)
+                        await self._update_chunk(
+                            api,
+                            chunk_to_update,
+                            len(large_chunk),
+                            update_schema=True,
+                            ingest_in_background=False,
+                        )
+                    else:
+                        await upload_slots.acquire()
+                        upload = asyncio.ensure_future(
+                            self._update_chunk(
+                                api,
+                                chunk_to_update,
+                                len(large_chunk),
+                                update_schema=False,
+                                ingest_in_background=True,
+                            )
+                        )
+                        uploads.add(upload)
+                        upload.add_done_callback(on_upload_done)
+
+                    chunk_counter += 1
+                    progress_bar.update(len(large_chunk))
+
+                # Raises the reader's exception if it failed
+                await reader
+                if uploads:
+                    await asyncio.gather(*uploads)
+            finally:
+                progress_bar.close()
+                for task in [reader, *uploads]:
+                    task.cancel()
+
+        self._error_logs = error_logs
+        if documents > 0:
+            self._success_ratio = successful_documents / documents
+            logger.debug({"success_ratio": self._success_ratio})
+
+    async def _read_pages(
+        self, api: AsyncAPI, pages: asyncio.Queue, max_retries: int = 5
+    ) -> None:
+        try:
+            if not self._select_fields_checked:
+                # Lazy engines check them when the first page is needed, as
+                # `iterate` does
+                await asyncio.get_running_loop().run_in_executor(
+                    None, self._check_select_fields
+                )
+
+            if self._read_shards == 1:
+                await self._read_shard(api, pages, self._filters, max_retries)
+                return
+
+            # One cursor per sub-shard, all feeding the same queue
+            readers = [
+                asyncio.ensure_future(
+                    self._read_shard(
+                        api,
+                        pages,
+                        self._filters + self._get_read_shard_filter(shard),
+                        max_retries,
+                        shard=shard,
+                    )
+                )
+                for shard in range(self._read_shards)
+            ]
+            try:
+                await asyncio.gather(*readers)
+            finally:
+                for reader in readers:
+                    reader.cancel()
+        finally:
+            await pages.put(None)
+
+    async def _read_shard(
+        self,
+        api: AsyncAPI,
+        pages: asyncio.Queue,
+        filters: List[Filter],
+        max_retries: int = 5,
+        shard: Optional[int] = None,
+    ) -> None:
+        after_id = self._after_id if shard is None else None
+        retry_count = 0
+        while True:
+            try:
+                start_time = time.perf_counter()
+                chunk = await api._get_where(
+                    dataset_id=self.dataset.dataset_id,
+                    page_size=self._pull_chunksize,
+                    filters=filters,
+                    select_fields=self._select_fields,
+                    after_id=after_id,
+                    worker_number=self.worker_number,
+                )
+            except (aiohttp.ClientConnectionError, JSONDecodeError) as e:
+                logger.error(e)
+                retry_count += 1
+                await asyncio.sleep(1)
+
+                if retry_count >= max_retries:
+                    raise MaxRetriesError("max number of retries exceeded")
+            else:
+                after_id = chunk["after_id"]
+                if shard is None:
+                    self._after_id = after_id
+                if shard is None and self._size is None and "count" in chunk:
+                    # Lazy engines learn the number of documents from the first page
+                    self._set_size(chunk["count"])
+                if not chunk["documents"]:
+                    break
+                self._record_read(chunk["documents"], time.perf_counter() - start_time)
+                if self._columnar:
+                    page = ColumnarDocumentList.from_documents(chunk["documents"])
+                else:
+                    page = DocumentList(chunk["documents"])
+                await pages.put(page)
+                retry_count = 0
+
+    async def _update_chunk(
+        self,
+        api: AsyncAPI,
+        chunk: List[Document],
+        n_documents: int,
+        update_schema: bool,
+        ingest_in_background: bool,
+        max_retries: int = 3,
+    ) -> None:
+        if chunk:
+            # Measuring the documents serializes them, keep it off the loop
+            batches = await asyncio.get_running_loop().run_in_executor(
+                None,
+                lambda: list(
+                    split_documents(
+                        chunk,
+                        max_bytes=self._max_upload_bytes,
+                        max_documents=self._max_upload_documents,
+                    )
+                ),
+            )
+            results = []
+            if update_schema:
+                # The first batch updates the schema before any other lands,
+                # concurrent schema updates break the backend
+                results.append(
+                    await self._update_batch(
+                        api, batches.pop(0), True, ingest_in_background, max_retries
+                    )
+                )
+            upload_slots = asyncio.Semaphore(self._upload_workers)
+
+            async def update_batch(batch: List[Document]):
+                async with upload_slots:
+                    return await self._update_batch(
+                        api, batch, False, ingest_in_background, max_retries
+                    )
+
+            results += await asyncio.gather(*[update_batch(b) for b in batches])
+            logger.debug(merge_results(results))
+
+        # executes after everything wraps up
+        self._record_processed(n_documents)
+
+    async def _update_batch(
+        self,
+        api: AsyncAPI,
+        batch: List[Document],
+        update_schema: bool,
+        ingest_in_background: bool,
+        max_retries: int = 3,
+    ) -> Any:
+        for _ in range(max_retries):
+            try:
+                start_time = time.perf_counter()
+                result = await api._bulk_update(
+                    dataset_id=self.dataset.dataset_id,
+                    documents=batch,
+                    ingest_in_background=ingest_in_background,
+                    update_schema=update_schema,
+                )
+            except Exception as e:
+                logger.error(e)
+            else:
+                self._record_write(batch, time.perf_counter() - start_time)
+                if update_schema:
+                    self.dataset.invalidate_schema()
+                return result
+
+        raise MaxRetriesError("max number of retries exceeded")
@@ -0,0 +1,177 @@
+"""
+Checkpoints of engine runs, so that a workflow that was stopped part way
+(e.g. a pre-empted pod) resumes where it was instead of from the start.
+
+A checkpoint is written after each page is uploaded. It holds:
+
+    - `after_id`: the cursor after the last uploaded page
+    - `chunks`: the number of pages uploaded so far
+    - `documents`: the number of documents in those pages
+    - `successful_documents`: the number of those documents that were
+      transformed successfully
+    - `error_count`: the number of error logs of the failed slices so far.
+      The error logs themselves are appended to the store as they come, so
+      that a checkpoint doesn't write all of them again every page.
+    - `operator_state`: what the operator's `get_state` returned
+
+Checkpoints are JSON serializable dictionaries, saved under the name of the
+job and worker in a `CheckpointStore`. `LocalFileCheckpointStore` keeps them
+in files, subclass `CheckpointStore` to keep them elsewhere (a shared
+volume, object storage, the workflow's metadata...).
+
+Engines that support checkpoints save them in a `LocalFileCheckpointStore`
+by default, in `default_checkpoint_directory()`: the
+`WORKFLOWS_CHECKPOINT_DIRECTORY` environment variable, or a
+`workflows_checkpoints` directory on the `EFS_MOUNT_PATH` volume, or in the
+system's temporary directory. Pass another store to keep them elsewhere, or
+`checkpoint_store=False` to run without checkpoints.
+
+.. code-block::
+
+    engine = StableEngine(
+        dataset, operator, checkpoint_store=LocalFileCheckpointStore("/mnt/checkpoints")
+    )
+    # Restarted with the same job_id, the workflow resumes from the checkpoint
+    Workflow(engine, job_id=job_id).run()
+
+"""
+import json
+import os
+import re
+import tempfile
+
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional
+
+from workflows_core.utils.json_encoder import json_dumps
+
+_ERRORS_SUFFIX = ".errors.jsonl"
+
+
+def default_checkpoint_directory() -> str:
+    """
+    Where `LocalFileCheckpointStore` saves checkpoints by default: the
+    `WORKFLOWS_CHECKPOINT_DIRECTORY` environment variable when it is set,
+    then the `EFS_MOUNT_PATH` volume (which outlives the worker), then the
+    system's temporary directory.
+    """
+    directory = os.environ.get("WORKFLOWS_CHECKPOINT_DIRECTORY")
+    if directory:
+        return directory
+    efs_mount_path = os.environ.get("EFS_MOUNT_PATH")
+    if efs_mount_path:
+        return os.path.join(efs_mount_path, "workflows_checkpoints")
+    return os.path.join(tempfile.gettempdir(), "workflows_checkpoints")
+
+
+class CheckpointStore(ABC):
+    """
+    Where the engines save their checkpoints.
+    """
+
+    @abstractmethod
+    def load(self, name: str) -> Optional[Dict[str, Any]]:
+        """
+        The last checkpoint saved as `name`, or None.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def save(self, name: str, checkpoint: Dict[str, Any]) -> None:
+        """
+        Saves `checkpoint` as `name`, replacing the previous one.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete(self, name: str) -> None:
+        """
+        Removes the checkpoint `name` and its error logs if there are any.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def append_error_logs(self, name: str, error_logs: List[Dict[str, Any]]) -> None:
+        """
+        Adds `error_logs` after the error logs of the checkpoint `name`.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def load_error_logs(self, name: str, count: int) -> List[Dict[str, Any]]:
+        """
+        The first `count` error logs of the checkpoint `name`. Error logs
+        appended after them (by a run that stopped before saving the
+        checkpoint that counts them) are removed.
+        """
+        raise NotImplementedError
+
+
+class LocalFileCheckpointStore(CheckpointStore):
+    """
+    Saves each checkpoint as a JSON file, and its error logs as a JSON
+    lines file that they are appended to.
+
+    Parameters
+    -----------
+
+    directory
+        where to write the checkpoints, `default_checkpoint_directory()` by
+        default. Use a directory that outlives the worker (e.g. a mounted
+        volume) to resume after it is replaced.
+    """
+
+    def __init__(self, directory: Optional[str] = None):
+        if directory is None:
+            directory = default_checkpoint_directory()
+        os.makedirs(directory, exist_ok=True)
+        self._directory = directory
+
+    @property
+    def directory(self) -> str:
+        return self._directory
+
+    def _path(self, name: str, suffix: str = ".json") -> str:
+        return os.path.join(self._directory, re.sub(r"[^\w.-]", "_", name) + suffix)
+
+    def _write(self, path: str, data: bytes) -> None:
+        # Write then rename so that a crash never leaves half a file
+        descriptor, temporary_path = tempfile.mkstemp(dir=self._directory)
+        with os.fdopen(descriptor, "wb") as file:
+            file.write(data)
+        os.replace(temporary_path, path)
+
+    def load(self, name: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._path(name)) as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return None
+
+    def save(self, name: str, checkpoint: Dict[str, Any]) -> None:
+        self._write(self._path(name), json_dumps(checkpoint))
+
+    def delete(self, name: str) -> None:
+        for path in [self._path(name), self._path(name, _ERRORS_SUFFIX)]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def append_error_logs(self, name: str, error_logs: List[Dict[str, Any]]) -> None:
+        with open(self._path(name, _ERRORS_SUFFIX), "ab") as file:
+            file.write(
+                b"".join(json_dumps(error_log) + b"\n" for error_log in error_logs)
+            )
+
+    def load_error_logs(self, name: str, count: int) -> List[Dict[str, Any]]:
+        path = self._path(name, _ERRORS_SUFFIX)
+        try:
+            with open(path, "rb") as file:
+                lines = file.read().splitlines()
+        except FileNotFoundError:
+            return []
+        # A line cut short by a crash is never among the first `count`
+        if len(lines) > count:
+            self._write(path, b"".join(line + b"\n" for line in lines[:count]))
+        return [json.loads(line) for line in lines[:count]]
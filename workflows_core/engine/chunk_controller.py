@@ -0,0 +1,176 @@
+"""
+Adaptive page size for the engines.
+
+The `AdaptiveChunkController` picks the `pull_chunksize` of the next page from
+what the previous pages cost: the time per document of `get_where` and
+`bulk_update`, and the size per document of the payloads. Pages grow while
+the requests are fast and small (e.g. short texts, where most of the time is
+round trips) and shrink as soon as a request takes longer than the target
+latency or a page is larger than the byte budget (e.g. large vectors).
+
+.. code-block::
+
+    controller = AdaptiveChunkController(target_latency=5, max_page_bytes=2**25)
+    engine = StableEngine(dataset, operator, chunk_controller=controller)
+    engine()
+    engine.stats["chunk_controller"]["decisions"]
+
+"""
+import threading
+
+from typing import Any, Dict, List, Optional
+
+from workflows_core.utils.json_encoder import SerializedList, json_dumps
+
+# Page size changes smaller than this fraction of the page size are ignored
+CHUNKSIZE_TOLERANCE = 0.05
+
+
+def estimate_size(documents, sample_size: int = 20) -> int:
+    """
+    Estimates the serialized size of `documents` in bytes from up to
+    `sample_size` evenly spaced documents.
+    """
+    if isinstance(documents, SerializedList):
+        # measured already
+        return len(documents.json)
+    num_documents = len(documents)
+    if num_documents == 0:
+        return 0
+    step = max(num_documents // sample_size, 1)
+    sample = [documents[index] for index in range(0, num_documents, step)]
+    return len(json_dumps(sample)) * num_documents // len(sample)
+
+
+class AdaptiveChunkController:
+    """
+    Tunes the page size between `min_chunksize` and `max_chunksize`.
+
+    Every page feeds `record_read` and `record_write` with its number of
+    documents, the seconds the request took and the payload size. The next
+    page size is the largest one for which the expected `get_where` and
+    `bulk_update` times stay under `target_latency` and the expected payload
+    stays under `max_page_bytes`. It can at most double from one page to the
+    next, but drops at once when a page was too slow or too large. Changes of
+    less than 5% are ignored.
+
+    Parameters
+    -----------
+
+    min_chunksize
+        the smallest page size
+    max_chunksize
+        the largest page size
+    initial_chunksize
+        the size of the first page, `min_chunksize` by default
+    target_latency
+        the seconds a `get_where` or `bulk_update` request should take
+    max_page_bytes
+        the largest payload of a page, downloaded or uploaded
+    smoothing
+        the weight of the latest page in the running averages, between 0
+        (ignore new pages) and 1 (only the latest page)
+    """
+
+    def __init__(
+        self,
+        min_chunksize: int = 50,
+        max_chunksize: int = 10000,
+        initial_chunksize: Optional[int] = None,
+        target_latency: float = 5.0,
+        max_page_bytes: int = 2**25,
+        smoothing: float = 0.5,
+    ):
+        assert 0 < min_chunksize <= max_chunksize, "0 < min_chunksize <= max_chunksize"
+        assert target_latency > 0, "target_latency should be positive"
+        assert max_page_bytes > 0, "max_page_bytes should be positive"
+        assert 0 < smoothing <= 1, "smoothing should be in (0, 1]"
+        if initial_chunksize is None:
+            initial_chunksize = min_chunksize
+
+        self._min_chunksize = min_chunksize
+        self._max_chunksize = max_chunksize
+        self._target_latency = target_latency
+        self._max_page_bytes = max_page_bytes
+        self._smoothing = smoothing
+
+        self._chunksize = min(max(initial_chunksize, min_chunksize), max_chunksize)
+        # Running averages per document, None until the first measurement
+        self._seconds: Dict[str, Optional[float]] = dict(read=None, write=None)
+        self._bytes: Dict[str, Optional[float]] = dict(read=None, write=None)
+        self._decisions: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    @property
+    def chunksize(self) -> int:
+        return self._chunksize
+
+    def record_read(self, num_documents: int, seconds: float, num_bytes: int) -> None:
+        """
+        Records a `get_where` of `num_documents` documents.
+        """
+        self._record("read", num_documents, seconds, num_bytes)
+
+    def record_write(self, num_documents: int, seconds: float, num_bytes: int) -> None:
+        """
+        Records a `bulk_update` of `num_documents` documents.
+        """
+        self._record("write", num_documents, seconds, num_bytes)
+
+    def _average(self, averages: Dict[str, Optional[float]], key: str, value: float):
+        if averages[key] is None:
+            averages[key] = value
+        else:
+            averages[key] += self._smoothing * (value - averages[key])
+
+    def _record(self, kind: str, num_documents: int, seconds: float, num_bytes: int):
+        if num_documents <= 0:
+            return
+        with self._lock:
+            self._average(self._seconds, kind, seconds / num_documents)
+            self._average(self._bytes, kind, num_bytes / num_documents)
+            self._update(kind)
+
+    def _update(self, kind: str) -> None:
+        limits = {}
+        for key, seconds in self._seconds.items():
+            if seconds:
+                limits[f"{key}_latency"] = self._target_latency / seconds
+        for key, num_bytes in self._bytes.items():
+            if num_bytes:
+                limits[f"{key}_bytes"] = self._max_page_bytes / num_bytes
+
+        if not limits:
+            return
+        reason = min(limits, key=limits.get)
+        chunksize = int(limits[reason])
+        if chunksize > 2 * self._chunksize:
+            chunksize = 2 * self._chunksize
+            reason = "growth"
+        chunksize = min(max(chunksize, self._min_chunksize), self._max_chunksize)
+
+        # Ignore the jitter of the measurements
+        if abs(chunksize - self._chunksize) > self._chunksize * CHUNKSIZE_TOLERANCE:
+            self._decisions.append(
+                dict(
+                    after=kind,
+                    previous_chunksize=self._chunksize,
+                    chunksize=chunksize,
+                    limited_by=reason,
+                )
+            )
+            self._chunksize = chunksize
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        """
+        The current page size, the running averages per document and the
+        page size changes with what limited them.
+        """
+        with self._lock:
+            return dict(
+                chunksize=self._chunksize,
+                seconds_per_document=dict(self._seconds),
+                bytes_per_document=dict(self._bytes),
+                decisions=list(self._decisions),
+            )
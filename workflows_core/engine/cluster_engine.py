@@ -1,8 +1,9 @@
 import logging
 import traceback
-from typing import Any
+from typing import Any, Optional
 
 from workflows_core.engine.abstract_engine import AbstractEngine
+from workflows_core.utils.disk_column_store import DiskColumnStore
 from tqdm.auto import tqdm
 
 
@@ -10,13 +11,38 @@ logger = logging.getLogger(__file__)
 
 
 class InMemoryEngine(AbstractEngine):
-    def __init__(self, show_progress_bar: bool = True, *args, **kwargs):
+    def __init__(
+        self,
+        show_progress_bar: bool = True,
+        spill_to_disk: bool = False,
+        spill_directory: Optional[str] = None,
+        *args,
+        **kwargs
+    ):
+        """
+        Parameters
+        -----------
+
+        spill_to_disk
+            if True, the pages are written to a `DiskColumnStore` as they are
+            downloaded instead of being kept in memory, and the operator gets
+            them as one `ColumnarDocumentList` whose vector fields are
+            memory-mapped (requires pyarrow). Operators created with
+            `columnar=True` can then work on more vectors than fit in memory;
+            other operators still get every document in memory.
+        spill_directory
+            where to write the files when `spill_to_disk=True`, the system's
+            temporary directory by default. They are removed at the end.
+
+        """
         super().__init__(*args, **kwargs)
 
         self._show_progress_bar = show_progress_bar
+        self._spill_to_disk = spill_to_disk
+        self._spill_directory = spill_directory
         self._progress = tqdm(
             desc=repr(self.operator),
-            total=self.num_chunks,
+            total=self._size,
             disable=(not show_progress_bar),
         )
 
@@ -26,10 +52,26 @@ class InMemoryEngine(AbstractEngine):
         iterator = self.iterate()
         error_logs = []
 
+        store = DiskColumnStore(self._spill_directory) if self._spill_to_disk else None
+        try:
+            self._apply(iterator, error_logs, store)
+        finally:
+            if store is not None:
+                store.close()
+
+    def _apply(self, iterator, error_logs, store: Optional[DiskColumnStore]):
         documents = []
         for chunk in iterator:
-            documents += chunk
-            self._progress.update(1)
+            if store is None:
+                documents += chunk
+            else:
+                store.append(chunk)
+            if self._progress.total is None and self._size is not None:
+                # Lazy engines know the size from the first page
+                self._progress.total = self._size
+            self._progress.update(len(chunk))
+        if store is not None:
+            documents = store.read()
 
         try:
             new_batch = self.operator(documents)
@@ -47,8 +89,8 @@ class InMemoryEngine(AbstractEngine):
             self._success_ratio = 1.0
 
         # Update this in series
-        for i in range(self._num_chunks):
-            chunk = new_batch[i * self.pull_chunksize : (i + 1) * self._pull_chunksize]
+        for i, start in enumerate(range(0, len(new_batch), self._pull_chunksize)):
+            chunk = new_batch[start : start + self._pull_chunksize]
             self.update_chunk(
                 chunk,
                 ingest_in_background=True,
@@ -57,4 +99,10 @@ class InMemoryEngine(AbstractEngine):
                 update_schema=True if i < self.MAX_SCHEMA_UPDATE_LIMITER else False,
             )
             if self.job_id:
-                self.update_progress(i + 1)
+                # Only the changed documents are uploaded, report the share
+                # of all the documents they stand for
+                self.update_progress(
+                    len(documents)
+                    * min(start + self._pull_chunksize, len(new_batch))
+                    // len(new_batch)
+                )
@@ -0,0 +1,306 @@
+"""
+Helpers shared by the engines
+"""
+import asyncio
+import queue
+import threading
+import traceback
+
+from concurrent.futures import ThreadPoolExecutor
+from numbers import Number
+from typing import (
+    Any,
+    Awaitable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    TypeVar,
+)
+
+from workflows_core.dataset.dataset import Dataset
+from workflows_core.operator.abstract_operator import AbstractOperator
+from workflows_core.utils.document import Document
+from workflows_core.utils.document_list import DocumentList
+from workflows_core.utils.json_encoder import SerializedList, json_dumps
+
+T = TypeVar("T")
+
+_DONE = object()
+
+
+def prefetch(iterable: Iterable[T], max_prefetch: int = 1) -> Iterator[T]:
+    """
+    Consumes `iterable` on a background thread so that the next items are
+    fetched while the caller is busy with the current one.
+
+    At most `max_prefetch` items are buffered ahead of the consumer, so the
+    producer blocks (backpressure) once the buffer is full. Exceptions raised
+    by the producer are re-raised in the consumer.
+
+    Parameters
+    -----------
+
+    iterable
+        the iterable to consume in the background, e.g. `engine.iterate()`
+    max_prefetch
+        the maximum number of items held in the buffer
+    """
+    return merge([iterable], max_prefetch=max_prefetch)
+
+
+def merge(iterables: List[Iterable[T]], max_prefetch: int = 1) -> Iterator[T]:
+    """
+    Consumes each of `iterables` on its own background thread and yields
+    their items in the order they are produced, e.g. the pages of several
+    cursors that are read at the same time.
+
+    Same as `prefetch`, at most `max_prefetch` items are buffered ahead of
+    the consumer and the first exception raised by a producer is re-raised
+    in the consumer.
+    """
+    assert max_prefetch > 0, "max_prefetch should be a Positive Integer"
+
+    buffer: queue.Queue = queue.Queue(maxsize=max_prefetch)
+    stop = threading.Event()
+
+    def put(item) -> bool:
+        # Keep checking whether the consumer has gone away so that the
+        # producer never blocks forever on a full buffer
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+            except queue.Full:
+                continue
+            else:
+                return True
+        return False
+
+    def produce(iterable: Iterable[T]):
+        try:
+            for item in iterable:
+                if not put((item, None)):
+                    return
+        except BaseException as e:
+            put((_DONE, e))
+        else:
+            put((_DONE, None))
+
+    for iterable in iterables:
+        thread = threading.Thread(
+            target=produce, args=(iterable,), name="prefetch", daemon=True
+        )
+        thread.start()
+
+    try:
+        remaining = len(iterables)
+        while remaining:
+            item, error = buffer.get()
+            if item is _DONE:
+                if error is not None:
+                    raise error
+                remaining -= 1
+                continue
+            yield item
+    finally:
+        stop.set()
+
+
+def run_coroutine(coroutine: Awaitable[T]) -> T:
+    """
+    Runs `coroutine` to completion from synchronous code, including from
+    inside an already running event loop (e.g. a notebook), in which case it
+    runs on a separate thread with its own loop.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coroutine)
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, coroutine).result()
+
+
+def split_documents(
+    documents: Iterable[T],
+    max_bytes: Optional[int] = None,
+    max_documents: Optional[int] = None,
+) -> Iterator[List[T]]:
+    """
+    Splits `documents` into consecutive batches of at most `max_documents`
+    documents whose serialized size is at most `max_bytes`. A document larger
+    than `max_bytes` on its own is sent in a batch of its own.
+
+    With `max_bytes`, each document is serialized once to measure it and the
+    batches are `SerializedList`s that keep the JSON array of the batch, so
+    that the request body reuses it instead of serializing them again.
+
+    Parameters
+    -----------
+
+    max_bytes
+        the maximum size of the JSON array of a batch, None for no limit
+    max_documents
+        the maximum number of documents of a batch, None for no limit
+    """
+    assert max_bytes is None or max_bytes > 0, "max_bytes should be positive"
+    assert (
+        max_documents is None or max_documents > 0
+    ), "max_documents should be a Positive Integer"
+
+    def make_batch(batch: List[T], serialized: List[bytes]) -> List[T]:
+        if max_bytes is None:
+            return batch
+        return SerializedList(batch, b"[" + b",".join(serialized) + b"]")
+
+    batch: List[T] = []
+    serialized: List[bytes] = []
+    # "[" and "]", and a "," or the closing "]" after each document
+    batch_bytes = 1
+    for document in documents:
+        if max_bytes is not None:
+            document_json = json_dumps(document)
+            size = len(document_json) + 1
+        else:
+            size = 0
+        if batch and (
+            (max_documents is not None and len(batch) >= max_documents)
+            or (max_bytes is not None and batch_bytes + size > max_bytes)
+        ):
+            yield make_batch(batch, serialized)
+            batch = []
+            serialized = []
+            batch_bytes = 1
+        batch.append(document)
+        if max_bytes is not None:
+            serialized.append(document_json)
+        batch_bytes += size
+    if batch:
+        yield make_batch(batch, serialized)
+
+
+def merge_results(results: List[Any]) -> Any:
+    """
+    Merges the responses of the batches of an upload into one: counts are
+    summed and lists (e.g. `failed_documents`) are concatenated. Responses
+    that are not dicts are returned as a list.
+    """
+    if len(results) == 1:
+        return results[0]
+    if not all(isinstance(result, dict) for result in results):
+        return results
+
+    merged = {}
+    for result in results:
+        for key, value in result.items():
+            if key not in merged:
+                merged[key] = list(value) if isinstance(value, list) else value
+            elif isinstance(value, list) and isinstance(merged[key], list):
+                merged[key].extend(value)
+            elif (
+                isinstance(value, Number)
+                and isinstance(merged[key], Number)
+                and not isinstance(value, bool)
+            ):
+                merged[key] += value
+    return merged
+
+
+def update_rows(
+    dataset: Dataset,
+    rows: Iterable[Dict[str, Any]],
+    update_schema: bool = False,
+    ingest_in_background: bool = True,
+    max_bytes: Optional[int] = None,
+    max_documents: Optional[int] = None,
+) -> Any:
+    """
+    Updates `dataset` with flat `rows` whose keys are dotted fields, e.g. the
+    `to_pylist` of an Arrow table. The null values are skipped, so that each
+    document only sends the fields it has a value for, and the rows with only
+    an `_id` are not sent.
+
+    Returns the merged responses of the batches (see `split_documents`), or
+    None when there was nothing to update.
+    """
+    documents = []
+    for row in rows:
+        document = Document()
+        for field, value in row.items():
+            if value is not None:
+                document[field] = value
+        if len(document.keys()) > 1:
+            documents.append(document)
+
+    results = [
+        dataset.update_documents(
+            documents=batch,
+            update_schema=update_schema,
+            ingest_in_background=ingest_in_background,
+        )
+        for batch in split_documents(
+            documents, max_bytes=max_bytes, max_documents=max_documents
+        )
+    ]
+    return merge_results(results) if results else None
+
+
+def run_operator(
+    operator: AbstractOperator, chunk: DocumentList
+) -> Tuple[Optional[DocumentList], Optional[Dict[str, str]]]:
+    """
+    Runs `operator` on `chunk`.
+
+    Returns the transformed documents and None, or None and the exception
+    and traceback when the operator failed.
+    """
+    try:
+        return operator(chunk), None
+    except Exception as e:
+        return None, {"exception": str(e), "traceback": traceback.format_exc()}
+
+
+def map_operator(
+    operator: AbstractOperator, chunks: List[DocumentList], max_workers: int = 1
+) -> Iterator[Tuple[Optional[DocumentList], Optional[Dict[str, str]]]]:
+    """
+    Runs `operator` on each of `chunks` with `run_operator`, on up to
+    `max_workers` threads, and yields the results in the order of `chunks`.
+    """
+    if max_workers == 1 or len(chunks) <= 1:
+        for chunk in chunks:
+            yield run_operator(operator, chunk)
+        return
+
+    with ThreadPoolExecutor(
+        max_workers=min(max_workers, len(chunks)), thread_name_prefix="transform"
+    ) as executor:
+        yield from executor.map(lambda chunk: run_operator(operator, chunk), chunks)
+
+
+def get_shard_filter(
+    shard: int,
+    num_shards: int,
+    worker_number: Optional[int] = None,
+    total_workers: Optional[int] = None,
+    field: str = "_id",
+) -> List[Dict[str, Any]]:
+    """
+    The `matchModulo` filter of one of `num_shards` sub-shards of a
+    worker's documents: with T workers and K shards, worker w reads the
+    documents where hash % (T * K) is w + k * T for each k, which together
+    are the ones where hash % T is w.
+    """
+    if worker_number is None or total_workers is None or total_workers <= 1:
+        worker_number, total_workers = 0, 1
+    return [
+        {
+            "matchModulo": {
+                "field": field,
+                "modulo": total_workers * num_shards,
+                "value": worker_number + shard * total_workers,
+            }
+        }
+    ]
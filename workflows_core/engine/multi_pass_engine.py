@@ -0,0 +1,117 @@
+"""
+    Multi Pass Engine Pseudo-algorithm-
+        1. Downloads the dataset page by page like the StableEngine, caching
+           each page in a `DiskColumnStore` and running the first operator
+           on it.
+        2. Replays the cached pages for each of the next operators, without
+           downloading them again.
+        3. Only upserts what the last operator changed.
+
+    For workflows that need to see the whole dataset before they can update
+    it, e.g. `partial_fit` a model on every page and then `predict` every
+    page, which would otherwise download the dataset once per pass.
+
+    The cache keeps the vector fields as memory-mapped float32 files, so the
+    later passes get float32 vectors. Requires pyarrow
+    (`pip install RelevanceAI-Workflows-Core[columnar]`).
+
+"""
+import logging
+
+from typing import Any, Dict, List, Optional
+
+from workflows_core.dataset.dataset import Dataset
+from workflows_core.engine.stable_engine import StableEngine
+from workflows_core.operator.abstract_operator import AbstractOperator
+from workflows_core.utils.disk_column_store import DiskColumnStore
+
+logger = logging.getLogger(__file__)
+
+
+class MultiPassEngine(StableEngine):
+    SUPPORTS_CHECKPOINTS = False
+
+    def __init__(
+        self,
+        dataset: Dataset,
+        operators: List[AbstractOperator],
+        *args,
+        cache_directory: Optional[str] = None,
+        **kwargs
+    ):
+        """
+        Parameters
+        -----------
+
+        operators
+            the operators to run one after the other over the whole dataset.
+            The documents returned by all but the last one are discarded.
+        cache_directory
+            where to cache the downloaded pages, the system's temporary
+            directory by default. The cache is removed at the end.
+
+        """
+        assert operators, "MultiPassEngine needs at least one operator"
+        super().__init__(dataset, operators[-1], *args, **kwargs)
+        self._operators = operators
+        self._cache_directory = cache_directory
+        self._cache: Optional[DiskColumnStore] = None
+        self._pass = 0
+
+    @property
+    def operators(self) -> List[AbstractOperator]:
+        return self._operators
+
+    def __call__(self) -> Any:
+        for operator in self._operators:
+            operator.pre_hooks(self._dataset)
+        try:
+            self.apply()
+        finally:
+            self.flush_progress()
+        for operator in self._operators:
+            operator.post_hooks(self._dataset)
+
+    def apply(self) -> None:
+        """
+        Returns the ratio of successfully transformed documents / documents
+        processed of each pass, averaged over the passes
+        """
+        success_ratios = []
+        error_logs: List[Dict[str, Any]] = []
+        try:
+            with DiskColumnStore(self._cache_directory) as self._cache:
+                for self._pass, self._operator in enumerate(self._operators):
+                    super().apply()
+                    error_logs += self._error_logs
+                    if self._success_ratio is not None:
+                        success_ratios.append(self._success_ratio)
+        finally:
+            self._cache = None
+            self._operator = self._operators[-1]
+
+        self._error_logs = error_logs
+        if success_ratios:
+            self._success_ratio = sum(success_ratios) / len(success_ratios)
+            logger.debug({"success_ratio": self._success_ratio})
+
+    def iterate(self, *args, **kwargs):
+        if self._pass == 0:
+            for page in super().iterate(*args, **kwargs):
+                self._cache.append(page)
+                yield page
+            return
+
+        documents = self._cache.read()
+        for start in range(0, len(documents), self._pull_chunksize):
+            page = documents[start : start + self._pull_chunksize]
+            yield page if self._columnar else page.to_document_list()
+
+    def _save_cursor(self, after_id):
+        # Resuming the first pass would skip pages of the later passes
+        pass
+
+    def update_chunk(self, chunk, *args, **kwargs):
+        # Only the last pass updates the dataset
+        if self._pass == len(self._operators) - 1:
+            return super().update_chunk(chunk, *args, **kwargs)
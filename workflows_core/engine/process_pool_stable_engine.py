@@ -0,0 +1,119 @@
+"""
+    Process Pool Stable Engine Pseudo-algorithm-
+        1. Starts `max_workers` processes, each unpickling its own copy of
+           the operator once.
+        2. Downloads a page like the StableEngine.
+        3. Sends the `transform_chunksize` slices of the page to the
+           processes, which transform them in parallel.
+        4. Upserts the page once every slice has come back, in order.
+        5. Repeat until dataset has finished looping
+
+    For CPU bound, pure Python operators (e.g. sentence splitting) that a
+    single core running the StableEngine can't keep up with.
+
+    The operator is copied into the processes when they start, so changes
+    the operator makes to itself while transforming (e.g. fitted models,
+    counters) stay in the processes. Operators that hold state which can't
+    be pickled should create it lazily in `transform`.
+
+    The processes are started with "forkserver" (or "spawn" where it isn't
+    available) rather than forked: the engine's prefetch, upload and
+    progress threads and its pooled connections are running by then, and a
+    forked child would inherit locks they hold. The operator's class must
+    be importable by the workers, and scripts need an
+    `if __name__ == "__main__":` guard.
+
+"""
+import logging
+import multiprocessing
+
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from workflows_core.engine.helpers import run_operator
+from workflows_core.engine.stable_engine import StableEngine
+from workflows_core.operator.abstract_operator import AbstractOperator
+from workflows_core.utils.document_list import DocumentList
+
+logger = logging.getLogger(__file__)
+
+# The operator of the current worker process, set by `_init_worker`
+_worker_operator: Optional[AbstractOperator] = None
+
+
+def _default_start_method() -> str:
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        return "forkserver"
+    return "spawn"
+
+
+def _init_worker(operator: AbstractOperator) -> None:
+    global _worker_operator
+    _worker_operator = operator
+
+
+def _transform_chunk(
+    chunk: DocumentList,
+) -> Tuple[Optional[DocumentList], Optional[Dict[str, str]]]:
+    return run_operator(_worker_operator, chunk)
+
+
+class ProcessPoolStableEngine(StableEngine):
+    # The operator's state is in the worker processes, the parent's copy of
+    # it would be checkpointed
+    SUPPORTS_CHECKPOINTS = False
+
+    def __init__(
+        self,
+        *args,
+        max_workers: Optional[int] = None,
+        mp_context: Optional[str] = None,
+        **kwargs
+    ):
+        """
+        Parameters
+        -----------
+
+        max_workers
+            the number of worker processes, the number of CPUs by default
+        mp_context
+            the multiprocessing start method of the workers, "forkserver"
+            by default ("spawn" where it isn't available). The operator's
+            class needs to be importable by the workers. "fork" copies the
+            parent while its background threads run, and can deadlock on
+            the locks they hold.
+
+        """
+        super().__init__(*args, **kwargs)
+        assert (
+            max_workers is None or max_workers > 0
+        ), "max_workers should be a Positive Integer"
+        self._max_workers = max_workers
+        self._mp_context = _default_start_method() if mp_context is None else mp_context
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def apply(self) -> None:
+        """
+        Returns the ratio of successfully transformed documents / documents
+        processed
+        """
+        self._executor = ProcessPoolExecutor(
+            max_workers=self._max_workers,
+            mp_context=multiprocessing.get_context(self._mp_context),
+            initializer=_init_worker,
+            initargs=(self.operator,),
+        )
+        try:
+            super().apply()
+        finally:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def _map_operator(
+        self, chunks: List[DocumentList]
+    ) -> Iterator[Tuple[Optional[DocumentList], Optional[Dict[str, str]]]]:
+        if self._executor is None:
+            # e.g. `_transform_page` called outside of `apply`
+            yield from super()._map_operator(chunks)
+            return
+        yield from self._executor.map(_transform_chunk, chunks)
@@ -1,5 +1,5 @@
+import math
 import ray
-import pandas as pd
 import pyarrow as pa
 
 from functools import partial
@@ -7,8 +7,9 @@ from typing import Any, Dict, List, Optional
 
 from workflows_core.types import Filter
 from workflows_core.constants import ONE_MB
-from workflows_core.dataset import Dataset
-from workflows_core.engine import AbstractEngine
+from workflows_core.dataset.dataset import Dataset
+from workflows_core.engine.abstract_engine import AbstractEngine
+from workflows_core.engine.helpers import get_shard_filter, update_rows
 
 from ray.data.datasource import Datasource, ReadTask, Reader
 from ray.data.context import DatasetContext
@@ -23,18 +24,20 @@ class _RelevanceDataSourceReader(Reader):
         self,
         dataset: Dataset,
         chunksize: int,
-        size: int,
-        after_ids: List[str],
+        size: Optional[int],
         select_fields: List[str],
         filters: List[Filter],
+        worker_number: Optional[int] = None,
+        total_workers: Optional[int] = None,
     ):
 
         self._dataset = dataset
         self._chunksize = chunksize
         self._size = size
-        self._after_ids = after_ids
         self._select_fields = select_fields
         self._filters = filters
+        self._worker_number = worker_number
+        self._total_workers = total_workers
 
         self._schema = self._get_pyarrow_schema()
 
@@ -45,10 +48,16 @@ class _RelevanceDataSourceReader(Reader):
             select_fields=self._select_fields,
             filters=self._filters,
         )
+        if self._size is None:
+            # Lazy engines don't know the number of documents, the sample
+            # comes with it
+            self._size = result.get("count")
         schema = pa.Table.from_pylist(result["documents"]).schema
         return schema
 
     def estimate_inmemory_data_size(self) -> Optional[int]:
+        if self._size is None:
+            return None
         return ONE_MB * self._size
 
     def prepare_read(*args, **kwargs):
@@ -58,14 +67,37 @@ class _RelevanceDataSourceReader(Reader):
         _check_pyarrow_version()
         read_tasks: List[ReadTask] = []
 
-        def get_data(*args, **kwargs):
-            result = self._dataset._api._get_where(
-                dataset_id=self._dataset._dataset_id, *args, **kwargs
+        # One task per matchModulo partition of the documents, each paging
+        # through its own partition, and no more tasks than pages
+        num_partitions = max(parallelism, 1)
+        if self._size is not None:
+            num_partitions = min(
+                num_partitions, max(math.ceil(self._size / self._chunksize), 1)
             )
-            table = pa.Table.from_pylist(result["documents"])
-            return [table]
 
-        for after_id in self._after_ids:
+        def get_data(filters: List[Filter]):
+            tables = []
+            after_id = None
+            while True:
+                result = self._dataset._api._get_where(
+                    dataset_id=self._dataset._dataset_id,
+                    page_size=self._chunksize,
+                    select_fields=self._select_fields,
+                    filters=filters,
+                    after_id=after_id,
+                )
+                if not result["documents"]:
+                    return tables
+                tables.append(pa.Table.from_pylist(result["documents"]))
+                after_id = result["after_id"]
+
+        for partition in range(num_partitions):
+            filters = self._filters + get_shard_filter(
+                partition,
+                num_partitions,
+                worker_number=self._worker_number,
+                total_workers=self._total_workers,
+            )
             meta = BlockMetadata(
                 num_rows=None,
                 size_bytes=None,
@@ -75,13 +107,7 @@ class _RelevanceDataSourceReader(Reader):
             )
             read_tasks.append(
                 ReadTask(
-                    read_fn=partial(
-                        get_data,
-                        page_size=self._chunksize,
-                        select_fields=self._select_fields,
-                        filters=self._filters,
-                        after_id=after_id,
-                    ),
+                    read_fn=partial(get_data, filters),
                     metadata=meta,
                 )
             )
@@ -94,10 +120,13 @@ class RelevanceDatasource(Datasource):
         self,
         dataset: Dataset,
         chunksize: int,
-        size: int,
-        after_ids: List[str],
+        size: Optional[int],
         select_fields: List[str],
         filters: List[Filter],
+        worker_number: Optional[int] = None,
+        total_workers: Optional[int] = None,
+        max_upload_bytes: Optional[int] = None,
+        max_upload_documents: Optional[int] = None,
     ):
         ctx = DatasetContext.get_current()
         ctx.enable_tensor_extension_casting = False
@@ -105,18 +134,22 @@ class RelevanceDatasource(Datasource):
         self._dataset = dataset
         self._chunksize = chunksize
         self._size = size
-        self._after_ids = after_ids
         self._select_fields = select_fields
         self._filters = filters
+        self._worker_number = worker_number
+        self._total_workers = total_workers
+        self._max_upload_bytes = max_upload_bytes
+        self._max_upload_documents = max_upload_documents
 
     def create_reader(self):
         return _RelevanceDataSourceReader(
             self._dataset,
             self._chunksize,
             self._size,
-            self._after_ids,
             self._select_fields,
             self._filters,
+            worker_number=self._worker_number,
+            total_workers=self._total_workers,
         )
 
     def do_write(
@@ -127,21 +160,40 @@ class RelevanceDatasource(Datasource):
         **write_args,
     ) -> List[ObjectRef[Any]]:
         """
-        Do the writing
+        Updates the documents with the blocks of the operator, which hold the
+        `_id` and the changed values of each document (see `get_table_diff`).
+        Null values are not written, so each document only sends the fields
+        that changed for it.
+
+        Same as the other engines, the schema is only updated by the first
+        block with documents, which is written before any other block.
         """
 
-        def write(block: Block) -> Any:
-            documents = block.to_pylist()
-            return self._dataset.insert_documents(documents=documents)
+        def write(block: Block, update_schema: bool) -> Any:
+            return update_rows(
+                self._dataset,
+                block.to_pylist(),
+                update_schema=update_schema,
+                ingest_in_background=not update_schema,
+                max_bytes=self._max_upload_bytes,
+                max_documents=self._max_upload_documents,
+            )
 
         write_tasks = []
         if ray_remote_args is not None:
             write_block = cached_remote_fn(write).options(**ray_remote_args)
         else:
             write_block = cached_remote_fn(write)
+        schema_updated = False
         for block in blocks:
-            write_task = write_block.remote(block)
-            write_tasks.append(write_task)
+            if schema_updated:
+                write_tasks.append(write_block.remote(block, False))
+            else:
+                # Blocks without changes don't update the schema, keep
+                # writing in the foreground until one did
+                result = ray.get(write_block.remote(block, True))
+                schema_updated = result is not None
+                write_tasks.append(ray.put(result))
         return write_tasks
 
     def on_write_complete(self, write_results: List[Any]) -> None:
@@ -161,38 +213,48 @@ class RayEngine(AbstractEngine):
         compute: str = "actors",
         device: str = "cuda:0",
         num_gpus: int = 1,
+        parallelism: int = -1,
         **kwargs,
     ):
+        """
+        Parameters
+        -----------
+
+        parallelism
+            the number of read tasks, each reading a `matchModulo` partition
+            of the documents. -1 lets Ray pick it from the size of the
+            cluster.
+        """
         super().__init__(**kwargs)
 
         self._compute = compute
         self._device = device
         self._num_gpus = num_gpus
 
-        after_ids = self._get_after_ids()
         self._data_sink = RelevanceDatasource(
             dataset=self.dataset,
-            chunksize=self.chunksize,
-            size=self.size,
-            after_ids=after_ids,
+            chunksize=self.pull_chunksize,
+            # None for lazy engines, the reader takes it from its sample
+            size=self._size,
             select_fields=self._select_fields,
             filters=self._filters,
+            worker_number=self.worker_number,
+            total_workers=self.total_workers,
+            max_upload_bytes=self._max_upload_bytes,
+            max_upload_documents=self._max_upload_documents,
+        )
+        self._data_source = ray.data.read_datasource(
+            self._data_sink, parallelism=parallelism
         )
-        self._data_source = ray.data.read_datasource(self._data_sink)
-
-    def _get_after_ids(self):
-        iterator = self.iterate(select_fields=["_id"])
-
-        after_ids = [None]
-        for chunk in iterator:
-            after_ids.append([chunk[-1]["_id"]])
-
-        return after_ids
 
     def apply(self) -> Any:
 
+        # The batches stay Arrow tables from the reader to the writer
         results = self._data_source.map_batches(
-            self.operator, compute=self._compute, num_gpus=self._num_gpus
+            self.operator,
+            batch_format="pyarrow",
+            compute=self._compute,
+            num_gpus=self._num_gpus,
         )
         results.write_datasource(self._data_sink)
         return
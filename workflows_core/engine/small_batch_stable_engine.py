@@ -10,12 +10,13 @@
 
 """
 import logging
-import traceback
 
 from workflows_core.operator.abstract_operator import AbstractOperator
 from workflows_core.dataset.dataset import Dataset
 from workflows_core.engine.abstract_engine import AbstractEngine
+from workflows_core.engine.helpers import map_operator
 from workflows_core.utils.document_list import DocumentList
+from workflows_core.utils.columnar_document_list import ColumnarDocumentList
 from tqdm.auto import tqdm
 
 logger = logging.getLogger(__file__)
@@ -29,6 +30,7 @@ class SmallBatchStableEngine(AbstractEngine):
         pull_chunksize: int = 5,
         transform_threshold: int = 1000,
         transform_chunksize: int = 20,
+        transform_workers: int = 1,
         *args,
         **kwargs
     ):
@@ -45,8 +47,14 @@ class SmallBatchStableEngine(AbstractEngine):
             number of documents each transform operation will take.
         transform_chunksize: int
             the number of documents that get passed to the operator
+        transform_workers: int
+            the number of `transform_chunksize` chunks that are transformed
+            at the same time on threads, for operators that release the GIL.
+            The chunks are uploaded in their original order.
 
         """
+        # Used to count the chunks while the engine is created
+        self._transform_threshold = transform_threshold
         super().__init__(
             dataset=dataset,
             operator=operator,
@@ -55,74 +63,86 @@ class SmallBatchStableEngine(AbstractEngine):
             **kwargs
         )
 
-        self._transform_threshold = transform_threshold
         self._transform_chunksize = transform_chunksize
+        assert transform_workers > 0, "transform_workers should be a Positive Integer"
+        self._transform_workers = transform_workers
 
         self._show_progress_bar = kwargs.pop("show_progress_bar", True)
-        self._num_chunks = self._size // self._transform_threshold + 1
+
+    def _get_num_chunks(self, size: int) -> int:
+        return size // self._transform_threshold + 1
 
     def _filter_for_non_empty_list(self, docs: DocumentList):
         # if there are more keys than just _id in each document
         # then return that as a list of Documents
         # length of a dictionary is just 1 if there is only 1 key
+        if isinstance(docs, ColumnarDocumentList):
+            return docs.filter(docs.num_fields() > 1)
         return DocumentList([d for d in docs if len(d) > 1])
 
     def apply(self) -> None:
         """
-        Returns the ratio of successful chunks / total chunks needed to iterate over the dataset
+        Returns the ratio of successfully transformed documents / documents
+        processed
         """
         iterator = self.iterate()
-        successful_chunks = 0
+        documents = 0
+        successful_documents = 0
+        self._n_processed = 0
         error_logs = []
 
         batch = []
-
-        for chunk_counter, small_chunk in tqdm(
-            enumerate(iterator),
+        # Counts documents, the size of the pages can change
+        progress_bar = tqdm(
             desc=repr(self.operator),
             disable=(not self._show_progress_bar),
-            total=self._num_chunks,
-        ):
-            self.update_progress(chunk_counter)
+            total=self._size,
+        )
+
+        for chunk_counter, small_chunk in enumerate(iterator):
+            if progress_bar.total is None and self._size is not None:
+                # Lazy engines know the size from the first page
+                progress_bar.total = self._size
+            progress_bar.update(len(small_chunk))
             batch += small_chunk
 
             if len(batch) >= self._transform_threshold:
                 chunk_to_update = []
 
-                for chunk in AbstractEngine.chunk_documents(
-                    self._transform_chunksize, batch
+                slices = list(
+                    AbstractEngine.chunk_documents(self._transform_chunksize, batch)
+                )
+                # place here and not in large_chunk to ensure consistency
+                # across progress and success etc.
+                chunks = [self._filter_for_non_empty_list(chunk) for chunk in slices]
+                for chunk_slice, chunk, (new_batch, error) in zip(
+                    slices,
+                    chunks,
+                    map_operator(
+                        self.operator, chunks, max_workers=self._transform_workers
+                    ),
                 ):
-                    # place here and not in large_chunk to ensure consistency
-                    # across progress and success etc.
-                    chunk = self._filter_for_non_empty_list(chunk)
-                    if len(chunk) == 0:
-                        new_batch = []
-
-                    try:
-                        # note: do not put an IF inside ths try-except-else loop - the if code will not work
-                        new_batch = self.operator(chunk)
-                    except Exception as e:
+                    if error is not None:
                         chunk_error_log = {
-                            "exception": str(e),
-                            "traceback": traceback.format_exc(),
+                            **error,
                             "chunk_ids": [document["_id"] for document in chunk],
                         }
                         error_logs.append(chunk_error_log)
                         logger.error(chunk)
-                        logger.error(traceback.format_exc())
+                        logger.error(error["traceback"])
                     else:
-                        # if there is no exception then this block will be executed
                         # we only update schema on the first chunk
                         # otherwise it breaks down how the backend handles
                         # schema updates
+                        successful_documents += len(chunk_slice)
                         chunk_to_update += new_batch
 
-                    # We want to make sure the schema updates
-                    # on the first chunk upserting
-                    if chunk_counter < self.MAX_SCHEMA_UPDATE_LIMITER:
-                        ingest_in_background = False
-                    else:
-                        ingest_in_background = True
+                # We want to make sure the schema updates
+                # on the first chunk upserting
+                if chunk_counter < self.MAX_SCHEMA_UPDATE_LIMITER:
+                    ingest_in_background = False
+                else:
+                    ingest_in_background = True
 
                 result = self.update_chunk(
                     chunk_to_update,
@@ -130,15 +150,14 @@ class SmallBatchStableEngine(AbstractEngine):
                     ingest_in_background=ingest_in_background,
                 )
 
-                successful_chunks += 1
+                documents += len(batch)
                 logger.debug(result)
+                self._record_processed(len(batch))
                 batch = []
 
-        # executes after everything wraps up
-        if self.job_id:
-            self.update_progress(chunk_counter + 1)
+        progress_bar.close()
 
         self._error_logs = error_logs
-        if self.num_chunks > 0:
-            self._success_ratio = successful_chunks / self.num_chunks
+        if documents > 0:
+            self._success_ratio = successful_documents / documents
             logger.debug({"success_ratio": self._success_ratio})
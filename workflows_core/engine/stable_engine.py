@@ -8,101 +8,253 @@
     We download a large chunk and upsert large chunks to avoid hammering
     our servers.
 
+    With `pipeline=True` the next page is prefetched on a background thread
+    and the previous page is uploaded on another one while the current page
+    is being transformed, so that a page takes roughly
+    max(network, compute) instead of their sum.
+
 """
 import logging
-import traceback
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
 from workflows_core.engine.abstract_engine import AbstractEngine
+from workflows_core.engine.helpers import map_operator, prefetch
+from workflows_core.utils.document import Document
 from workflows_core.utils.document_list import DocumentList
+from workflows_core.utils.columnar_document_list import ColumnarDocumentList
 from tqdm.auto import tqdm
 
 logger = logging.getLogger(__file__)
 
 
 class StableEngine(AbstractEngine):
-    def __init__(self, *args, transform_chunksize: int = 20, **kwargs):
+    SUPPORTS_CHECKPOINTS = True
+
+    def __init__(
+        self,
+        *args,
+        transform_chunksize: int = 20,
+        pipeline: bool = False,
+        prefetch_size: int = 1,
+        max_pending_uploads: int = 1,
+        transform_workers: int = 1,
+        **kwargs
+    ):
         """
         Parameters
         -----------
 
         pull_chunksize
             the number of documents that are downloaded
+        pipeline
+            if True, overlaps downloading the next page and uploading the
+            previous page with transforming the current page
+        prefetch_size
+            the number of pages that are downloaded ahead of the transform
+            when `pipeline=True`
+        max_pending_uploads
+            the number of transformed pages that can wait to be uploaded
+            when `pipeline=True` before the transform blocks
+        transform_workers
+            the number of `transform_chunksize` slices of a page that are
+            transformed at the same time on threads, for operators that
+            release the GIL (NumPy, model inference...). The slices are
+            uploaded in their original order whatever order they finish in.
 
         """
+        self._show_progress_bar = kwargs.pop("show_progress_bar", True)
         super().__init__(*args, **kwargs)
         self._transform_chunksize = min(self.pull_chunksize, transform_chunksize)
-        self._show_progress_bar = kwargs.pop("show_progress_bar", True)
+
+        assert prefetch_size > 0, "prefetch_size should be a Positive Integer"
+        assert (
+            max_pending_uploads > 0
+        ), "max_pending_uploads should be a Positive Integer"
+        self._pipeline = pipeline
+        self._prefetch_size = prefetch_size
+        self._max_pending_uploads = max_pending_uploads
+        assert transform_workers > 0, "transform_workers should be a Positive Integer"
+        self._transform_workers = transform_workers
 
     def _filter_for_non_empty_list(self, docs: DocumentList):
         # if there are more keys than just _id in each document
         # then return that as a list of Documents
         # length of a dictionary is just 1 if there is only 1 key
+        if isinstance(docs, ColumnarDocumentList):
+            return docs.filter(docs.num_fields() > 1)
         return DocumentList([d for d in docs if len(d) > 1])
 
     def apply(self) -> None:
         """
-        Returns the ratio of successful chunks / total chunks needed to iterate over the dataset
+        Returns the ratio of successfully transformed documents / documents
+        processed
         """
         iterator = self.iterate()
-        successful_chunks = 0
-        error_logs = []
-
-        for chunk_counter, large_chunk in enumerate(
-            tqdm(
-                iterator,
-                desc=repr(self.operator),
-                disable=(not self._show_progress_bar),
-                total=self.num_chunks,
+        # Carry on from the checkpoint when resuming
+        checkpoint = self._checkpoint or {}
+        error_logs = list(checkpoint.get("error_logs", []))
+        # Read by `_on_chunk_uploaded` while the engine runs
+        self._error_logs = error_logs
+        self._n_processed = checkpoint.get("documents", 0)
+
+        if self._pipeline:
+            iterator = prefetch(iterator, max_prefetch=self._prefetch_size)
+            uploader = ThreadPoolExecutor(max_workers=1)
+        else:
+            uploader = None
+        # (n_documents, future, checkpoint) of the pages that are still uploading
+        pending_uploads = deque()
+
+        try:
+            documents, successful_documents = self._apply(
+                iterator, error_logs, uploader, pending_uploads
             )
-        ):
-            self.update_progress(0)
-            chunk_to_update = []
-            for chunk in AbstractEngine.chunk_documents(
-                self._transform_chunksize, large_chunk
-            ):
-                # place here and not in large_chunk to ensure consistency
-                # across progress and success etc.
-                chunk = self._filter_for_non_empty_list(chunk)
-                if len(chunk) == 0:
-                    new_batch = []
-                try:
-                    # note: do not put an IF inside ths try-except-else loop - the if code will not work
-                    new_batch = self.operator(chunk)
-                except Exception as e:
-                    chunk_error_log = {
-                        "exception": str(e),
-                        "traceback": traceback.format_exc(),
-                        "chunk_ids": [document["_id"] for document in chunk],
-                    }
-                    error_logs.append(chunk_error_log)
-                    logger.error(chunk)
-                    logger.error(traceback.format_exc())
+            self._wait_for_uploads(pending_uploads)
+            self._clear_checkpoint()
+        finally:
+            if uploader is not None:
+                iterator.close()
+                uploader.shutdown(wait=True)
+
+        self._error_logs = error_logs
+        if documents > 0:
+            self._success_ratio = successful_documents / documents
+            logger.debug({"success_ratio": self._success_ratio})
+
+    def _apply(
+        self, iterator, error_logs, uploader, pending_uploads
+    ) -> Tuple[int, int]:
+        checkpoint = self._checkpoint or {}
+        start = checkpoint.get("chunks", 0)
+        documents = checkpoint.get("documents", 0)
+        successful_documents = checkpoint.get("successful_documents", 0)
+
+        # Counts documents, the size of the pages can change
+        progress_bar = tqdm(
+            desc=repr(self.operator),
+            disable=(not self._show_progress_bar),
+            initial=documents,
+            total=self._size,
+        )
+        try:
+            for chunk_counter, large_chunk in enumerate(iterator, start=start):
+                if progress_bar.total is None and self._size is not None:
+                    # Lazy engines know the size from the first page
+                    progress_bar.total = self._size
+                cursor = self._page_cursors.popleft() if self._page_cursors else None
+                chunk_to_update, page_successful_documents = self._transform_page(
+                    large_chunk, error_logs
+                )
+                documents += len(large_chunk)
+                successful_documents += page_successful_documents
+                # Where to resume from once this page is uploaded
+                checkpoint = None
+                if cursor is not None:
+                    checkpoint = dict(
+                        after_id=cursor,
+                        chunks=chunk_counter + 1,
+                        documents=documents,
+                        successful_documents=successful_documents,
+                        error_count=len(error_logs),
+                        operator_state=self.operator.get_state(),
+                    )
+
+                # We want to make sure the schema updates
+                # on the first chunk upserting
+                if chunk_counter < self.MAX_SCHEMA_UPDATE_LIMITER:
+                    ingest_in_background = False
                 else:
-                    # if there is no exception then this block will be executed
-                    # we only update schema on the first chunk
-                    # otherwise it breaks down how the backend handles
-                    # schema updates
-                    successful_chunks += 1
-                    chunk_to_update.extend(new_batch)
-
-            # We want to make sure the schema updates
-            # on the first chunk upserting
-            if chunk_counter < self.MAX_SCHEMA_UPDATE_LIMITER:
-                ingest_in_background = False
+                    ingest_in_background = True
+
+                if uploader is None or not ingest_in_background:
+                    # The schema updating chunks are uploaded in the foreground
+                    # so that no later chunk can reach the backend before them
+                    self._wait_for_uploads(pending_uploads)
+                    result = self.update_chunk(
+                        chunk_to_update,
+                        update_schema=chunk_counter < self.MAX_SCHEMA_UPDATE_LIMITER,
+                        ingest_in_background=ingest_in_background,
+                    )
+                    self._on_chunk_uploaded(len(large_chunk), result, checkpoint)
+                else:
+                    # Backpressure - don't let transformed pages pile up in memory
+                    # faster than they can be uploaded
+                    while len(pending_uploads) >= self._max_pending_uploads:
+                        self._wait_for_upload(pending_uploads)
+                    future = uploader.submit(
+                        self.update_chunk,
+                        chunk_to_update,
+                        update_schema=False,
+                        ingest_in_background=ingest_in_background,
+                    )
+                    pending_uploads.append((len(large_chunk), future, checkpoint))
+                progress_bar.update(len(large_chunk))
+        finally:
+            progress_bar.close()
+
+        return documents, successful_documents
+
+    def _transform_page(
+        self, large_chunk: DocumentList, error_logs: List[Dict[str, Any]]
+    ) -> Tuple[List[Document], int]:
+        """
+        Runs the operator over `large_chunk` in `transform_chunksize` slices.
+
+        Returns the documents to update and the number of documents in the
+        successful slices. The failed slices are logged into `error_logs`.
+        """
+        successful_documents = 0
+        chunk_to_update = []
+        slices = list(
+            AbstractEngine.chunk_documents(self._transform_chunksize, large_chunk)
+        )
+        # place here and not in large_chunk to ensure consistency
+        # across progress and success etc.
+        chunks = [self._filter_for_non_empty_list(chunk) for chunk in slices]
+        for chunk_slice, chunk, (new_batch, error) in zip(
+            slices, chunks, self._map_operator(chunks)
+        ):
+            if error is not None:
+                chunk_error_log = {
+                    **error,
+                    "chunk_ids": [document["_id"] for document in chunk],
+                }
+                error_logs.append(chunk_error_log)
+                logger.error(chunk)
+                logger.error(error["traceback"])
             else:
-                ingest_in_background = True
-            result = self.update_chunk(
-                chunk_to_update,
-                update_schema=chunk_counter < self.MAX_SCHEMA_UPDATE_LIMITER,
-                ingest_in_background=ingest_in_background,
-            )
-            logger.debug(result)
+                # we only update schema on the first chunk
+                # otherwise it breaks down how the backend handles
+                # schema updates
+                successful_documents += len(chunk_slice)
+                chunk_to_update.extend(new_batch)
 
-            # executes after everything wraps up
-            if self.job_id:
-                self.update_progress(chunk_counter + 1)
+        return chunk_to_update, successful_documents
 
-        self._error_logs = error_logs
-        if self.num_chunks > 0:
-            self._success_ratio = successful_chunks / self.num_chunks
-            logger.debug({"success_ratio": self._success_ratio})
+    def _map_operator(
+        self, chunks: List[DocumentList]
+    ) -> Iterator[Tuple[Optional[DocumentList], Optional[Dict[str, str]]]]:
+        """
+        Runs the operator on each of `chunks`, yielding the results in the
+        same order. Subclasses override this to run the chunks elsewhere.
+        """
+        return map_operator(self.operator, chunks, max_workers=self._transform_workers)
+
+    def _wait_for_upload(self, pending_uploads: deque):
+        n_documents, future, checkpoint = pending_uploads.popleft()
+        self._on_chunk_uploaded(n_documents, future.result(), checkpoint)
+
+    def _wait_for_uploads(self, pending_uploads: deque):
+        while pending_uploads:
+            self._wait_for_upload(pending_uploads)
+
+    def _on_chunk_uploaded(self, n_documents: int, result, checkpoint=None):
+        logger.debug(result)
+        if checkpoint is not None:
+            self._save_checkpoint(checkpoint, self._error_logs)
+
+        # executes after everything wraps up
+        self._record_processed(n_documents)
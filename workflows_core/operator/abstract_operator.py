@@ -10,18 +10,76 @@ from typing import Any, Dict, List, Optional
 from workflows_core.dataset.dataset import Dataset
 from workflows_core.utils.document import Document
 from workflows_core.utils.document_list import DocumentList
+from workflows_core.utils.columnar_document_list import ColumnarDocumentList
 
 logger = logging.getLogger(__file__)
 
 
+def get_vector_diff_mask(
+    old_vectors: List[Any], new_vectors: List[Any], tolerance: float = 0.0
+) -> np.ndarray:
+    """
+    Compares the values of one vector field across a whole chunk at once.
+
+    The vectors of the same length are stacked into one 2-D array per side
+    and compared in a single NumPy operation. A vector is changed when any
+    element differs by more than `tolerance`, when it appears or disappears
+    or when its length changes.
+
+    Returns a boolean mask with one entry per document, True where the
+    vector changed.
+    """
+    changed = np.zeros(len(new_vectors), dtype=bool)
+    indices_by_length: Dict[int, List[int]] = {}
+    for index, (old_vector, new_vector) in enumerate(zip(old_vectors, new_vectors)):
+        if not isinstance(old_vector, (list, np.ndarray)) or not isinstance(
+            new_vector, (list, np.ndarray)
+        ):
+            changed[index] = is_different("", old_vector, new_vector)
+        elif len(old_vector) != len(new_vector):
+            changed[index] = True
+        else:
+            indices_by_length.setdefault(len(new_vector), []).append(index)
+
+    for indices in indices_by_length.values():
+        try:
+            old_array = np.array([old_vectors[i] for i in indices], dtype=float)
+            new_array = np.array([new_vectors[i] for i in indices], dtype=float)
+        except (TypeError, ValueError):
+            # not numeric or nested, compare the values as they are
+            for index in indices:
+                changed[index] = old_vectors[index] != new_vectors[index]
+            continue
+        unchanged = np.isclose(
+            old_array, new_array, rtol=0.0, atol=tolerance, equal_nan=True
+        ).all(axis=-1)
+        changed[indices] = ~unchanged
+
+    return changed
+
+
 def is_different(field: str, value1: Any, value2: Any) -> bool:
     """
     An all purpose function that checks if two values are different
     """
-    if "_vector_" in field and isinstance(value1, list) and isinstance(value2, list):
-        element_wise_diff = abs(np.array(value1)) - abs(np.array(value2))
-        sums = np.sum(element_wise_diff)
-        return sums > 0
+    if isinstance(value1, np.ndarray) or isinstance(value2, np.ndarray):
+        if not isinstance(value1, (list, np.ndarray)) or not isinstance(
+            value2, (list, np.ndarray)
+        ):
+            # an array that appears or disappears, or replaces a scalar
+            return True
+        array1, array2 = np.asarray(value1), np.asarray(value2)
+        if array1.shape != array2.shape:
+            return True
+        try:
+            return not np.isclose(
+                array1, array2, rtol=0.0, atol=0.0, equal_nan=True
+            ).all()
+        except TypeError:
+            return not np.array_equal(array1, array2)
+
+    elif "_vector_" in field and isinstance(value1, list) and isinstance(value2, list):
+        return bool(get_vector_diff_mask([value1], [value2])[0])
 
     elif isinstance(value1, dict) and isinstance(value2, dict):
         return json.dumps(value1, sort_keys=True) != json.dumps(value2, sort_keys=True)
@@ -30,14 +88,32 @@ def is_different(field: str, value1: Any, value2: Any) -> bool:
         return value1 != value2
 
 
-def get_document_diff(old_document: Document, new_document: Document) -> Document:
+def get_document_diff(
+    old_document: Document,
+    new_document: Document,
+    changed_fields: Optional[Dict[str, bool]] = None,
+) -> Document:
+    """
+    Returns the `_id` and the fields of `new_document` that are new or
+    different to `old_document`, or None if nothing changed.
+
+    `changed_fields` holds the precomputed result of the comparison for
+    some fields (e.g. the vector fields compared for a whole chunk), which
+    are then not compared again.
+    """
+    if changed_fields is None:
+        changed_fields = {}
+
     pp_document = Document()
     new_fields = new_document.keys()
     old_fields = old_document.keys()
     for field in new_fields:
-        old_value = old_document.get(field, None)
         new_value = new_document.get(field, None)
-        value_diff = is_different(field, old_value, new_value)
+        if field in changed_fields:
+            value_diff = changed_fields[field]
+        else:
+            old_value = old_document.get(field, None)
+            value_diff = is_different(field, old_value, new_value)
         if field not in old_fields or value_diff or field == "_id":
             pp_document[field] = new_value
 
@@ -45,14 +121,79 @@ def get_document_diff(old_document: Document, new_document: Document) -> Documen
         return pp_document
 
 
+def get_output_fields(
+    documents: DocumentList, output_fields: List[str]
+) -> DocumentList:
+    """
+    Keeps only the `_id` and the `output_fields` of each document, dropping
+    the documents that have none of the `output_fields`.
+    """
+    if isinstance(documents, ColumnarDocumentList):
+        # only materialise the columns that are uploaded
+        documents = documents.select(["_id", *output_fields])
+    missing = object()
+    batch = []
+    for document in documents:
+        if not isinstance(document, Document):
+            document = Document(document)
+        pp_document = Document({"_id": document["_id"]})
+        for field in output_fields:
+            value = document.get(field, missing)
+            if value is not missing:
+                pp_document[field] = value
+
+        if len(pp_document.data) > 1:
+            batch.append(pp_document)
+
+    return DocumentList(batch)
+
+
 class AbstractOperator(ABC):
+    # Operators that don't call `super().__init__` keep the default behaviour
+    _inplace: bool = False
+    _vector_tolerance: float = 0.0
+    _columnar: bool = False
+
     def __init__(
         self,
         input_fields: Optional[List[str]] = None,
         output_fields: Optional[List[str]] = None,
+        inplace: bool = False,
+        vector_tolerance: float = 0.0,
+        columnar: bool = False,
     ):
+        """
+        Parameters
+        -----------
+
+        input_fields
+            the fields the operator reads
+        output_fields
+            the fields the operator writes
+        inplace
+            if True, `transform` runs on the documents as they were downloaded
+            instead of on a deep copy, and only the `_id` and `output_fields`
+            of each document are uploaded, without diffing against the old
+            documents. Requires `output_fields`.
+        vector_tolerance
+            vector fields whose elements all changed by at most this much are
+            considered unchanged and are not uploaded
+        columnar
+            if True, `transform` is given the `ColumnarDocumentList` pages of
+            engines created with `columnar=True` as they are, and updates
+            them in place like `inplace`. Requires `output_fields`.
+            Otherwise columnar pages are converted to a `DocumentList` first.
+
+        """
+        if inplace or columnar:
+            assert (
+                output_fields
+            ), "inplace and columnar operators need to declare output_fields"
         self._input_fields = input_fields
         self._output_fields = output_fields
+        self._inplace = inplace
+        self._vector_tolerance = vector_tolerance
+        self._columnar = columnar
 
     @abstractmethod
     def transform(self, documents: DocumentList) -> DocumentList:
@@ -65,20 +206,60 @@ class AbstractOperator(ABC):
         return str(type(self).__name__)
 
     def __call__(self, old_documents: DocumentList) -> DocumentList:
+        if isinstance(old_documents, ColumnarDocumentList):
+            if self._columnar:
+                new_documents = self.transform(old_documents)
+                return get_output_fields(new_documents, self._output_fields)
+            old_documents = old_documents.to_document_list()
+
+        if self._inplace:
+            new_documents = self.transform(old_documents)
+            return get_output_fields(new_documents, self._output_fields)
+
         new_documents = deepcopy(old_documents)
         new_documents = self.transform(new_documents)
-        new_documents = AbstractOperator._postprocess(new_documents, old_documents)
+        new_documents = AbstractOperator._postprocess(
+            new_documents, old_documents, tolerance=self._vector_tolerance
+        )
         return new_documents
 
     @staticmethod
-    def _postprocess(new_batch: DocumentList, old_batch: DocumentList) -> DocumentList:
+    def _postprocess(
+        new_batch: DocumentList, old_batch: DocumentList, tolerance: float = 0.0
+    ) -> DocumentList:
         """
         Removes fields from `new_batch` that are present in the `old_keys` list.
         Necessary to avoid bloating the upload payload with unnecesary information.
+
+        The vector fields are compared for the whole batch at once, see
+        `get_vector_diff_mask`.
         """
+        pairs = list(zip(old_batch, new_batch))
+
+        vector_fields = []
+        for _, new_document in pairs:
+            for field in new_document.keys():
+                if "_vector_" in field and field not in vector_fields:
+                    vector_fields.append(field)
+
+        changed_vectors = {
+            field: get_vector_diff_mask(
+                [old_document.get(field, None) for old_document, _ in pairs],
+                [new_document.get(field, None) for _, new_document in pairs],
+                tolerance=tolerance,
+            )
+            for field in vector_fields
+        }
+
         batch = []
-        for old_document, new_document in zip(old_batch, new_batch):
-            document_diff = get_document_diff(old_document, new_document)
+        for index, (old_document, new_document) in enumerate(pairs):
+            document_diff = get_document_diff(
+                old_document,
+                new_document,
+                changed_fields={
+                    field: bool(mask[index]) for field, mask in changed_vectors.items()
+                },
+            )
             if document_diff:
                 batch.append(document_diff)
 
@@ -89,3 +270,18 @@ class AbstractOperator(ABC):
 
     def post_hooks(self, dataset: Dataset):
         pass
+
+    def get_state(self) -> Optional[Dict[str, Any]]:
+        """
+        The JSON serializable state the operator built up so far (e.g. counts
+        or a model's parameters), saved in the engine's checkpoints. None for
+        stateless operators.
+        """
+        return None
+
+    def set_state(self, state: Dict[str, Any]):
+        """
+        Restores the state returned by `get_state` when an engine resumes
+        from a checkpoint.
+        """
+        pass
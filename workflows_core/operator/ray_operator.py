@@ -1,21 +1,237 @@
-import pandas as pd
-import pyarrow as pa
+"""
+Operators for the `RayEngine`.
 
-from ray.data.block import Block
-from workflows_core.operator import AbstractOperator
+The `RayEngine` reads the dataset as Arrow tables, and `AbstractRayOperator`
+transforms them without converting them to documents or pandas. The output
+is diffed against the input column by column, so that only `_id` and the
+values that are new or changed are written back with `bulk_update`.
+
+Nested fields are compared on their leaves: struct columns are split into
+one dotted column per field (`_cluster_.text_vector_.kmeans`), the same
+fields as `Document.keys`.
+
+.. code-block::
+
+    class AddOneOperator(AbstractRayOperator):
+        def transform(self, table: pa.Table) -> pa.Table:
+            index = table.schema.get_field_index("value")
+            return table.set_column(
+                index, "value", pc.add(table.column("value"), 1)
+            )
+
+"""
+import numpy as np
+
+from abc import abstractmethod
+from typing import List, Optional
+
+from workflows_core.operator.abstract_operator import (
+    AbstractOperator,
+    get_vector_diff_mask,
+    is_different,
+)
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:
+    pa = None
+    pc = None
+
+
+def _to_array(column) -> "pa.Array":
+    if isinstance(column, pa.ChunkedArray):
+        return column.combine_chunks()
+    return column
+
+
+def _to_mask(array: "pa.Array") -> np.ndarray:
+    return np.asarray(array.to_numpy(zero_copy_only=False), dtype=bool)
+
+
+def _is_numeric_list(data_type: "pa.DataType") -> bool:
+    if not (
+        pa.types.is_list(data_type)
+        or pa.types.is_large_list(data_type)
+        or pa.types.is_fixed_size_list(data_type)
+    ):
+        return False
+    value_type = data_type.value_type
+    return pa.types.is_floating(value_type) or pa.types.is_integer(value_type)
+
+
+def _is_under(field: str, prefix: str) -> bool:
+    return field == prefix or field.startswith(prefix + ".")
+
+
+def flatten_table(table: "pa.Table") -> "pa.Table":
+    """
+    Splits the struct columns of `table` into one dotted column per field,
+    e.g. a `_cluster_` struct into `_cluster_.text_vector_.kmeans`.
+    """
+    while any(pa.types.is_struct(field.type) for field in table.schema):
+        table = table.flatten()
+    return table
+
+
+def _get_vector_matrix(column: "pa.Array") -> Optional[np.ndarray]:
+    # A 2-D array of the vectors of `column`, or None when some are missing
+    # or have different lengths
+    if column.null_count:
+        return None
+    lengths = _to_array(pc.list_value_length(column)).to_numpy(zero_copy_only=False)
+    if len(lengths) == 0 or lengths.min() != lengths.max():
+        return None
+    values = pc.list_flatten(column).to_numpy(zero_copy_only=False)
+    return values.reshape(len(column), int(lengths[0]))
+
+
+def get_column_diff_mask(
+    field: str, old_column, new_column, tolerance: float = 0.0
+) -> np.ndarray:
+    """
+    Compares the old and new values of one column of a batch.
+
+    Primitive columns are compared with one Arrow kernel and vector columns
+    (`_vector_` in the name) with one NumPy operation, see
+    `get_vector_diff_mask`. Nested columns, and columns whose type changed,
+    are compared value by value with `is_different`.
+
+    Returns a boolean mask with one entry per row, True where the value
+    changed.
+    """
+    old_column = _to_array(old_column)
+    new_column = _to_array(new_column)
+    assert len(old_column) == len(new_column), "the columns should be the same length"
+
+    if old_column.type == new_column.type:
+        if "_vector_" in field and _is_numeric_list(new_column.type):
+            old_vectors = _get_vector_matrix(old_column)
+            new_vectors = _get_vector_matrix(new_column)
+            if (
+                old_vectors is not None
+                and new_vectors is not None
+                and old_vectors.shape == new_vectors.shape
+            ):
+                unchanged = np.isclose(
+                    old_vectors, new_vectors, rtol=0.0, atol=tolerance, equal_nan=True
+                ).all(axis=-1)
+                return ~unchanged
+            return get_vector_diff_mask(
+                old_column.to_pylist(), new_column.to_pylist(), tolerance=tolerance
+            )
+
+        if not pa.types.is_nested(new_column.type):
+            try:
+                equal = pc.equal(old_column, new_column)
+            except pa.ArrowNotImplementedError:
+                pass
+            else:
+                both_null = pc.and_(old_column.is_null(), new_column.is_null())
+                unchanged = pc.or_(pc.fill_null(equal, False), both_null)
+                return ~_to_mask(unchanged)
+
+    return np.array(
+        [
+            is_different(field, old_value, new_value)
+            for old_value, new_value in zip(
+                old_column.to_pylist(), new_column.to_pylist()
+            )
+        ],
+        dtype=bool,
+    )
+
+
+def _select_changes(table: "pa.Table", changes) -> "pa.Table":
+    # `_id` and the changed values of `changes` (field, column, mask), with
+    # the other values set to null and the rows without any change dropped
+    names = ["_id"]
+    columns = [_to_array(table.column("_id"))]
+    changed_rows = np.zeros(table.num_rows, dtype=bool)
+    for field, column, mask in changes:
+        if not mask.any():
+            continue
+        if not mask.all():
+            column = pc.if_else(
+                pa.array(mask), column, pa.scalar(None, type=column.type)
+            )
+        names.append(field)
+        columns.append(column)
+        changed_rows |= mask
+
+    return pa.Table.from_arrays(columns, names=names).filter(pa.array(changed_rows))
+
+
+def get_table_diff(
+    new_table: "pa.Table", old_table: "pa.Table", tolerance: float = 0.0
+) -> "pa.Table":
+    """
+    Returns the `_id` and the columns of `new_table` that are new or
+    different to `old_table`, the Arrow counterpart of
+    `AbstractOperator._postprocess`.
+
+    The rows of both tables are the same documents in the same order. The
+    values that didn't change are set to null and the rows where nothing
+    changed are dropped. Null values in `new_table` are never written.
+    """
+    assert (
+        new_table.num_rows == old_table.num_rows
+    ), "transform should return one row per document"
+    new_table = flatten_table(new_table)
+    old_table = flatten_table(old_table)
+
+    changes = []
+    for field in new_table.column_names:
+        if field == "_id":
+            continue
+        column = _to_array(new_table.column(field))
+        mask = _to_mask(column.is_valid())
+        if field in old_table.column_names:
+            mask &= get_column_diff_mask(
+                field, old_table.column(field), column, tolerance=tolerance
+            )
+        changes.append((field, column, mask))
+
+    return _select_changes(new_table, changes)
+
+
+def get_table_output_fields(table: "pa.Table", output_fields: List[str]) -> "pa.Table":
+    """
+    Keeps only the `_id` and the `output_fields` of `table`, dropping the
+    rows that have none of the `output_fields`, the Arrow counterpart of
+    `get_output_fields`.
+    """
+    table = flatten_table(table)
+    changes = []
+    for field in table.column_names:
+        if any(_is_under(field, output_field) for output_field in output_fields):
+            column = _to_array(table.column(field))
+            changes.append((field, column, _to_mask(column.is_valid())))
+
+    return _select_changes(table, changes)
 
 
 class AbstractRayOperator(AbstractOperator):
-    def __call__(self, batch: pd.DataFrame) -> Block:
-        batch = pd.json_normalize(batch.to_dict("records"))
-        old = batch.copy()
-        new = self.transform(batch)
-        new = self._postprocess(new, old)
-        return pa.Table.from_pandas(new)
-
-    @staticmethod
-    def _postprocess(new: pd.DataFrame, old: pd.DataFrame):
-        import pdb
-
-        pdb.set_trace()
-        return new
+    """
+    An operator whose `transform` takes and returns a `pyarrow.Table` of
+    the batch, for the `RayEngine`.
+
+    Arrow tables are immutable so the input batch is never copied: the
+    transform returns a new table (with `set_column`, `append_column`...)
+    that is diffed against the input with `get_table_diff`. With
+    `inplace=True` only the `_id` and `output_fields` columns are returned,
+    without diffing.
+    """
+
+    @abstractmethod
+    def transform(self, table: "pa.Table") -> "pa.Table":
+        """
+        Every Operator needs a transform function
+        """
+        raise NotImplementedError
+
+    def __call__(self, batch: "pa.Table") -> "pa.Table":
+        new_batch = self.transform(batch)
+        if self._inplace:
+            return get_table_output_fields(new_batch, self._output_fields)
+        return get_table_diff(new_batch, batch, tolerance=self._vector_tolerance)
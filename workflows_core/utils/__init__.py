@@ -4,3 +4,5 @@ from workflows_core.utils.example_documents import *
 from workflows_core.utils.json_encoder import *
 from workflows_core.utils.encode_parameters import *
 from workflows_core.utils.seed import *
+from workflows_core.utils.columnar_document_list import *
+from workflows_core.utils.disk_column_store import *
@@ -0,0 +1,390 @@
+"""
+A page of documents stored column by column in Arrow arrays.
+
+Each flattened (dotted) field of the documents is one column. Vector fields
+(`_vector_` in the name) are stored as fixed size lists of float32, so that
+`get_vector` returns a 2-D NumPy array that is a view of the Arrow buffer
+instead of a list of Python lists.
+
+Requires `pyarrow` (`pip install RelevanceAI-Workflows-Core[columnar]`).
+
+.. code-block::
+
+    documents = dataset.get_documents(1000, columnar=True)["documents"]
+    vectors = documents.get_vector("text_vector_")  # (1000, 768) float32
+    documents.set_column("_cluster_.text_vector_.kmeans", labels)
+
+"""
+import numpy as np
+
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Union
+
+from workflows_core.utils.document import Document, compile_path
+from workflows_core.utils.document_list import DocumentList
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+# A column is an Arrow array, or a Python list when Arrow can't hold the
+# values as they are (mixed types, or dicts inside lists that Arrow would
+# turn into structs with all keys filled in)
+Column = Union["pa.Array", List[Any]]
+
+
+def _flatten(value: Any, prefix: str, row: Dict[str, Any]) -> None:
+    # Same fields as `Document.keys`: empty dicts and None have no fields
+    if isinstance(value, dict):
+        for key, child in value.items():
+            _flatten(child, f"{prefix}.{key}", row)
+    elif value is not None:
+        row[prefix] = value
+
+
+def _is_vector_field(field: str) -> bool:
+    return "_vector_" in field
+
+
+def _has_struct(data_type: "pa.DataType") -> bool:
+    if pa.types.is_struct(data_type) or pa.types.is_map(data_type):
+        return True
+    if (
+        pa.types.is_list(data_type)
+        or pa.types.is_large_list(data_type)
+        or pa.types.is_fixed_size_list(data_type)
+    ):
+        return _has_struct(data_type.value_type)
+    return False
+
+
+def _vector_column(matrix: np.ndarray, valid: Optional[np.ndarray] = None):
+    # `pa.array` of a contiguous float32 array doesn't copy it
+    values = pa.array(np.ascontiguousarray(matrix, dtype=np.float32).reshape(-1))
+    dimensions = matrix.shape[1]
+    if valid is None or valid.all():
+        return pa.FixedSizeListArray.from_arrays(values, dimensions)
+    validity = pa.array(valid).buffers()[1]
+    return pa.Array.from_buffers(
+        pa.list_(pa.float32(), dimensions),
+        len(matrix),
+        [validity],
+        children=[values],
+    )
+
+
+def _to_vector_column(values: List[Any]) -> Optional["pa.Array"]:
+    valid = np.array([value is not None for value in values], dtype=bool)
+    indices = np.flatnonzero(valid)
+    if len(indices) == 0:
+        return None
+    try:
+        vectors = np.asarray([values[i] for i in indices], dtype=np.float32)
+    except (TypeError, ValueError):
+        return None
+    if vectors.ndim != 2 or vectors.shape[1] == 0:
+        return None
+    matrix = np.full((len(values), vectors.shape[1]), np.nan, dtype=np.float32)
+    matrix[indices] = vectors
+    return _vector_column(matrix, valid)
+
+
+def _to_column(field: str, values: List[Any]) -> Column:
+    if _is_vector_field(field):
+        column = _to_vector_column(values)
+        if column is not None:
+            return column
+    try:
+        column = pa.array(values)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+        return values
+    except (TypeError, ValueError, OverflowError):
+        return values
+    if _has_struct(column.type):
+        return values
+    return column
+
+
+def _is_vector_column(column: Column) -> bool:
+    return isinstance(column, pa.Array) and pa.types.is_fixed_size_list(column.type)
+
+
+def _to_pylist(column: Column) -> List[Any]:
+    if isinstance(column, pa.Array):
+        return column.to_pylist()
+    return column
+
+
+def _is_under(field: str, prefix: str) -> bool:
+    return field == prefix or field.startswith(prefix + ".")
+
+
+class ColumnarDocumentList:
+    """
+    A page of documents as a set of columns, one per flattened field.
+
+    Rows are only turned into `Document`s when they are accessed (indexing,
+    iterating, `to_document_list`), so operators that work on whole columns
+    never create a Python object per document. Missing values and None are
+    the same thing here, and are left out of the materialised documents.
+
+    Parameters
+    -----------
+
+    columns
+        the columns by flattened field name, all of the same length
+    length
+        the number of documents, needed when there are no columns
+    """
+
+    def __init__(self, columns: Dict[str, Column], length: Optional[int] = None):
+        if pa is None:
+            raise ImportError(
+                "ColumnarDocumentList requires pyarrow, "
+                "`pip install RelevanceAI-Workflows-Core[columnar]`"
+            )
+        if length is None:
+            length = len(next(iter(columns.values()))) if columns else 0
+        assert all(
+            len(column) == length for column in columns.values()
+        ), "All columns should have one value per document"
+        self._columns = dict(columns)
+        self._length = length
+
+    @classmethod
+    def from_documents(
+        cls, documents: Union[Iterable[Dict[str, Any]], DocumentList]
+    ) -> "ColumnarDocumentList":
+        """
+        Builds the columns from `documents`, which can be an iterator (e.g.
+        a `DocumentStream`) that is consumed one document at a time, so
+        that the documents never all have to be in memory as Python objects.
+        """
+        values_by_field: Dict[str, List[Any]] = {}
+        length = 0
+        for index, document in enumerate(documents):
+            if isinstance(document, Document):
+                document = document.data
+            row = {}
+            for key, value in document.items():
+                _flatten(value, str(key), row)
+            for field, value in row.items():
+                values = values_by_field.setdefault(field, [])
+                if len(values) < index:
+                    # missing in the previous documents
+                    values.extend([None] * (index - len(values)))
+                values.append(value)
+            length = index + 1
+
+        for values in values_by_field.values():
+            values.extend([None] * (length - len(values)))
+        return cls(
+            {
+                field: _to_column(field, values)
+                for field, values in values_by_field.items()
+            },
+            length=length,
+        )
+
+    @property
+    def fields(self) -> List[str]:
+        return list(self._columns)
+
+    @property
+    def columns(self) -> Dict[str, Column]:
+        return self._columns
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __repr__(self):
+        return f"ColumnarDocumentList({self._length} documents, fields={self.fields})"
+
+    def __getitem__(self, key: Union[str, int, slice]):
+        if isinstance(key, str):
+            return self.get_column(key)
+        elif isinstance(key, slice):
+            start, stop, step = key.indices(self._length)
+            if step != 1:
+                return self.take(list(range(start, stop, step)))
+            return self.__class__(
+                {field: column[start:stop] for field, column in self._columns.items()},
+                length=max(stop - start, 0),
+            )
+        elif isinstance(key, int):
+            if key < 0:
+                key += self._length
+            if not 0 <= key < self._length:
+                raise IndexError("document index out of range")
+            document = Document()
+            for field, column in self._columns.items():
+                value = column[key]
+                if isinstance(value, pa.Scalar):
+                    value = value.as_py()
+                if value is not None:
+                    document.set_path(compile_path(field), value)
+            return document
+        raise TypeError(f"indices must be str, int or slice, not {type(key)}")
+
+    def __iter__(self) -> Iterator[Document]:
+        return iter(self.to_document_list())
+
+    def get_column(self, field: str, default: Optional[Any] = None) -> List[Any]:
+        """
+        The value of `field` in every document, or `default` for documents
+        without it. A field with nested fields gives one dict per document.
+        """
+        if field in self._columns:
+            values = _to_pylist(self._columns[field])
+            return [default if value is None else value for value in values]
+
+        nested = self.select([field])
+        if not nested.fields:
+            return [default] * self._length
+        path = compile_path(field)
+        column = []
+        for document in nested:
+            try:
+                column.append(document.get_path(path))
+            except KeyError:
+                column.append(default)
+        return column
+
+    def get_vector(self, field: str) -> np.ndarray:
+        """
+        The vectors of `field` as a (documents, dimensions) float32 array.
+
+        The array is a read-only view of the Arrow buffer when every document
+        has the vector. Otherwise it is a copy, with NaN rows for the
+        documents without it.
+        """
+        column = self._columns[field]
+        assert _is_vector_column(
+            column
+        ), f"{field} is not stored as a vector column of equal length vectors"
+        dimensions = column.type.list_size
+        values = column.values
+        if values.null_count == 0:
+            matrix = values.to_numpy(zero_copy_only=True)
+        else:
+            matrix = values.to_numpy(zero_copy_only=False)
+        matrix = matrix.reshape(-1, dimensions)[
+            column.offset : column.offset + len(column)
+        ]
+        if column.null_count > 0:
+            matrix = matrix.astype(np.float32, copy=True)
+            matrix[~self.is_valid(field)] = np.nan
+        return matrix
+
+    def set_column(self, field: str, values: Union[List[Any], np.ndarray]) -> None:
+        """
+        Sets `field` of the i-th document to `values[i]`, replacing any
+        columns nested under `field`. A 2-D array is stored as a vector
+        column without copying it when it is float32 and contiguous.
+        """
+        assert len(values) == self._length, "There should be one value per document"
+        self._drop(field)
+        if isinstance(values, np.ndarray) and values.ndim == 2:
+            self._columns[field] = _vector_column(values)
+            return
+
+        values_by_field: Dict[str, List[Any]] = {}
+        for index, value in enumerate(values):
+            row = {}
+            _flatten(value, field, row)
+            for name, value in row.items():
+                if name not in values_by_field:
+                    values_by_field[name] = [None] * self._length
+                values_by_field[name][index] = value
+        for name, column in values_by_field.items():
+            self._columns[name] = _to_column(name, column)
+
+    def _drop(self, field: str) -> None:
+        # Removes the columns that `field` replaces, i.e. the fields nested
+        # under it and the fields it would be nested under
+        for name in list(self._columns):
+            if _is_under(name, field) or _is_under(field, name):
+                del self._columns[name]
+
+    def is_valid(self, field: str) -> np.ndarray:
+        """
+        A boolean mask of the documents that have `field`.
+        """
+        if field not in self._columns:
+            valid = np.zeros(self._length, dtype=bool)
+            for name, column in self._columns.items():
+                if _is_under(name, field):
+                    valid |= self.is_valid(name)
+            return valid
+        column = self._columns[field]
+        if isinstance(column, pa.Array):
+            return column.is_valid().to_numpy(zero_copy_only=False)
+        return np.array([value is not None for value in column], dtype=bool)
+
+    def num_fields(self) -> np.ndarray:
+        """
+        The number of top-level fields of each document, i.e. `len(document)`
+        of the materialised documents.
+        """
+        roots: Dict[str, np.ndarray] = {}
+        for field in self._columns:
+            root = field.split(".", 1)[0]
+            valid = self.is_valid(field)
+            roots[root] = roots[root] | valid if root in roots else valid
+        counts = np.zeros(self._length, dtype=int)
+        for valid in roots.values():
+            counts += valid
+        return counts
+
+    def select(self, fields: List[str]) -> "ColumnarDocumentList":
+        """
+        Keeps only the columns of `fields` and of the fields nested under them.
+        """
+        return self.__class__(
+            {
+                name: column
+                for name, column in self._columns.items()
+                if any(_is_under(name, field) for field in fields)
+            },
+            length=self._length,
+        )
+
+    def filter(self, mask: Union[List[bool], np.ndarray]) -> "ColumnarDocumentList":
+        """
+        Keeps the documents where `mask` is True.
+        """
+        mask = np.asarray(mask, dtype=bool)
+        assert len(mask) == self._length, "There should be one value per document"
+        return self.take(np.flatnonzero(mask))
+
+    def take(self, indices: Union[List[int], np.ndarray]) -> "ColumnarDocumentList":
+        """
+        The documents at `indices`, in that order.
+        """
+        indices = np.asarray(indices, dtype=np.int64)
+        columns = {}
+        for field, column in self._columns.items():
+            if isinstance(column, pa.Array):
+                columns[field] = column.take(pa.array(indices))
+            else:
+                columns[field] = [column[i] for i in indices]
+        return self.__class__(columns, length=len(indices))
+
+    def to_document_list(self) -> DocumentList:
+        """
+        Materialises every row into a `Document`, leaving out missing values.
+        """
+        paths = [compile_path(field) for field in self._columns]
+        columns = [_to_pylist(column) for column in self._columns.values()]
+        documents = []
+        for index in range(self._length):
+            document = Document()
+            for path, column in zip(paths, columns):
+                value = column[index]
+                if value is not None:
+                    document.set_path(path, value)
+            documents.append(document)
+        return DocumentList(documents)
+
+    def to_json(self) -> List[Dict[str, Any]]:
+        return self.to_document_list().to_json()
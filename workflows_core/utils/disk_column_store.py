@@ -0,0 +1,273 @@
+"""
+Pages of documents spilled to disk column by column.
+
+`DiskColumnStore` appends pages to files in a temporary directory instead of
+keeping them in memory: the vector fields go to one raw float32 file each,
+read back as memory-mapped NumPy arrays, and the other fields go to one
+Arrow IPC file per page. `read` returns all the pages as a single
+`ColumnarDocumentList` whose vector columns are views of the memory-mapped
+files, so operators that work on `get_vector` (e.g. KMeans) can fit on more
+vectors than fit in memory, with the OS paging them in and out.
+
+Requires `pyarrow` (`pip install RelevanceAI-Workflows-Core[columnar]`).
+
+.. code-block::
+
+    with DiskColumnStore() as store:
+        for page in engine.iterate():
+            store.append(page)
+        documents = store.read()
+        vectors = documents.get_vector("text_vector_")  # np.memmap backed
+
+"""
+import json
+import os
+import shutil
+import tempfile
+import numpy as np
+
+from typing import Any, Dict, List, Optional, Set, Union
+
+from workflows_core.utils.columnar_document_list import (
+    Column,
+    ColumnarDocumentList,
+    _is_vector_column,
+    _vector_column,
+)
+from workflows_core.utils.document_list import DocumentList
+from workflows_core.utils.json_encoder import json_dumps
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+except ImportError:
+    pa = None
+
+# Marks the columns of Python values that are stored as JSON strings
+_JSON_METADATA = {b"encoding": b"json"}
+
+
+class _VectorFile:
+    """
+    The rows of one vector field, appended to a raw float32 file.
+    """
+
+    def __init__(self, path: str, dimensions: int):
+        self.path = path
+        self.dimensions = dimensions
+        self.rows = 0
+        self.valid: List[np.ndarray] = []
+        self._file = open(path, "wb")
+
+    def write(self, matrix: np.ndarray, valid: np.ndarray) -> None:
+        self._file.write(np.ascontiguousarray(matrix, dtype=np.float32).tobytes())
+        self.valid.append(valid)
+        self.rows += len(matrix)
+
+    def pad(self, rows: int) -> None:
+        # Rows of the documents without the field
+        if rows:
+            self.write(
+                np.full((rows, self.dimensions), np.nan, dtype=np.float32),
+                np.zeros(rows, dtype=bool),
+            )
+
+    def read(self) -> "pa.Array":
+        self._file.flush()
+        if self.rows == 0:
+            matrix = np.empty((0, self.dimensions), dtype=np.float32)
+        else:
+            matrix = np.memmap(
+                self.path,
+                dtype=np.float32,
+                mode="r",
+                shape=(self.rows, self.dimensions),
+            )
+        return _vector_column(matrix, np.concatenate(self.valid))
+
+    def close(self) -> None:
+        self._file.close()
+
+
+def _encode_column(column: Column) -> "pa.Array":
+    if isinstance(column, pa.Array):
+        return column
+    return pa.array(
+        [None if value is None else json_dumps(value).decode() for value in column],
+        type=pa.string(),
+    )
+
+
+def _decode_column(column: "pa.Array", field: "pa.Field") -> Column:
+    if field.metadata == _JSON_METADATA:
+        return [
+            None if value is None else json.loads(value) for value in column.to_pylist()
+        ]
+    return column
+
+
+def _concat(pieces: List[Union[Column, int]]) -> Column:
+    # Pieces are columns, or numbers of missing rows
+    arrays = [piece for piece in pieces if isinstance(piece, pa.Array)]
+    if arrays and all(isinstance(piece, (pa.Array, int)) for piece in pieces):
+        try:
+            arrays = [
+                pa.nulls(piece, type=arrays[0].type)
+                if isinstance(piece, int)
+                else piece
+                for piece in pieces
+            ]
+            return arrays[0] if len(arrays) == 1 else pa.concat_arrays(arrays)
+        except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+            # different types in different pages
+            pass
+
+    values = []
+    for piece in pieces:
+        if isinstance(piece, int):
+            values.extend([None] * piece)
+        elif isinstance(piece, pa.Array):
+            values.extend(piece.to_pylist())
+        else:
+            values.extend(piece)
+    return values
+
+
+class DiskColumnStore:
+    """
+    Accumulates pages of documents on disk, column by column.
+
+    Parameters
+    -----------
+
+    directory
+        where to create the temporary directory of the files, the system's
+        temporary directory by default. The directory is removed by `close`.
+    """
+
+    def __init__(self, directory: Optional[str] = None):
+        if pa is None:
+            raise ImportError(
+                "DiskColumnStore requires pyarrow, "
+                "`pip install RelevanceAI-Workflows-Core[columnar]`"
+            )
+        self._directory = tempfile.mkdtemp(prefix="workflows_", dir=directory)
+        self._length = 0
+        self._vectors: Dict[str, _VectorFile] = {}
+        # The fields stored in the Arrow files
+        self._fields: Set[str] = set()
+        # (path of the Arrow file or None when the page had no other fields,
+        # number of documents) of each page
+        self._pages: List[tuple] = []
+
+    @property
+    def directory(self) -> str:
+        return self._directory
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __enter__(self) -> "DiskColumnStore":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def append(
+        self,
+        documents: Union[List[Dict[str, Any]], DocumentList, ColumnarDocumentList],
+    ) -> None:
+        """
+        Writes a page of documents to disk.
+        """
+        if not isinstance(documents, ColumnarDocumentList):
+            documents = ColumnarDocumentList.from_documents(documents)
+        length = len(documents)
+
+        columns = {}
+        written: Set[str] = set()
+        for field, column in documents.columns.items():
+            vector_file = self._vectors.get(field)
+            if vector_file is not None:
+                if (
+                    not _is_vector_column(column)
+                    or vector_file.dimensions != column.type.list_size
+                ):
+                    raise ValueError(
+                        f"{field} has vectors of different lengths, "
+                        "which can't be stored in one vector column"
+                    )
+            elif _is_vector_column(column) and field not in self._fields:
+                vector_file = _VectorFile(
+                    os.path.join(self._directory, f"vector_{len(self._vectors)}"),
+                    column.type.list_size,
+                )
+                vector_file.pad(self._length)
+                self._vectors[field] = vector_file
+            else:
+                columns[field] = column
+                self._fields.add(field)
+                continue
+            vector_file.write(documents.get_vector(field), documents.is_valid(field))
+            written.add(field)
+        for field, vector_file in self._vectors.items():
+            if field not in written:
+                vector_file.pad(length)
+
+        path = None
+        if columns:
+            path = os.path.join(self._directory, f"page_{len(self._pages)}.arrow")
+            table = pa.table(
+                [_encode_column(column) for column in columns.values()],
+                schema=pa.schema(
+                    [
+                        pa.field(field, column.type)
+                        if isinstance(column, pa.Array)
+                        else pa.field(field, pa.string(), metadata=_JSON_METADATA)
+                        for field, column in columns.items()
+                    ]
+                ),
+            )
+            with pa.OSFile(path, "wb") as sink:
+                with pa.ipc.new_file(sink, table.schema) as writer:
+                    writer.write_table(table)
+        self._pages.append((path, length))
+        self._length += length
+
+    def read(self) -> ColumnarDocumentList:
+        """
+        All the documents appended so far. The vector columns are views of
+        the memory-mapped files, the other columns are read into memory.
+        """
+        pieces: Dict[str, List[Union[Column, int]]] = {}
+        offset = 0
+        for path, length in self._pages:
+            page: Dict[str, Column] = {}
+            if path is not None:
+                table = pa.ipc.open_file(pa.memory_map(path)).read_all()
+                for field in table.schema:
+                    page[field.name] = _decode_column(
+                        table.column(field.name).combine_chunks(), field
+                    )
+            for field in set(pieces) | set(page):
+                if field not in pieces:
+                    # missing in the previous pages
+                    pieces[field] = [offset] if offset else []
+                pieces[field].append(page.get(field, length))
+            offset += length
+
+        columns: Dict[str, Column] = {
+            field: _concat(field_pieces) for field, field_pieces in pieces.items()
+        }
+        for field, vector_file in self._vectors.items():
+            columns[field] = vector_file.read()
+        return ColumnarDocumentList(columns, length=self._length)
+
+    def close(self) -> None:
+        """
+        Removes the files. Documents returned by `read` keep working on
+        platforms that allow removing memory-mapped files (Linux, macOS).
+        """
+        for vector_file in self._vectors.values():
+            vector_file.close()
+        shutil.rmtree(self._directory, ignore_errors=True)
@@ -1,48 +1,128 @@
-import pandas as pd
 import uuid
 
-from copy import deepcopy
-from typing import Any, Optional
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Set, Tuple
 from collections import UserDict
 
 from workflows_core.utils.json_encoder import json_encoder
 
 
+@lru_cache(maxsize=4096)
+def compile_path(key: str) -> Tuple[str, ...]:
+    """
+    Splits a dotted key into the fields to walk, e.g. `"a.b.c"` into
+    `("a", "b", "c")`. The result is cached as operators look up the same
+    few keys on every document.
+    """
+    return tuple(key.split("."))
+
+
+def _flatten_keys(value: Any, prefix: str) -> List[str]:
+    # Same keys as `pd.json_normalize(..., sep=".")`: only plain dicts are
+    # expanded and empty dicts have no keys
+    if isinstance(value, dict):
+        keys = []
+        for key, child in value.items():
+            keys.extend(_flatten_keys(child, f"{prefix}.{key}"))
+        return keys
+    return [prefix]
+
+
 class Document(UserDict):
+    # Flattened dotted keys of every top-level field, built on the first
+    # call to `keys` and then updated on every `__setitem__`/`__delitem__`.
+    # Top-level fields holding a dict are flattened again on every call:
+    # whoever holds a reference to the dict (from `__getitem__`, or the
+    # dict the document was built from) can add or remove its keys. Only
+    # replacing a top-level field in `self.data` directly is not tracked.
+    _index: Optional[Dict[Any, List[str]]] = None
+    _key_set: Optional[Set[str]] = None
+    _nested: Optional[Set[Any]] = None
+
     def __repr__(self):
         return repr(self.data)
 
+    def __copy__(self):
+        inst = super().__copy__()
+        inst._index = None
+        return inst
+
+    def _build_index(self) -> None:
+        self._index = {}
+        self._key_set = set()
+        self._nested = set()
+        for root in self.data:
+            self._reindex(root)
+
+    def _reindex(self, root: Any) -> None:
+        if self._index is None:
+            return
+        for key in self._index.get(root, ()):
+            self._key_set.discard(key)
+        if root in self.data:
+            value = self.data[root]
+            keys = _flatten_keys(value, str(root))
+            self._index[root] = keys
+            self._key_set.update(keys)
+            if isinstance(value, dict):
+                self._nested.add(root)
+            else:
+                self._nested.discard(root)
+        else:
+            self._index.pop(root, None)
+            self._nested.discard(root)
+
+    def _refresh_index(self) -> None:
+        if self._index is None:
+            self._build_index()
+            return
+        # Nested dicts may have been modified in place
+        for root in list(self._nested):
+            self._reindex(root)
+
+    def __delitem__(self, key: Any) -> None:
+        super().__delitem__(key)
+        self._reindex(key)
+
     def __setitem__(self, key: Any, value: Any) -> None:
         try:
-            fields = key.split(".")
+            path = compile_path(key)
         except:
             super().__setitem__(key, value)
+            self._reindex(key)
         else:
-            # Assign a pointer.
-            pointer = self.data
-            for depth, field in enumerate(fields):
-                # Assign the value if this is the last entry e.g. stores.fastfood.kfc.item will be item
-                if depth == len(fields) - 1:
-                    pointer.__setitem__(field, value)
-                else:
-                    if field in pointer.keys():
-                        pointer = pointer.__getitem__(field)
-                    else:
-                        pointer.update({field: {}})
-                        pointer = pointer.__getitem__(field)
+            self.set_path(path, value)
 
     def __getitem__(self, key: Any) -> Any:
         try:
-            fields = key.split(".")
+            path = compile_path(key)
         except:
             return super().__getitem__(key)
         else:
-            pointer = self.data
-            for depth, field in enumerate(fields):
-                if depth == len(fields) - 1:
-                    return pointer.__getitem__(field)
-                else:
-                    pointer = pointer.__getitem__(field)
+            return self.get_path(path)
+
+    def get_path(self, path: Tuple[str, ...]) -> Any:
+        """
+        `document[key]` for a path compiled with `compile_path(key)`.
+        """
+        pointer = self.data
+        for field in path:
+            pointer = pointer[field]
+        return pointer
+
+    def set_path(self, path: Tuple[str, ...], value: Any) -> None:
+        """
+        `document[key] = value` for a path compiled with `compile_path(key)`.
+        """
+        # Assign a pointer.
+        pointer = self.data
+        for field in path[:-1]:
+            if field not in pointer.keys():
+                pointer.update({field: {}})
+            pointer = pointer[field]
+        # Assign the value to the last entry e.g. stores.fastfood.kfc.item will be item
+        pointer[path[-1]] = value
+        self._reindex(path[0])
 
     def get(self, key: Any, default: Optional[Any] = None) -> Any:
         try:
@@ -54,20 +134,23 @@ class Document(UserDict):
         self.__setitem__(key, value)
 
     def keys(self):
-        try:
-            df = pd.json_normalize(self.data, sep=".")
-            return list(df.columns)
-        except:
-            return super().keys()
+        """
+        The flattened dotted keys of the document, e.g. `["a.b", "c"]` for
+        `{"a": {"b": 1}, "c": 2}`.
+        """
+        self._refresh_index()
+        keys = []
+        for root_keys in self._index.values():
+            keys.extend(root_keys)
+        return keys
 
     def __contains__(self, key) -> bool:
-        try:
-            return key in self.keys()
-        except:
-            return super().__contains__(key)
+        self._refresh_index()
+        return key in self._key_set
 
     def to_json(self):
-        return json_encoder(deepcopy(self.data))
+        # `json_encoder` builds new containers, so the document is not shared
+        return json_encoder(self.data)
 
     def list_chunks(self):
         """
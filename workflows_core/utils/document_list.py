@@ -1,9 +1,9 @@
 import warnings
 import itertools
 from collections import UserList
-from typing import Any, Dict, List, Union
+from typing import Any, Dict, List, Optional, Union
 
-from workflows_core.utils.document import Document
+from workflows_core.utils.document import Document, compile_path
 
 class DocumentList(UserList):
     data: List[Document]
@@ -20,7 +20,8 @@ class DocumentList(UserList):
 
     def __getitem__(self, key: Union[str, int]) -> Document:
         if isinstance(key, str):
-            return [document[key] for document in self.data]
+            path = compile_path(key)
+            return [document.get_path(path) for document in self.data]
         elif isinstance(key, slice):
             return self.__class__(self.data[key])
         elif isinstance(key, int):
@@ -28,15 +29,42 @@ class DocumentList(UserList):
 
     def __setitem__(self, key: Union[str, int], value: Union[Any, List[Any]]):
         if isinstance(key, str):
+            path = compile_path(key)
             if isinstance(value, list):
                 for document, value in zip(self.data, value):
-                    document[key] = value
+                    document.set_path(path, value)
             else:
                 for document in self.data:
-                    document[key] = value
+                    document.set_path(path, value)
         elif isinstance(key, int):
             self.data[key] = value
 
+    def get_column(self, field: str, default: Optional[Any] = None) -> List[Any]:
+        """
+        The value of `field` in every document, or `default` for documents
+        without it. The dotted path is resolved once for the whole list.
+        """
+        path = compile_path(field)
+        column = []
+        for document in self.data:
+            try:
+                column.append(document.get_path(path))
+            except (KeyError, TypeError, AttributeError):
+                column.append(default)
+        return column
+
+    def set_column(self, field: str, values: List[Any]) -> None:
+        """
+        Sets `field` of the i-th document to `values[i]`. The dotted path is
+        resolved once for the whole list.
+        """
+        assert len(values) == len(
+            self.data
+        ), "There should be one value per document"
+        path = compile_path(field)
+        for document, value in zip(self.data, values):
+            document.set_path(path, value)
+
     def to_json(self):
         return [document.to_json() for document in self.data]
 
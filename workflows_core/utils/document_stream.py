@@ -0,0 +1,275 @@
+"""
+Incremental decoding of `get_where` responses.
+
+`DocumentStream` parses the body of a streamed response as it arrives and
+yields the documents of the `documents` array one at a time, so the whole
+body never has to be in memory at once, and neither does the page of Python
+objects when the documents are consumed one by one. Vector fields are copied
+into float32 blocks allocated for the page, each document holding a row of
+the block instead of a list of Python floats.
+
+Engines consume each stream with `read()`, so they hold the page of
+documents (with float32 vectors), or its columns with `read(columnar=True)`.
+
+.. code-block::
+
+    stream = dataset.get_documents(3000, stream=True)
+    for document in stream:
+        ...
+    after_id = stream["after_id"]
+
+"""
+import codecs
+import numpy as np
+
+from json import JSONDecodeError, JSONDecoder
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from workflows_core.utils.document import Document
+from workflows_core.utils.document_list import DocumentList
+from workflows_core.utils.columnar_document_list import ColumnarDocumentList
+
+_WHITESPACE = " \t\n\r"
+
+
+class _VectorBlock:
+    """
+    Preallocated (capacity, dimensions) float32 rows for one vector field.
+    """
+
+    def __init__(self, capacity: int, dimensions: int):
+        self.array = np.empty((capacity, dimensions), dtype=np.float32)
+        self.size = 0
+
+    def append(self, vector: List[float]) -> Optional[np.ndarray]:
+        if self.size == len(self.array):
+            return None
+        row = self.array[self.size]
+        try:
+            row[:] = vector
+        except (TypeError, ValueError):
+            return None
+        self.size += 1
+        return row
+
+
+class DocumentStream:
+    """
+    Iterates over the documents of a `get_where` response body while it is
+    being downloaded.
+
+    The other keys of the response (`after_id`, `count`) are available with
+    `stream[key]` once they have been decoded. When the API sends them after
+    the documents, the documents need to be consumed first, e.g. with `read`.
+
+    Parameters
+    -----------
+
+    chunks
+        the response body, e.g. `response.iter_content(chunk_size)`
+    page_size
+        the number of documents requested, used to preallocate the vectors
+    vector_fields
+        the vector fields to store as float32 rows, by default every
+        top-level field with `_vector_` in its name
+    close
+        called once the body is consumed, e.g. `response.close`
+    """
+
+    def __init__(
+        self,
+        chunks: Iterable[bytes],
+        page_size: int = 1,
+        vector_fields: Optional[List[str]] = None,
+        close=None,
+    ):
+        self._chunks = iter(chunks)
+        self._text = codecs.getincrementaldecoder("utf-8")()
+        self._decoder = JSONDecoder()
+        self._buffer = ""
+        self._position = 0
+        self._eof = False
+        self._close = close
+
+        self._page_size = max(page_size, 1)
+        self._vector_fields = vector_fields
+        self._vector_blocks: Dict[str, _VectorBlock] = {}
+
+        self._metadata: Dict[str, Any] = {}
+        self._documents = self._decode()
+        # None until the response has been decoded up to the documents
+        self._in_documents: Optional[bool] = None
+        self._members: Optional[int] = None
+        self._started = False
+        self._finished = False
+
+    def __iter__(self) -> Iterator[Document]:
+        assert not self._started, "A DocumentStream can only be iterated once"
+        self._started = True
+        return self._documents
+
+    def __getitem__(self, key: str) -> Any:
+        if key == "documents":
+            return self
+        if not self._started:
+            self._read_header()
+        if key not in self._metadata and not self._finished:
+            raise KeyError(
+                f"`{key}` is sent after the documents, consume them first "
+                "(e.g. with `read`)"
+            )
+        return self._metadata[key]
+
+    def get(self, key: str, default: Any = None) -> Any:
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def read(self, columnar: bool = False) -> Dict[str, Any]:
+        """
+        Consumes the stream and returns it as `get_where` would: a dict with
+        the `documents` as a `DocumentList` and the other keys of the response.
+
+        With `columnar=True` the documents are a `ColumnarDocumentList`,
+        filled as they are decoded without keeping a Python object per
+        document (requires pyarrow).
+        """
+        if columnar:
+            documents = ColumnarDocumentList.from_documents(self)
+        else:
+            documents = DocumentList(list(self))
+        return {**self._metadata, "documents": documents}
+
+    def close(self) -> None:
+        if self._close is not None:
+            self._close()
+            self._close = None
+
+    def _fill(self) -> bool:
+        # Reads the next chunk of the body, returns False at the end
+        if self._eof:
+            return False
+        # Drop what has been decoded so that the buffer holds about one
+        # document at a time
+        self._buffer = self._buffer[self._position :]
+        self._position = 0
+        for chunk in self._chunks:
+            text = self._text.decode(chunk)
+            if text:
+                self._buffer += text
+                return True
+        self._buffer += self._text.decode(b"", final=True)
+        self._eof = True
+        return False
+
+    def _skip(self, characters: str = _WHITESPACE) -> str:
+        # Skips whitespace (or `characters`) and returns the next character,
+        # or "" at the end of the body
+        while True:
+            while (
+                self._position < len(self._buffer)
+                and self._buffer[self._position] in characters
+            ):
+                self._position += 1
+            if self._position < len(self._buffer):
+                return self._buffer[self._position]
+            if not self._fill():
+                return ""
+
+    def _expect(self, character: str) -> None:
+        if self._skip() != character:
+            raise JSONDecodeError(
+                f"Expecting '{character}'", self._buffer, self._position
+            )
+        self._position += 1
+
+    def _value(self) -> Any:
+        # Decodes the next value, reading more of the body until it is
+        # complete. A value that ends with the buffer may be a truncated
+        # number, so it is only accepted with more input or at the end.
+        self._skip()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._position)
+            except JSONDecodeError:
+                if not self._fill():
+                    raise
+            else:
+                if end < len(self._buffer) or not self._fill():
+                    self._position = end
+                    return value
+
+    def _read_header(self) -> None:
+        if self._in_documents is None:
+            self._in_documents = self._read_members()
+
+    def _read_members(self) -> bool:
+        # Decodes the members of the response object up to the `documents`
+        # array. Returns True at the start of the array and False at the end
+        # of the object.
+        if self._members is None:
+            self._expect("{")
+            self._members = 0
+        while True:
+            if self._skip() == "}":
+                self._position += 1
+                self._finished = True
+                return False
+            if self._members:
+                self._expect(",")
+            self._members += 1
+            key = self._value()
+            self._expect(":")
+            if key == "documents" and self._skip() == "[":
+                self._position += 1
+                return True
+            self._metadata[key] = self._value()
+
+    def _decode(self) -> Iterator[Document]:
+        try:
+            self._read_header()
+            while self._in_documents:
+                yield from self._decode_documents()
+                self._in_documents = self._read_members()
+        finally:
+            self.close()
+
+    def _decode_documents(self) -> Iterator[Document]:
+        if self._skip() == "]":
+            self._position += 1
+            return
+        while True:
+            yield self._to_document(self._value())
+            separator = self._skip()
+            self._position += 1
+            if separator == "]":
+                return
+            if separator != ",":
+                raise JSONDecodeError(
+                    "Expecting ',' delimiter", self._buffer, self._position - 1
+                )
+
+    def _to_document(self, document: Dict[str, Any]) -> Document:
+        for field, value in document.items():
+            if not isinstance(value, list) or not value:
+                continue
+            if self._vector_fields is None:
+                if "_vector_" not in field:
+                    continue
+            elif field not in self._vector_fields:
+                continue
+
+            block = self._vector_blocks.get(field)
+            if block is None or len(value) != block.array.shape[1]:
+                block = _VectorBlock(self._page_size, len(value))
+                self._vector_blocks[field] = block
+            row = block.append(value)
+            if row is None:
+                # the page is longer than expected, start another block
+                block = _VectorBlock(self._page_size, len(value))
+                self._vector_blocks[field] = block
+                row = block.append(value)
+            if row is not None:
+                document[field] = row
+        return Document(document)
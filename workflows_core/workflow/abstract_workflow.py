@@ -79,6 +79,9 @@ class Workflow:
                 send_email=self._send_email,
                 mark_as_complete_after_polling=self._mark_as_complete_after_polling,
             ):
+                # Started again with the same job_id, e.g. after the worker was
+                # pre-empted, the engine carries on from its last checkpoint
+                self.engine.load_checkpoint()
                 self.engine()
                 success_ratio = self.engine._success_ratio
                 if (
@@ -33,7 +33,14 @@ class WorkflowContextManager(API):
         send_email: bool = True,
         mark_as_complete_after_polling: bool = False,
     ) -> None:
-        super().__init__(dataset.api._credentials, job_id, workflow_name)
+        super().__init__(
+            dataset.api._credentials,
+            job_id,
+            workflow_name,
+            session_pool=dataset.api.session_pool,
+        )
+        # Talk to the same host as the dataset
+        self._base_url = dataset.api._base_url
 
         self._engine = engine
         self._operator = operator
@@ -60,17 +67,13 @@ class WorkflowContextManager(API):
             status=self.IN_PROGRESS, worker_number=self._engine.worker_number
         )
 
-        self._dataset.api._update_workflow_progress(
-            workflow_id=self._job_id,
-            worker_number=self._engine.worker_number,
-            step=self._workflow_name,
-            n_processed=0,
-            n_total=self._engine._size,
-        )
+        self._engine.update_progress(0)
 
         return
 
     def __exit__(self, exc_type: type, exc_value: BaseException, traceback: Traceback):
+        # The last progress lands before the status
+        self._engine.flush_progress()
         if exc_type is not None:
             logger.exception("Exception")
             self._set_status(
@@ -3,8 +3,9 @@ import logging
 from inspect import Traceback
 from typing import Any, Dict, Optional
 
-from workflows_core.api.api import API
+from workflows_core.api.api import API, SessionPool
 from workflows_core.api.helpers import Credentials
+from workflows_core.api.progress_reporter import ProgressReporter
 
 logging.basicConfig(
     level=logging.DEBUG, format="%(asctime)s:%(levelname)s:%(name)s:%(message)s"
@@ -28,9 +29,12 @@ class SimpleWorkflow(API):
         additional_information: str = "",
         send_email: bool = True,
         worker_number: int = None,
+        session_pool: Optional[SessionPool] = None,
+        progress_interval: float = 5.0,
+        progress_fraction: float = 0.01,
         **kwargs
     ) -> None:
-        super().__init__(credentials, job_id, workflow_name)
+        super().__init__(credentials, job_id, workflow_name, session_pool=session_pool)
 
         self._workflow_name = workflow_name
         self._job_id = job_id
@@ -40,6 +44,15 @@ class SimpleWorkflow(API):
         self._additional_information = additional_information
         self._send_email = send_email
 
+        self._progress_reporter = ProgressReporter(
+            self,
+            job_id,
+            worker_number=worker_number,
+            step=workflow_name,
+            min_interval=progress_interval,
+            min_fraction=progress_fraction,
+        )
+
     def __enter__(self):
         """
         The workflow is in progress
@@ -48,6 +61,8 @@ class SimpleWorkflow(API):
         return
 
     def __exit__(self, exc_type: type, exc_value: BaseException, traceback: Traceback):
+        # The last progress lands before the status
+        self._progress_reporter.flush()
         if exc_type is not None:
             logger.exception("Exception")
             self._set_status(status=self.FAILED, worker_number=self._worker_number)
@@ -98,6 +113,8 @@ class SimpleWorkflow(API):
         n_processed: int = 0,
         n_total: int = 0,
     ):
-        return self._update_workflow_progress(
-            self._job_id, self._worker_number, self._workflow_name, n_processed, n_total
-        )
+        """
+        Records the progress, which is sent in the background at most every
+        `progress_interval` seconds. The last progress is sent on exit.
+        """
+        self._progress_reporter.update(n_processed, n_total)